@@ -0,0 +1,195 @@
+"""
+Prueba de carga de las tools MCP contra el mock de Azure DevOps
+
+Levanta el mock (o usa uno existente con --mock-url), apunta las tools a
+él con AZURE_DEVOPS_BASE_URL y llama cada tool de forma concurrente con un
+cliente FastMCP en memoria. Reporta throughput, latencia p50/p95/p99,
+errores y llamadas HTTP a Azure DevOps por invocación.
+
+Uso (desde src/autoservicedesk-mcp-ado-backend):
+    python loadtest/load_test.py --invocations 200 --concurrency 20 --repos 5000 --latency-ms 80
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+import mock_ado_server
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+PROJECT = "HackathonNov2025"
+REPOSITORY = "repo-00000"
+
+_counter = itertools.count(1)
+
+# Argumentos de cada tool; los que crean recursos usan nombres únicos por invocación
+TOOL_ARGUMENTS: Dict[str, Callable[[], Dict]] = {
+    "list_projects": lambda: {},
+    "list_repositories": lambda: {"project": PROJECT},
+    "assign_contribute_permission": lambda: {
+        "project": PROJECT,
+        "repository": REPOSITORY,
+        "user_email": mock_ado_server.user_email(1),
+        "user_name": mock_ado_server.user_name(1),
+    },
+    "assign_reviewers_policies": lambda: {"project": PROJECT, "repository": REPOSITORY, "branch": "main", "reviewers": 2},
+    "create_and_import": lambda: {
+        "project": PROJECT,
+        "repository": f"imported-{next(_counter)}",
+        "repository_url_import": "https://github.com/octocat/Hello-World.git",
+    },
+    "get_work_items": lambda: {"project": PROJECT, "max_results": 50},
+    "create_work_items": lambda: {
+        "project": PROJECT,
+        "type": "Task",
+        "title": f"Solicitud de aprobación {next(_counter)}",
+        "description": "Solicitado por Usuario 001 (usuario001@empresa.com). Aprueba: IT Manager.",
+        "priority": 2,
+    },
+    "create_and_run_pipeline": lambda: {
+        "project": PROJECT,
+        "repository": REPOSITORY,
+        "pipeline_name": f"ci-load-{next(_counter)}",
+        "branch": "main",
+    },
+    "get_pipeline_run_report": lambda: {"project": PROJECT},
+}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", default=",".join(TOOL_ARGUMENTS), help="Tools separadas por coma")
+    parser.add_argument("--invocations", type=int, default=100, help="Invocaciones por tool")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mock-url", help="Usa un mock ya levantado (p. ej. http://127.0.0.1:8081)")
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte en JSON")
+    mock_ado_server.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(args: argparse.Namespace) -> str:
+    """Levanta el mock en un hilo aparte y retorna su URL"""
+    port = _free_port()
+    config = uvicorn.Config(
+        mock_ado_server.create_app(mock_ado_server.settings_from_args(args)),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def load_mcp_server(base_url: str, organization: str):
+    """Importa el servidor MCP con las tools apuntando al mock"""
+    os.environ["AZURE_DEVOPS_BASE_URL"] = f"{base_url}/{organization}"
+    os.environ.setdefault("AZURE_DEVOPS_ORGANIZATION", organization)
+    os.environ.setdefault("AZURE_DEVOPS_PAT", "load-test")
+    sys.path.insert(0, SERVER_DIR)
+    from server import mcp
+    return mcp
+
+
+def _is_error(result) -> bool:
+    if result.is_error:
+        return True
+    text = " ".join(getattr(block, "text", "") for block in result.content)
+    return text.lstrip().startswith("❌") or '"error"' in text
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil por rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def run_tool(client, stats_client: httpx.AsyncClient, tool: str, args: argparse.Namespace) -> Dict:
+    await stats_client.post("/_mock/reset")
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def invoke() -> Dict:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await client.call_tool(tool, TOOL_ARGUMENTS[tool](), raise_on_error=False)
+                failed = _is_error(result)
+            except Exception:
+                failed = True
+            return {"elapsed": time.perf_counter() - start, "failed": failed}
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(invoke() for _ in range(args.invocations)))
+    wall = time.perf_counter() - start
+    upstream = (await stats_client.get("/_mock/stats")).json()
+
+    latencies = sorted(s["elapsed"] * 1000 for s in samples)
+    return {
+        "tool": tool,
+        "invocations": len(samples),
+        "errors": sum(1 for s in samples if s["failed"]),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "throughput_rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "upstream_calls_per_invocation": round(upstream.get("total", 0) / len(samples), 2),
+        "upstream_throttled": upstream.get("throttled", 0),
+        "upstream_by_route": {k: v for k, v in sorted(upstream.items()) if k not in ("total", "throttled")},
+    }
+
+
+def print_report(results: List[Dict], args: argparse.Namespace) -> None:
+    print(
+        f"\nrepos={args.repos} work_items={args.work_items} latency={args.latency_ms}±{args.jitter_ms}ms "
+        f"throttle_rps={args.throttle_rps} throttle_rate={args.throttle_rate} "
+        f"invocations={args.invocations} concurrency={args.concurrency}\n"
+    )
+    header = f"{'tool':<30}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'inv/s':>8}{'HTTP/inv':>10}{'429':>6}{'errores':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['tool']:<30}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['throughput_rps']:>8}"
+            f"{r['upstream_calls_per_invocation']:>10}{r['upstream_throttled']:>6}{r['errors']:>9}"
+        )
+
+
+async def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    base_url = args.mock_url or start_mock(args)
+    mcp = load_mcp_server(base_url, args.organization)
+
+    from fastmcp import Client
+
+    results = []
+    async with Client(mcp) as client, httpx.AsyncClient(base_url=base_url) as stats_client:
+        for tool in args.tools.split(","):
+            results.append(await run_tool(client, stats_client, tool, args))
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_report(results, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,477 @@
+"""
+Mock local de la API REST de Azure DevOps
+Sirve los endpoints que usan las tools de server/tools con latencia,
+throttling (429 + Retry-After) y volumen de datos configurables.
+
+Uso:
+    python loadtest/mock_ado_server.py --port 8081 --repos 5000 --latency-ms 80
+    AZURE_DEVOPS_BASE_URL=http://127.0.0.1:8081/mock-org python server/server.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+GIT_NAMESPACE_ID = "2e9eb7ed-3c0a-47d4-87c1-0ffdd275fd87"
+REVIEWERS_POLICY_TYPE_ID = "fa4e907d-c16b-4a4c-9dfa-4906e5d171dd"
+
+
+@dataclass
+class MockSettings:
+    organization: str = "mock-org"
+    projects: int = 3
+    repos: int = 50
+    work_items: int = 200
+    pipelines: int = 5
+    users: int = 100
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    # Throttling: máximo de solicitudes por segundo (0 = sin límite) y
+    # probabilidad adicional de responder 429 al azar
+    throttle_rps: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after_seconds: int = 1
+
+
+def _project_name(index: int) -> str:
+    return "HackathonNov2025" if index == 0 else f"Project-{index:03d}"
+
+
+def _repo_name(index: int) -> str:
+    return f"repo-{index:05d}"
+
+
+def user_name(index: int) -> str:
+    return f"Usuario {index:03d}"
+
+
+def user_email(index: int) -> str:
+    return f"usuario{index:03d}@empresa.com"
+
+
+class MockState:
+    """Datos en memoria del mock (proyectos, repos, work items, pipelines, políticas)"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.base_url = f"https://dev.azure.com/{settings.organization}"
+        self._lock = threading.Lock()
+
+        self.projects = []
+        for i in range(settings.projects):
+            project_id = str(uuid.uuid5(uuid.NAMESPACE_URL, _project_name(i)))
+            self.projects.append({
+                "id": project_id,
+                "name": _project_name(i),
+                "url": f"{self.base_url}/_apis/projects/{project_id}",
+                "state": "wellFormed",
+                "visibility": "private",
+            })
+        self.repos: List[Dict] = []
+        for i in range(settings.repos):
+            project = self.projects[i % len(self.projects)]
+            self.repos.append(self._new_repo(_repo_name(i), project))
+
+        self.work_items: Dict[int, Dict] = {}
+        for i in range(1, settings.work_items + 1):
+            project = self.projects[i % len(self.projects)]
+            self._add_work_item(project["name"], random.choice(["Task", "Bug", "Product Backlog Item"]), f"Work item {i}")
+
+        self.pipelines: Dict[str, List[Dict]] = {p["name"]: [] for p in self.projects}
+        self.runs: Dict[int, List[Dict]] = {}
+        for project in self.projects:
+            for i in range(settings.pipelines):
+                pipeline = self._add_pipeline(project["name"], f"ci-{i:03d}")
+                self._add_run(pipeline["id"])
+
+        self.policies: Dict[int, Dict] = {}
+        self._cached: Dict[str, bytes] = {}
+
+    def _new_repo(self, name: str, project: Dict) -> Dict:
+        repo_id = str(uuid.uuid4())
+        return {
+            "id": repo_id,
+            "name": name,
+            "url": f"{self.base_url}/{project['id']}/_apis/git/repositories/{repo_id}",
+            "project": {"id": project["id"], "name": project["name"]},
+            "defaultBranch": "refs/heads/main",
+            "size": random.randint(10_000, 50_000_000),
+            "remoteUrl": f"https://{self.settings.organization}@dev.azure.com/{self.settings.organization}/{project['name']}/_git/{name}",
+            "webUrl": f"{self.base_url}/{project['name']}/_git/{name}",
+        }
+
+    def _add_work_item(self, project: str, item_type: str, title: str, fields: Optional[Dict] = None) -> Dict:
+        item_id = len(self.work_items) + 1
+        item = {
+            "id": item_id,
+            "url": f"{self.base_url}/_apis/wit/workItems/{item_id}",
+            "fields": {
+                "System.TeamProject": project,
+                "System.WorkItemType": item_type,
+                "System.Title": title,
+                "System.State": "New",
+                **(fields or {}),
+            },
+            "_links": {"html": {"href": f"{self.base_url}/{project}/_workitems/edit/{item_id}"}},
+        }
+        self.work_items[item_id] = item
+        return item
+
+    def _add_pipeline(self, project: str, name: str) -> Dict:
+        pipeline = {"id": sum(len(p) for p in self.pipelines.values()) + 1, "name": name, "folder": "\\"}
+        self.pipelines[project].append(pipeline)
+        self.runs[pipeline["id"]] = []
+        return pipeline
+
+    def _add_run(self, pipeline_id: int) -> Dict:
+        run = {
+            "id": sum(len(r) for r in self.runs.values()) + 1,
+            "state": "completed",
+            "result": "succeeded",
+            "createdDate": "2025-11-20T10:00:00Z",
+            "finishedDate": "2025-11-20T10:05:00Z",
+            "pipeline": {"id": pipeline_id},
+        }
+        self.runs[pipeline_id].insert(0, run)
+        return run
+
+    def cached_json(self, key: str, build) -> Response:
+        """Las listas grandes se serializan una vez y se invalidan al modificarse"""
+        with self._lock:
+            body = self._cached.get(key)
+            if body is None:
+                body = json.dumps(build()).encode()
+                self._cached[key] = body
+        return Response(body, media_type="application/json")
+
+    def invalidate(self, prefix: str) -> None:
+        with self._lock:
+            for key in [k for k in self._cached if k.startswith(prefix)]:
+                del self._cached[key]
+
+    def find_project(self, name: str) -> Optional[Dict]:
+        return next((p for p in self.projects if p["name"] == name or p["id"] == name), None)
+
+
+class Throttle:
+    """Ventana de un segundo por proceso para simular el límite de tasa de ADO"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self._window_start = time.monotonic()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def should_throttle(self) -> bool:
+        if self.settings.throttle_rate and random.random() < self.settings.throttle_rate:
+            return True
+        if not self.settings.throttle_rps:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1:
+                self._window_start, self._count = now, 0
+            self._count += 1
+            return self._count > self.settings.throttle_rps
+
+
+def _values(items: List) -> Dict:
+    return {"count": len(items), "value": items}
+
+
+def create_app(settings: MockSettings) -> Starlette:
+    state = MockState(settings)
+    throttle = Throttle(settings)
+    stats: Counter = Counter()
+
+    def endpoint(route_name: str):
+        """Aplica latencia, throttling y conteo a cada endpoint simulado"""
+        def decorator(handler):
+            async def wrapped(request: Request) -> Response:
+                stats["total"] += 1
+                stats[f"{request.method} {route_name}"] += 1
+
+                delay = settings.latency_ms + random.uniform(-settings.jitter_ms, settings.jitter_ms)
+                if delay > 0:
+                    await asyncio.sleep(delay / 1000)
+
+                if throttle.should_throttle():
+                    stats["throttled"] += 1
+                    return JSONResponse(
+                        {"message": "Request was blocked due to exceeding usage of resource."},
+                        status_code=429,
+                        headers={"Retry-After": str(settings.retry_after_seconds)},
+                    )
+                return await handler(request)
+            return wrapped
+        return decorator
+
+    # ===== Proyectos y repositorios =====
+
+    @endpoint("projects")
+    async def list_projects(request: Request) -> Response:
+        return state.cached_json("projects", lambda: _values(state.projects))
+
+    @endpoint("git/repositories")
+    async def repositories(request: Request) -> Response:
+        project_name = request.path_params.get("project")
+        project = state.find_project(project_name) if project_name else None
+        if project_name and project is None:
+            return JSONResponse({"message": f"Project {project_name} not found"}, status_code=404)
+
+        if request.method == "POST":
+            body = await request.json()
+            if any(r["name"] == body["name"] and r["project"]["id"] == project["id"] for r in state.repos):
+                return JSONResponse({"message": "Repository already exists"}, status_code=409)
+            repo = state._new_repo(body["name"], project)
+            state.repos.append(repo)
+            state.invalidate("repos")
+            return JSONResponse(repo, status_code=201)
+
+        key = f"repos:{project['id'] if project else '*'}"
+        return state.cached_json(
+            key,
+            lambda: _values([r for r in state.repos if project is None or r["project"]["id"] == project["id"]]),
+        )
+
+    @endpoint("git/importRequests")
+    async def import_request(request: Request) -> Response:
+        repo_id = request.path_params["repo_id"]
+        repo = next((r for r in state.repos if r["id"] == repo_id), None)
+        if repo is None:
+            return JSONResponse({"message": "Repository not found"}, status_code=404)
+        body = await request.json()
+        return JSONResponse({
+            "importRequestId": random.randint(1, 10_000),
+            "status": "queued",
+            "parameters": body.get("parameters"),
+            "repository": repo,
+        }, status_code=201)
+
+    # ===== Seguridad =====
+
+    @endpoint("securitynamespaces")
+    async def security_namespaces(request: Request) -> Response:
+        def build():
+            namespaces = [
+                {
+                    "namespaceId": str(uuid.uuid5(uuid.NAMESPACE_URL, f"ns-{i}")),
+                    "displayName": f"Namespace {i}",
+                    "actions": [{"bit": 1, "name": "Read", "displayName": "Read"}],
+                }
+                for i in range(40)
+            ]
+            namespaces.append({
+                "namespaceId": GIT_NAMESPACE_ID,
+                "displayName": "Git Repositories",
+                "actions": [
+                    {"bit": 1, "name": "Administer", "displayName": "Administer"},
+                    {"bit": 2, "name": "GenericRead", "displayName": "Read"},
+                    {"bit": 4, "name": "GenericContribute", "displayName": "Contribute"},
+                    {"bit": 8, "name": "ForcePush", "displayName": "Force push (rewrite history, delete branches and tags)"},
+                ],
+            })
+            return _values(namespaces)
+
+        return state.cached_json("securitynamespaces", build)
+
+    @endpoint("identities")
+    async def identities(request: Request) -> Response:
+        email = request.query_params.get("filterValue", "")
+        matches = [
+            {
+                "id": str(uuid.uuid5(uuid.NAMESPACE_URL, user_email(i))),
+                "descriptor": f"Microsoft.IdentityModel.Claims.ClaimsIdentity;{user_email(i)}",
+                "providerDisplayName": user_name(i),
+                "properties": {"Mail": {"$value": user_email(i)}},
+            }
+            for i in range(settings.users)
+            if user_email(i) == email
+        ]
+        return JSONResponse(_values(matches))
+
+    @endpoint("accesscontrolentries")
+    async def access_control_entries(request: Request) -> Response:
+        body = await request.json()
+        return JSONResponse(_values(body.get("accessControlEntries", [])))
+
+    # ===== Políticas =====
+
+    @endpoint("policy/types")
+    async def policy_types(request: Request) -> Response:
+        return JSONResponse(_values([
+            {"id": REVIEWERS_POLICY_TYPE_ID, "displayName": "Minimum number of reviewers"},
+            {"id": "0609b952-1397-4640-95ec-e00a01b2c241", "displayName": "Build"},
+            {"id": "40e92b44-2fe1-4dd6-b3d8-74a9c21d0c6e", "displayName": "Work item linking"},
+        ]))
+
+    @endpoint("policy/configurations")
+    async def policy_configurations(request: Request) -> Response:
+        if request.method == "GET":
+            repository_id = request.query_params.get("repositoryId")
+            ref_name = request.query_params.get("refName")
+            matches = [
+                p for p in state.policies.values()
+                if any(
+                    s.get("repositoryId") == repository_id and (ref_name is None or s.get("refName") == ref_name)
+                    for s in p["settings"].get("scope", [])
+                )
+            ]
+            return JSONResponse(_values(matches))
+
+        body = await request.json()
+        policy_id = int(request.path_params.get("policy_id") or len(state.policies) + 1)
+        if request.method == "PUT" and policy_id not in state.policies:
+            return JSONResponse({"message": "Policy not found"}, status_code=404)
+        policy = {**body, "id": policy_id, "revision": state.policies.get(policy_id, {}).get("revision", 0) + 1}
+        state.policies[policy_id] = policy
+        return JSONResponse(policy, status_code=200 if request.method == "PUT" else 201)
+
+    # ===== Work items =====
+
+    @endpoint("wit/wiql")
+    async def wiql(request: Request) -> Response:
+        project = request.path_params["project"]
+        ids = [
+            {"id": item_id, "url": item["url"]}
+            for item_id, item in state.work_items.items()
+            if item["fields"]["System.TeamProject"] == project
+        ]
+        return JSONResponse({"queryType": "flat", "workItems": ids})
+
+    @endpoint("wit/workitems")
+    async def work_items(request: Request) -> Response:
+        ids = [int(i) for i in request.query_params.get("ids", "").split(",") if i]
+        return JSONResponse(_values([state.work_items[i] for i in ids if i in state.work_items]))
+
+    @endpoint("wit/workitems/$type")
+    async def create_work_item(request: Request) -> Response:
+        project = request.path_params["project"]
+        if state.find_project(project) is None:
+            return JSONResponse({"message": f"Project {project} not found"}, status_code=404)
+        operations = await request.json()
+        fields = {op["path"].removeprefix("/fields/"): op["value"] for op in operations if op.get("op") == "add"}
+        item = state._add_work_item(project, request.path_params["work_item_type"], fields.get("System.Title", ""), fields)
+        return JSONResponse(item, status_code=200)
+
+    # ===== Pipelines =====
+
+    @endpoint("pipelines")
+    async def pipelines(request: Request) -> Response:
+        project = request.path_params["project"]
+        if project not in state.pipelines:
+            return JSONResponse({"message": f"Project {project} not found"}, status_code=404)
+        if request.method == "POST":
+            body = await request.json()
+            return JSONResponse(state._add_pipeline(project, body["name"]), status_code=200)
+        return JSONResponse(_values(state.pipelines[project]))
+
+    @endpoint("pipelines/runs")
+    async def pipeline_runs(request: Request) -> Response:
+        pipeline_id = int(request.path_params["pipeline_id"])
+        if pipeline_id not in state.runs:
+            return JSONResponse({"message": "Pipeline not found"}, status_code=404)
+        if request.method == "POST":
+            run = state._add_run(pipeline_id)
+            run.update({"state": "inProgress", "result": None})
+            return JSONResponse(run, status_code=200)
+        return JSONResponse(_values(state.runs[pipeline_id]))
+
+    @endpoint("pipelines/runs/{id}")
+    async def pipeline_run(request: Request) -> Response:
+        runs = state.runs.get(int(request.path_params["pipeline_id"]), [])
+        run = next((r for r in runs if r["id"] == int(request.path_params["run_id"])), None)
+        if run is None:
+            return JSONResponse({"message": "Run not found"}, status_code=404)
+        return JSONResponse(run)
+
+    # ===== Control del mock =====
+
+    async def get_stats(request: Request) -> Response:
+        return JSONResponse(dict(stats))
+
+    async def reset_stats(request: Request) -> Response:
+        stats.clear()
+        return JSONResponse({"status": "ok"})
+
+    routes = [
+        Route("/_mock/stats", get_stats, methods=["GET"]),
+        Route("/_mock/reset", reset_stats, methods=["POST"]),
+        Route("/{org}/_apis/projects", list_projects, methods=["GET"]),
+        Route("/{org}/_apis/git/repositories", repositories, methods=["GET"]),
+        Route("/{org}/_apis/securitynamespaces", security_namespaces, methods=["GET"]),
+        Route("/{org}/_apis/identities", identities, methods=["GET"]),
+        Route("/{org}/_apis/accesscontrolentries/{namespace_id}", access_control_entries, methods=["POST"]),
+        Route("/{org}/{project}/_apis/git/repositories", repositories, methods=["GET", "POST"]),
+        Route("/{org}/{project}/_apis/git/repositories/{repo_id}/importRequests", import_request, methods=["POST"]),
+        Route("/{org}/{project}/_apis/policy/types", policy_types, methods=["GET"]),
+        Route("/{org}/{project}/_apis/policy/configurations", policy_configurations, methods=["GET", "POST"]),
+        Route("/{org}/{project}/_apis/policy/configurations/{policy_id:int}", policy_configurations, methods=["PUT"]),
+        Route("/{org}/{project}/_apis/wit/wiql", wiql, methods=["POST"]),
+        Route("/{org}/{project}/_apis/wit/workitems", work_items, methods=["GET"]),
+        Route("/{org}/{project}/_apis/wit/workitems/${work_item_type}", create_work_item, methods=["POST"]),
+        Route("/{org}/{project}/_apis/pipelines", pipelines, methods=["GET", "POST"]),
+        Route("/{org}/{project}/_apis/pipelines/{pipeline_id:int}/runs", pipeline_runs, methods=["GET", "POST"]),
+        Route("/{org}/{project}/_apis/pipelines/{pipeline_id:int}/runs/{run_id:int}", pipeline_run, methods=["GET"]),
+    ]
+    app = Starlette(routes=routes)
+    app.state.mock = state
+    return app
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Argumentos del mock (compartidos con el load test)"""
+    defaults = MockSettings()
+    parser.add_argument("--organization", default=defaults.organization)
+    parser.add_argument("--projects", type=int, default=defaults.projects)
+    parser.add_argument("--repos", type=int, default=defaults.repos)
+    parser.add_argument("--work-items", type=int, default=defaults.work_items)
+    parser.add_argument("--pipelines", type=int, default=defaults.pipelines, help="Pipelines por proyecto")
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--throttle-rps", type=float, default=defaults.throttle_rps,
+                        help="Solicitudes por segundo antes de responder 429 (0 = sin límite)")
+    parser.add_argument("--throttle-rate", type=float, default=defaults.throttle_rate,
+                        help="Probabilidad de responder 429 a cualquier solicitud")
+    parser.add_argument("--retry-after", type=int, default=defaults.retry_after_seconds)
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        organization=args.organization,
+        projects=args.projects,
+        repos=args.repos,
+        work_items=args.work_items,
+        pipelines=args.pipelines,
+        users=args.users,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        throttle_rps=args.throttle_rps,
+        throttle_rate=args.throttle_rate,
+        retry_after_seconds=args.retry_after,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Mock local de la API REST de Azure DevOps")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"Mock de Azure DevOps en http://{args.host}:{args.port}/{args.organization}")
+    uvicorn.run(create_app(settings_from_args(args)), host=args.host, port=args.port, log_level="warning")
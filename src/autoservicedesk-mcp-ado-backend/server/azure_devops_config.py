@@ -8,6 +8,10 @@ AZURE_DEVOPS_ORG = os.getenv("AZURE_DEVOPS_ORGANIZATION")
 AZURE_DEVOPS_PAT = os.getenv("AZURE_DEVOPS_PAT")
 AZURE_DEVOPS_API_VERSION = "7.1"
 
+# Permite apuntar las tools a otro host (p. ej. el mock local de loadtest/)
+AZURE_DEVOPS_BASE_URL = os.getenv("AZURE_DEVOPS_BASE_URL")
+AZURE_DEVOPS_IDENTITY_BASE_URL = os.getenv("AZURE_DEVOPS_IDENTITY_BASE_URL")
+
 
 def get_auth_header() -> str:
     """Genera el header de autenticación para Azure DevOps."""
@@ -18,4 +22,15 @@ def get_auth_header() -> str:
 
 def get_base_url() -> str:
     """Retorna la URL base de la API de Azure DevOps."""
-    return f"https://dev.azure.com/{AZURE_DEVOPS_ORG}"
\ No newline at end of file
+    if AZURE_DEVOPS_BASE_URL:
+        return AZURE_DEVOPS_BASE_URL.rstrip("/")
+    return f"https://dev.azure.com/{AZURE_DEVOPS_ORG}"
+
+
+def get_identity_base_url() -> str:
+    """Retorna la URL base de la API de identidades (vssps) de Azure DevOps."""
+    if AZURE_DEVOPS_IDENTITY_BASE_URL:
+        return AZURE_DEVOPS_IDENTITY_BASE_URL.rstrip("/")
+    if AZURE_DEVOPS_BASE_URL:
+        return get_base_url()
+    return f"https://vssps.dev.azure.com/{AZURE_DEVOPS_ORG}"
\ No newline at end of file
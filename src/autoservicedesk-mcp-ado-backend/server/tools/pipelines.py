@@ -3,6 +3,12 @@ import time
 import httpx
 from fastmcp import FastMCP
 
+from azure_devops_config import (
+    get_base_url,
+    get_auth_header,
+    AZURE_DEVOPS_API_VERSION,
+)
+
 
 def register_pipeline_tools(mcp: FastMCP) -> None:
     @mcp.tool()
@@ -3,8 +3,8 @@ from fastmcp import FastMCP
 
 from azure_devops_config import (
     get_base_url,
+    get_identity_base_url,
     get_auth_header,
-    AZURE_DEVOPS_ORG,
     AZURE_DEVOPS_API_VERSION,
 )
 
@@ -98,7 +98,6 @@ def register_repository_tools(mcp: FastMCP) -> None:
         try:
             async with httpx.AsyncClient(timeout=30.0) as client:
                 headers = {"Authorization": get_auth_header()}
-                organization = AZURE_DEVOPS_ORG
                 
                 # ===== 1. Obtener Project ID =====
                 projects_url = f"{get_base_url()}/_apis/projects?api-version={AZURE_DEVOPS_API_VERSION}"
@@ -156,7 +155,7 @@ def register_repository_tools(mcp: FastMCP) -> None:
                 
                 # ===== 4. Obtener User Identity =====
                 identities_url = (
-                    f"https://vssps.dev.azure.com/{organization}/_apis/identities"
+                    f"{get_identity_base_url()}/_apis/identities"
                     f"?searchFilter=General&filterValue={user_email}&queryMembership=None&api-version={AZURE_DEVOPS_API_VERSION}"
                 )
                 user_response = await client.get(identities_url, headers=headers)
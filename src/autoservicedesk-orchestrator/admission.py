@@ -0,0 +1,225 @@
+"""
+Control de admisión de solicitudes de soporte: límite de concurrencia,
+cola de espera acotada y límite de tasa por usuario
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Optional
+
+import config
+import logs
+import metrics
+from cache import LRUCache
+
+logger = logs.get_logger(__name__)
+
+RATE_LIMITED = "rate_limited"
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "queue_timeout"
+
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+# Peso de cada solicitud en la media móvil de su duración (para estimar Retry-After)
+SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """Solicitud rechazada por saturación o límite de tasa"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket por clave: burst solicitudes seguidas y luego
+    rate_per_minute por minuto. Los buckets inactivos se olvidan al
+    rellenarse por completo (equivalen a uno nuevo).
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int):
+        self._rate = rate_per_minute / 60
+        self._burst = burst
+        self._buckets = LRUCache(max_size=max_keys, ttl_seconds=burst / self._rate)
+
+    def consume(self, key: str) -> Optional[float]:
+        """Consume un token. Retorna None si se permite o los segundos hasta el próximo token"""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key) or (self._burst, now)
+        tokens = min(self._burst, tokens + (now - updated_at) * self._rate)
+        if tokens < 1:
+            self._buckets.set(key, (tokens, now))
+            return (1 - tokens) / self._rate
+        self._buckets.set(key, (tokens - 1, now))
+        return None
+
+
+class AdmissionController:
+    """
+    Admite hasta max_in_flight solicitudes a la vez. Las siguientes esperan
+    en una cola FIFO de hasta max_queue, como máximo queue_timeout segundos;
+    con la cola llena se rechazan de inmediato. Al terminar una solicitud su
+    lugar pasa directamente a la primera en espera.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self._max_in_flight = max_in_flight
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Duración media de una solicitud admitida
+        self._service_time = 1.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """Estimación del tiempo hasta que se libere un lugar para una solicitud nueva"""
+        return self._service_time * (len(self._waiters) + 1) / self._max_in_flight
+
+    async def acquire(self, queue_limits: bool = True) -> float:
+        """
+        Espera un lugar y retorna los segundos de espera en cola. Con
+        queue_limits=False (lotes y trabajos, que ya acotan su propia
+        concurrencia) espera sin límite de cola ni de tiempo.
+        """
+        if self._in_flight < self._max_in_flight and not self._waiters:
+            self._in_flight += 1
+            return 0.0
+        if queue_limits and len(self._waiters) >= self._max_queue:
+            raise AdmissionRejected(QUEUE_FULL, self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self._queue_timeout if queue_limits else None)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # El lugar llegó justo al vencer el plazo
+                return time.monotonic() - queued_at
+            self._discard_waiter(waiter)
+            raise AdmissionRejected(QUEUE_TIMEOUT, self.retry_after())
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # El lugar ya se había cedido a esta solicitud: pasa a la siguiente
+                self._release_slot()
+            else:
+                self._discard_waiter(waiter)
+            raise
+        return time.monotonic() - queued_at
+
+    def release(self, service_seconds: float) -> None:
+        self._service_time += SERVICE_TIME_ALPHA * (service_seconds - self._service_time)
+        self._release_slot()
+
+    def _discard_waiter(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release_slot(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+
+class Admission:
+    """Lugar ocupado por una solicitud admitida; release() es idempotente"""
+
+    def __init__(self, controller: Optional[AdmissionController]):
+        self._controller = controller
+        self._admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        if self._controller is not None:
+            self._controller.release(time.monotonic() - self._admitted_at)
+
+
+_controller: Optional[AdmissionController] = None
+if config.ADMISSION_MAX_IN_FLIGHT > 0:
+    _controller = AdmissionController(
+        config.ADMISSION_MAX_IN_FLIGHT,
+        config.ADMISSION_MAX_QUEUE,
+        config.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    )
+
+_user_limiter: Optional[TokenBucketLimiter] = None
+if config.USER_RATE_LIMIT_PER_MINUTE > 0:
+    _user_limiter = TokenBucketLimiter(
+        config.USER_RATE_LIMIT_PER_MINUTE,
+        config.USER_RATE_LIMIT_BURST,
+        config.USER_RATE_LIMIT_MAX_USERS,
+    )
+
+
+def _collect_metrics():
+    if _controller is None:
+        return
+    yield "admission_in_flight", "gauge", {}, _controller.in_flight
+    yield "admission_queue_depth", "gauge", {}, _controller.queue_depth
+
+
+metrics.register_collector(_collect_metrics)
+
+
+def check_rate_limit(user_key: str) -> None:
+    """
+    Consume un token del límite de tasa de user_key (el usuario autenticado
+    o, si no hay, el user_email de la solicitud). Lanza AdmissionRejected.
+    """
+    if _user_limiter is None:
+        return
+    retry_after = _user_limiter.consume((user_key or "").strip().lower())
+    if retry_after is not None:
+        metrics.increment("admission_decisions_total", result=RATE_LIMITED)
+        logger.warning("🚦 Límite de tasa por usuario alcanzado", extra={"retry_after_s": round(retry_after, 1)})
+        raise AdmissionRejected(RATE_LIMITED, retry_after)
+
+
+async def admit(user_key: str, queue_limits: bool = True) -> Admission:
+    """
+    Aplica el límite de tasa del usuario y espera un lugar.
+    Lanza AdmissionRejected si la solicitud debe rechazarse (HTTP 429).
+    """
+    check_rate_limit(user_key)
+    return await acquire_slot(queue_limits)
+
+
+async def acquire_slot(queue_limits: bool = True) -> Admission:
+    """Espera un lugar sin aplicar el límite de tasa (p. ej. trabajos ya admitidos al encolarse)"""
+    if _controller is None:
+        metrics.increment("admission_decisions_total", result="admitted")
+        return Admission(None)
+
+    try:
+        waited = await _controller.acquire(queue_limits)
+    except AdmissionRejected as e:
+        metrics.increment("admission_decisions_total", result=e.reason)
+        logger.warning(
+            "🚦 Solicitud rechazada por saturación (%s)", e.reason,
+            extra={"in_flight": _controller.in_flight, "queue_depth": _controller.queue_depth},
+        )
+        raise
+
+    metrics.increment("admission_decisions_total", result="admitted")
+    metrics.observe("admission_queue_wait_seconds", waited, buckets=WAIT_BUCKETS)
+    return Admission(_controller)
@@ -0,0 +1,208 @@
+"""
+Registro persistente y versionado de agentes
+"""
+from azure.ai.agents.aio import AgentsClient
+from azure.ai.agents.models import Agent
+from azure.core.exceptions import ResourceNotFoundError
+import asyncio
+import hashlib
+import json
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import logs
+import metrics
+import timing
+
+logger = logs.get_logger(__name__)
+
+T = TypeVar("T")
+
+# Clave de metadata con la huella de la definición del agente
+DEFINITION_HASH_KEY = "definition_hash"
+# Clave de metadata con la última vez (epoch) que un proceso en ejecución reclamó el agente
+LAST_USED_KEY = "last_used_at"
+
+
+def agent_metadata(definition_hash: str) -> Dict[str, str]:
+    """Metadata de un agente del registro: su huella y el reclamo de este proceso"""
+    return {DEFINITION_HASH_KEY: definition_hash, LAST_USED_KEY: str(int(time.time()))}
+
+
+def _serialize_tool(tool) -> Dict:
+    """Convierte una definición de herramienta del SDK a un dict serializable"""
+    if hasattr(tool, "as_dict"):
+        return tool.as_dict()
+    return dict(tool)
+
+
+def compute_definition_hash(model: str, instructions: str, tools: Optional[List] = None) -> str:
+    """Calcula la huella de contenido de un agente (modelo, instrucciones y herramientas)"""
+    definition = {
+        "model": model,
+        "instructions": instructions,
+        "tools": [_serialize_tool(t) for t in (tools or [])],
+    }
+    raw = json.dumps(definition, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AgentRegistry:
+    """
+    Crea cada agente una sola vez y lo reutiliza entre solicitudes.
+
+    Los agentes se indexan por nombre y huella de su definición; si la
+    definición cambia se crea una nueva versión y se elimina la anterior.
+    La huella se guarda en la metadata del agente para poder reutilizarlo
+    tras reiniciar el proceso. Los procesos vivos renuevan periódicamente
+    LAST_USED_KEY de sus agentes (claim_current_versions) para que el
+    barrido no borre versiones en uso en otros hosts.
+    """
+
+    def __init__(self):
+        self._agents: Dict[Tuple[str, str], Agent] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_or_create(
+            self,
+            agents_client: AgentsClient,
+            name: str,
+            model: str,
+            instructions: str,
+            tools: Optional[List] = None,
+    ) -> Agent:
+        """Retorna el agente vigente para la definición dada, creándolo si no existe"""
+        definition_hash = compute_definition_hash(model, instructions, tools)
+        key = (name, definition_hash)
+
+        agent = self._agents.get(key)
+        if agent is not None:
+            return agent
+
+        async with self._lock:
+            agent = self._agents.get(key)
+            if agent is not None:
+                return agent
+
+            agent = await self._find_existing(agents_client, name, definition_hash)
+            if agent is None:
+                agent = await agents_client.create_agent(
+                    model=model,
+                    name=name,
+                    instructions=instructions,
+                    tools=tools,
+                    metadata=agent_metadata(definition_hash),
+                )
+                logger.info("✅ Agente '%s' creado: %s (v%s)", name, agent.id, definition_hash[:12])
+            else:
+                logger.info("♻️ Agente '%s' reutilizado: %s (v%s)", name, agent.id, definition_hash[:12])
+                await self._claim(agents_client, agent, definition_hash)
+
+            with timing.stage("cleanup"):
+                await self._retire_previous_versions(agents_client, name, definition_hash)
+            self._agents[key] = agent
+            return agent
+
+    async def _find_existing(self, agents_client: AgentsClient, name: str, definition_hash: str) -> Optional[Agent]:
+        """Busca en el proyecto un agente con el mismo nombre y huella"""
+        async for agent in agents_client.list_agents():
+            metadata = agent.metadata or {}
+            if agent.name == name and metadata.get(DEFINITION_HASH_KEY) == definition_hash:
+                return agent
+        return None
+
+    async def _retire_previous_versions(self, agents_client: AgentsClient, name: str, definition_hash: str) -> None:
+        """
+        Elimina las versiones anteriores de un agente registradas en este proceso.
+        Un fallo no interrumpe la solicitud: el barrido de agentes huérfanos lo reintenta.
+        """
+        stale_keys = [k for k in self._agents if k[0] == name and k[1] != definition_hash]
+        for stale_key in stale_keys:
+            stale_agent = self._agents.pop(stale_key)
+            try:
+                await agents_client.delete_agent(stale_agent.id)
+            except Exception as e:
+                metrics.increment("agent_delete_failures_total", agent=name)
+                logger.warning("⚠️ No se pudo eliminar la versión anterior de '%s' (%s): %s", name, stale_agent.id, e)
+                continue
+            logger.info("🗑️ Versión anterior de '%s' eliminada: %s", name, stale_agent.id)
+
+    async def _claim(self, agents_client: AgentsClient, agent: Agent, definition_hash: str) -> bool:
+        """Renueva LAST_USED_KEY del agente; un fallo se reintenta en el próximo reclamo"""
+        try:
+            await agents_client.update_agent(agent.id, metadata=agent_metadata(definition_hash))
+        except Exception as e:
+            metrics.increment("agent_claim_failures_total", agent=agent.name)
+            logger.warning("⚠️ No se pudo reclamar el agente '%s' (%s): %s", agent.name, agent.id, e)
+            return False
+        return True
+
+    async def claim_current_versions(self, agents_client: AgentsClient) -> int:
+        """Reclama los agentes vigentes en este proceso; retorna cuántos se renovaron"""
+        claimed = 0
+        for (_, definition_hash), agent in list(self._agents.items()):
+            claimed += await self._claim(agents_client, agent, definition_hash)
+        return claimed
+
+    def forget(self, *agent_ids: str) -> bool:
+        """
+        Olvida los agentes con esos ids (borrados en el servicio fuera de este
+        proceso); el próximo get_or_create los vuelve a buscar o crear.
+        Retorna si alguno estaba en el registro.
+        """
+        stale_keys = [k for k, agent in self._agents.items() if agent.id in agent_ids]
+        for stale_key in stale_keys:
+            del self._agents[stale_key]
+            metrics.increment("agent_registry_evictions_total", agent=stale_key[0])
+        return bool(stale_keys)
+
+    def current_versions(self) -> Dict[str, Tuple[str, str]]:
+        """Retorna {nombre: (huella, agent_id)} de los agentes vigentes en este proceso"""
+        return {name: (definition_hash, agent.id) for (name, definition_hash), agent in self._agents.items()}
+
+
+# Registro global del proceso
+_registry = AgentRegistry()
+
+
+async def get_or_create_agent(
+        agents_client: AgentsClient,
+        name: str,
+        model: str,
+        instructions: str,
+        tools: Optional[List] = None,
+) -> Agent:
+    """Obtiene un agente del registro global"""
+    with timing.stage("agent_registry"):
+        return await _registry.get_or_create(agents_client, name, model, instructions, tools)
+
+
+def forget(*agent_ids: str) -> bool:
+    """Olvida agentes del registro global (ver AgentRegistry.forget)"""
+    return _registry.forget(*agent_ids)
+
+
+async def run_with_agent(resolve: Callable[[], Awaitable[Agent]], run: Callable[[Agent], Awaitable[T]]) -> T:
+    """
+    Ejecuta run con el agente que retorna resolve. Si el servicio responde
+    ResourceNotFoundError (el agente cacheado se borró), lo olvida, lo vuelve
+    a resolver y reintenta una sola vez.
+    """
+    agent = await resolve()
+    try:
+        return await run(agent)
+    except ResourceNotFoundError as e:
+        if not forget(agent.id):
+            raise
+        logger.warning("⚠️ El agente '%s' (%s) ya no existe; se vuelve a resolver: %s", agent.name, agent.id, e)
+    return await run(await resolve())
+
+
+async def claim_current_versions(agents_client: AgentsClient) -> int:
+    """Reclama los agentes vigentes del registro global (ver AgentRegistry.claim_current_versions)"""
+    return await _registry.claim_current_versions(agents_client)
+
+
+def current_versions() -> Dict[str, Tuple[str, str]]:
+    """Agentes vigentes del registro global (ver AgentRegistry.current_versions)"""
+    return _registry.current_versions()
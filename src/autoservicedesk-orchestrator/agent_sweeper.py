@@ -0,0 +1,121 @@
+"""
+Barrido periódico de agentes huérfanos en el proyecto
+"""
+from azure.ai.agents.aio import AgentsClient
+from azure.ai.agents.models import Agent
+import asyncio
+import contextvars
+import time
+from typing import List, Optional, Sequence
+
+import agent_registry
+import clients
+import config
+import logs
+import metrics
+
+logger = logs.get_logger(__name__)
+
+
+class AgentSweeper:
+    """
+    Elimina agentes creados por el orquestador que quedaron huérfanos
+    (versiones antiguas, fallos al borrar o procesos caídos).
+
+    Un agente es candidato si su nombre empieza por uno de los prefijos y
+    ningún proceso vivo lo reclamó en los últimos max_age segundos: cada
+    proceso renueva la metadata LAST_USED_KEY de sus agentes vigentes en
+    cada barrido, así que durante un despliegue gradual las versiones que
+    usan los procesos de otros hosts no se borran. Sin reclamo cuenta la
+    fecha de creación. Nunca se borra la versión vigente en el registro.
+    max_age debe ser varias veces interval.
+    """
+
+    def __init__(self, prefixes: Sequence[str], max_age: int, interval: float):
+        self._prefixes = tuple(p for p in prefixes if p)
+        self._max_age = max_age
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def _is_stale(self, agent: Agent, now: float) -> bool:
+        name = agent.name or ""
+        if not name.startswith(self._prefixes):
+            return False
+        current = agent_registry.current_versions().get(name)
+        if current is not None and agent.id == current[1]:
+            return False
+        return now - _last_used(agent, now) >= self._max_age
+
+    async def sweep(self, agents_client: AgentsClient) -> int:
+        """Elimina los agentes huérfanos y retorna cuántos se borraron"""
+        now = time.time()
+        stale: List[Agent] = [a async for a in agents_client.list_agents(limit=100) if self._is_stale(a, now)]
+
+        deleted = 0
+        for agent in stale:
+            try:
+                await agents_client.delete_agent(agent.id)
+            except Exception as e:
+                metrics.increment("agent_delete_failures_total", agent=agent.name)
+                logger.warning("⚠️ No se pudo eliminar el agente huérfano '%s' (%s): %s", agent.name, agent.id, e)
+                continue
+            deleted += 1
+            metrics.increment("agents_swept_total", agent=agent.name)
+            logger.info("🧹 Agente huérfano eliminado: '%s' (%s)", agent.name, agent.id)
+        return deleted
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                agents_client = await clients.get_agents_client()
+                # Primero se renueva el reclamo propio, que también protege estos agentes de otros hosts
+                await agent_registry.claim_current_versions(agents_client)
+                await self.sweep(agents_client)
+            except Exception:
+                logger.exception("Error en el barrido de agentes")
+            await asyncio.sleep(self._interval)
+
+    def start(self) -> None:
+        # Contexto vacío: el barrido no pertenece a ninguna solicitud
+        self._task = contextvars.Context().run(asyncio.create_task, self._run())
+        logger.info("🧹 Barrido de agentes iniciado (prefijos %s)", ", ".join(self._prefixes))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def _last_used(agent: Agent, now: float) -> float:
+    """Último reclamo de un proceso vivo o, sin reclamo válido, la creación del agente"""
+    try:
+        return float((agent.metadata or {})[agent_registry.LAST_USED_KEY])
+    except (KeyError, ValueError):
+        return agent.created_at.timestamp() if agent.created_at else now
+
+
+_sweeper: Optional[AgentSweeper] = None
+
+
+async def start() -> None:
+    """Inicia el barrido periódico (al iniciar la aplicación)"""
+    global _sweeper
+    if config.AGENT_SWEEPER_ENABLED and _sweeper is None:
+        if config.AGENT_SWEEPER_MAX_AGE_SECONDS < 2 * config.AGENT_SWEEPER_INTERVAL_SECONDS:
+            logger.warning("⚠️ AGENT_SWEEPER_MAX_AGE_SECONDS es menor que dos intervalos de barrido: "
+                           "se podrían borrar agentes en uso por otros procesos")
+        _sweeper = AgentSweeper(
+            config.AGENT_SWEEPER_NAME_PREFIXES,
+            config.AGENT_SWEEPER_MAX_AGE_SECONDS,
+            config.AGENT_SWEEPER_INTERVAL_SECONDS,
+        )
+        _sweeper.start()
+
+
+async def stop() -> None:
+    """Detiene el barrido periódico (al apagar la aplicación)"""
+    global _sweeper
+    if _sweeper is not None:
+        await _sweeper.stop()
+        _sweeper = None
@@ -1,6 +1,8 @@
 from azure.ai.agents.models import ConnectedAgentTool, McpTool
 
-def create_mcp_devops_agent(agents_client, model_deployment: str, mcp_server_url: str):
+from agent_registry import get_or_create_agent
+
+async def create_mcp_devops_agent(agents_client, model_deployment: str, mcp_server_url: str):
     mcp_server_label = "external_tools"
     mcp_tool = McpTool(
         server_label=mcp_server_label,
@@ -55,9 +57,10 @@ def create_mcp_devops_agent(agents_client, model_deployment: str, mcp_server_url
     
     """
 
-    agent = agents_client.create_agent(
-        model=model_deployment,
+    agent = await get_or_create_agent(
+        agents_client,
         name=mcp_agent_name,
+        model=model_deployment,
         instructions=mcp_agent_instructions,
         tools=mcp_tool.definitions,
     )
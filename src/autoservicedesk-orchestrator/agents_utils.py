@@ -1,53 +1,72 @@
 """
 Funciones auxiliares para agentes
 """
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import MessageRole, ListSortOrder
+from azure.ai.agents.aio import AgentsClient
+from azure.ai.agents.models import MessageRole
 import json
 from typing import Dict
 
-
-def interpret_confirmation(agents_client: AgentsClient, model_deployment: str, user_text: str) -> str:
+import metrics
+import thread_manager
+import timing
+import ux_messages
+from agent_registry import get_or_create_agent, run_with_agent
+from confirmation import classify_confirmation
+from run_utils import get_last_agent_message, track_run
+
+CONFIRMATION_AGENT_INSTRUCTIONS = (
+    "Eres un clasificador. Dado el último mensaje del usuario, "
+    "responde SOLO en JSON:\n"
+    '{ "confirmation": "yes" | "no" | "unclear" }\n'
+    "No incluyas ningún texto adicional."
+)
+
+UX_AGENT_INSTRUCTIONS = (
+    "Eres un asistente de Service Desk. Recibirás un JSON con un campo 'mode', "
+    "un objeto 'policy_decision' y, opcionalmente, 'extra_context'. "
+    "Devuelve una respuesta breve, clara y empática en español para el usuario final. "
+    "No muestres el JSON ni menciones que es un JSON."
+)
+
+
+async def interpret_confirmation(agents_client: AgentsClient, model_deployment: str, user_text: str) -> str:
     """
     Interpreta si el usuario dijo sí, no, o no está claro.
+    Primero intenta el clasificador local y solo usa el agente si la respuesta es ambigua.
     Retorna: "yes", "no", o "unclear"
     """
-    confirmation_agent = agents_client.create_agent(
-        model=model_deployment,
-        name="confirmation-agent",
-        instructions=(
-            "Eres un clasificador. Dado el último mensaje del usuario, "
-            "responde SOLO en JSON:\n"
-            '{ "confirmation": "yes" | "no" | "unclear" }\n'
-            "No incluyas ningún texto adicional."
-        ),
-    )
-
-    thread = agents_client.threads.create()
-    agents_client.messages.create(
-        thread_id=thread.id,
-        role=MessageRole.USER,
-        content=user_text,
-    )
-
-    run = agents_client.runs.create_and_process(
-        thread_id=thread.id,
-        agent_id=confirmation_agent.id,
-    )
-
-    messages = agents_client.messages.list(
-        thread_id=thread.id,
-        order=ListSortOrder.DESCENDING,
-    )
-
-    msg = next(
-        (m for m in messages if m.role == MessageRole.AGENT and m.text_messages),
-        None,
-    )
+    local_decision = classify_confirmation(user_text)
+    if local_decision is not None:
+        metrics.increment("confirmation_classifier_total", result="local")
+        return local_decision
+
+    metrics.increment("confirmation_classifier_total", result="llm_fallback")
+
+    def confirmation_agent():
+        return get_or_create_agent(
+            agents_client,
+            name="confirmation-agent",
+            model=model_deployment,
+            instructions=CONFIRMATION_AGENT_INSTRUCTIONS,
+        )
+
+    with timing.stage("confirmation_run"):
+        async with thread_manager.ephemeral_thread(agents_client) as thread_id:
+            await agents_client.messages.create(
+                thread_id=thread_id,
+                role=MessageRole.USER,
+                content=user_text,
+            )
+
+            with track_run(agents_client, thread_id):
+                run = await run_with_agent(confirmation_agent, lambda agent: agents_client.runs.create_and_process(
+                    thread_id=thread_id,
+                    agent_id=agent.id,
+                ))
+
+            msg = await get_last_agent_message(agents_client, thread_id, run.id)
     raw = msg.text_messages[-1].text.value if msg else "{}"
 
-    agents_client.delete_agent(confirmation_agent.id)
-
     try:
         data = json.loads(raw)
         return data.get("confirmation", "unclear")
@@ -55,58 +74,60 @@ def interpret_confirmation(agents_client: AgentsClient, model_deployment: str, u
         return "unclear"
 
 
-def generate_ux_message(agents_client: AgentsClient, model_deployment: str, state: Dict) -> str:
+async def generate_ux_message(agents_client: AgentsClient, model_deployment: str, state: Dict) -> str:
     """
-    Genera un mensaje amigable para el usuario a partir de un estado estructurado
+    Genera un mensaje amigable para el usuario a partir de un estado estructurado.
+    Usa una plantilla o una frase cacheada y solo llama al agente UX si ninguna aplica.
     """
-    ux_agent = agents_client.create_agent(
-        model=model_deployment,
-        name="ux-agent",
-        instructions=(
-            "Eres un asistente de Service Desk. Recibirás un JSON con un campo 'mode', "
-            "un objeto 'policy_decision' y, opcionalmente, 'extra_context'. "
-            "Devuelve una respuesta breve, clara y empática en español para el usuario final. "
-            "No muestres el JSON ni menciones que es un JSON."
-        ),
-    )
-
-    thread = agents_client.threads.create()
-    agents_client.messages.create(
-        thread_id=thread.id,
-        role=MessageRole.USER,
-        content=json.dumps(state, ensure_ascii=False),
-    )
-
-    run = agents_client.runs.create_and_process(
-        thread_id=thread.id,
-        agent_id=ux_agent.id,
-    )
-
-    messages = agents_client.messages.list(
-        thread_id=thread.id,
-        order=ListSortOrder.DESCENDING,
-    )
-
-    msg = next(
-        (m for m in messages if m.role == MessageRole.AGENT and m.text_messages),
-        None,
-    )
+    text = ux_messages.render_template(state)
+    if text is not None:
+        metrics.increment("ux_messages_total", source="template", mode=state.get("mode"))
+        return text
+
+    text = ux_messages.get_cached_phrasing(state)
+    if text is not None:
+        metrics.increment("ux_messages_total", source="cache", mode=state.get("mode"))
+        return text
+
+    metrics.increment("ux_messages_total", source="llm", mode=state.get("mode"))
+
+    def ux_agent():
+        return get_or_create_agent(
+            agents_client,
+            name="ux-agent",
+            model=model_deployment,
+            instructions=UX_AGENT_INSTRUCTIONS,
+        )
+
+    with timing.stage("ux_run"):
+        async with thread_manager.ephemeral_thread(agents_client) as thread_id:
+            await agents_client.messages.create(
+                thread_id=thread_id,
+                role=MessageRole.USER,
+                content=json.dumps(state, ensure_ascii=False),
+            )
+
+            with track_run(agents_client, thread_id):
+                run = await run_with_agent(ux_agent, lambda agent: agents_client.runs.create_and_process(
+                    thread_id=thread_id,
+                    agent_id=agent.id,
+                ))
+
+            msg = await get_last_agent_message(agents_client, thread_id, run.id)
     text = msg.text_messages[-1].text.value if msg else ""
-
-    agents_client.delete_agent(ux_agent.id)
+    ux_messages.cache_phrasing(state, text)
     return text
 
 
-def create_triage_agent(agents_client: AgentsClient, model_deployment: str, tools: list):
-    """Crea el agente de Triage con las herramientas especificadas"""
+async def create_triage_agent(agents_client: AgentsClient, model_deployment: str, tools: list):
+    """Obtiene el agente de Triage con las herramientas especificadas"""
     from prompts.prompts import TRIAGE_AGENT_INSTRUCTIONS
 
-    print("🎯 Creando Triage Agent...")
-    triage_agent = agents_client.create_agent(
-        model=model_deployment,
+    triage_agent = await get_or_create_agent(
+        agents_client,
         name="triage-support-agent",
+        model=model_deployment,
         instructions=TRIAGE_AGENT_INSTRUCTIONS,
         tools=tools,
     )
-    print(f"✅ Triage Agent creado: {triage_agent.id}")
     return triage_agent
\ No newline at end of file
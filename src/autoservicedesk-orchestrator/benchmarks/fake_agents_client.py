@@ -0,0 +1,321 @@
+"""
+AgentsClient falso en memoria para medir el orquestador sin Azure
+
+Implementa las operaciones del SDK que usa el orquestador con latencia
+simulada y respuestas guionizadas por nombre de agente, y cuenta las
+llamadas al SDK de cada solicitud.
+"""
+import asyncio
+import itertools
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from azure.ai.agents.models import Agent, ListSortOrder, RunStep, ThreadMessage, ThreadRun
+from azure.core.exceptions import ResourceNotFoundError
+
+# Contador de llamadas al SDK de la solicitud en curso (ver count_calls)
+_request_calls: ContextVar[Optional[Dict[str, int]]] = ContextVar("fake_request_calls", default=None)
+
+
+@dataclass
+class LatencyModel:
+    """
+    Distribución de latencia de una operación en milisegundos.
+    kind: "constant", "uniform" (mean ± jitter) o "lognormal" (mediana mean, sigma jitter).
+    """
+    mean_ms: float = 0.0
+    jitter: float = 0.0
+    kind: str = "constant"
+
+    def sample(self) -> float:
+        """Retorna una latencia en segundos"""
+        if self.mean_ms <= 0:
+            return 0.0
+        if self.kind == "uniform":
+            value = random.uniform(self.mean_ms - self.jitter, self.mean_ms + self.jitter)
+        elif self.kind == "lognormal":
+            value = random.lognormvariate(0, self.jitter) * self.mean_ms
+        else:
+            value = self.mean_ms
+        return max(value, 0.0) / 1000
+
+
+@dataclass
+class ScriptedReply:
+    """Respuesta de un agente: texto final y agentes conectados que llamó"""
+    text: str
+    connected_agents: List[str] = field(default_factory=list)
+    status: str = "completed"
+
+
+# Responde según el nombre del agente y el contenido del último mensaje del usuario
+Responder = Callable[[str, str], ScriptedReply]
+
+
+class _Pager:
+    """
+    Iterable asíncrono como los que retornan los list() del SDK: la llamada
+    (y su latencia) ocurre al empezar a iterar, no al crear el paginador.
+    """
+
+    def __init__(self, items: List, on_fetch: Callable[[], Awaitable[None]]):
+        self._items = items
+        self._on_fetch = on_fetch
+
+    def __aiter__(self) -> AsyncIterator:
+        return self._iterate()
+
+    async def _iterate(self):
+        await self._on_fetch()
+        for item in self._items:
+            yield item
+
+
+class _Operations:
+    """Agrupa operaciones como los sub-clientes del SDK (threads, messages, ...)"""
+
+    def __init__(self, **operations):
+        self.__dict__.update(operations)
+
+
+class FakeAgentsClient:
+    """
+    Sustituto en proceso de azure.ai.agents.aio.AgentsClient.
+
+    latencies asigna un LatencyModel por operación ("runs.create_and_process",
+    "messages.list", ...); "default" aplica al resto. Los ids que no son
+    agentes creados con create_agent (Policy Guard, Knowledge Base) se
+    resuelven por su id en agent_names.
+    """
+
+    def __init__(
+            self,
+            responder: Responder,
+            latencies: Optional[Dict[str, LatencyModel]] = None,
+            agent_names: Optional[Dict[str, str]] = None,
+    ):
+        self._responder = responder
+        self._latencies = latencies or {}
+        self._agent_names = dict(agent_names or {})
+        self._ids = itertools.count(1)
+        self._agents: Dict[str, Agent] = {}
+        self._threads: Dict[str, List[ThreadMessage]] = {}
+        self._run_steps: Dict[str, List[RunStep]] = {}
+        self._runs: Dict[str, List[ThreadRun]] = {}
+        self.calls: Dict[str, int] = {}
+
+        self.threads = _Operations(create=self._create_thread, delete=self._delete_thread)
+        self.messages = _Operations(
+            create=self._create_message,
+            list=self._list_messages,
+            delete=self._delete_message,
+        )
+        self.runs = _Operations(
+            create_and_process=self._create_and_process,
+            list=self._list_runs,
+            cancel=self._cancel_run,
+        )
+        self.run_steps = _Operations(list=self._list_run_steps)
+
+    def _next_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids)}"
+
+    async def _call(self, operation: str) -> None:
+        self.calls[operation] = self.calls.get(operation, 0) + 1
+        request_calls = _request_calls.get()
+        if request_calls is not None:
+            request_calls[operation] = request_calls.get(operation, 0) + 1
+
+        latency = self._latencies.get(operation) or self._latencies.get("default")
+        if latency is not None:
+            delay = latency.sample()
+            if delay:
+                await asyncio.sleep(delay)
+
+    # --- agentes ---
+
+    async def create_agent(self, model: str, name: str, instructions: str, tools=None, metadata=None, **kwargs) -> Agent:
+        await self._call("create_agent")
+        agent = Agent({
+            "id": self._next_id("asst"),
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": name,
+            "model": model,
+            "instructions": instructions,
+            "metadata": metadata or {},
+        })
+        self._agents[agent.id] = agent
+        return agent
+
+    async def update_agent(self, agent_id: str, metadata=None, **kwargs) -> Agent:
+        await self._call("update_agent")
+        agent = self._agents[agent_id]
+        if metadata is not None:
+            agent.metadata = metadata
+        return agent
+
+    async def delete_agent(self, agent_id: str, **kwargs) -> None:
+        await self._call("delete_agent")
+        self._agents.pop(agent_id, None)
+
+    def list_agents(self, **kwargs) -> _Pager:
+        return self._paged("list_agents", list(self._agents.values()))
+
+    # --- threads y mensajes ---
+
+    async def _create_thread(self, **kwargs):
+        await self._call("threads.create")
+        thread_id = self._next_id("thread")
+        self._threads[thread_id] = []
+        return _Operations(id=thread_id)
+
+    async def _delete_thread(self, thread_id: str, **kwargs) -> None:
+        await self._call("threads.delete")
+        self._threads.pop(thread_id, None)
+
+    def _new_message(self, thread_id: str, role: str, text: str, run_id: Optional[str] = None) -> ThreadMessage:
+        return ThreadMessage({
+            "id": self._next_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "run_id": run_id,
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        })
+
+    async def _create_message(self, thread_id: str, role, content: str, **kwargs) -> ThreadMessage:
+        await self._call("messages.create")
+        message = self._new_message(thread_id, "user", content)
+        self._threads[thread_id].append(message)
+        return message
+
+    def _list_messages(
+            self,
+            thread_id: str,
+            run_id: Optional[str] = None,
+            limit: Optional[int] = None,
+            order=ListSortOrder.DESCENDING,
+            **kwargs,
+    ) -> _Pager:
+        messages = list(self._threads.get(thread_id, []))
+        if order == ListSortOrder.DESCENDING:
+            messages.reverse()
+        if run_id is not None:
+            messages = [m for m in messages if m.run_id == run_id]
+        if limit is not None:
+            messages = messages[:limit]
+        return self._paged("messages.list", messages)
+
+    async def _delete_message(self, thread_id: str, message_id: str, **kwargs) -> None:
+        await self._call("messages.delete")
+        self._threads[thread_id] = [m for m in self._threads.get(thread_id, []) if m.id != message_id]
+
+    # --- runs ---
+
+    def _agent_name(self, agent_id: str) -> str:
+        agent = self._agents.get(agent_id)
+        if agent is not None:
+            return agent.name
+        if agent_id not in self._agent_names:
+            raise ResourceNotFoundError(f"No assistant found with id '{agent_id}'.")
+        return self._agent_names[agent_id]
+
+    def _agent_id_by_name(self, name: str) -> str:
+        for agent_id, agent_name in self._agent_names.items():
+            if agent_name == name:
+                return agent_id
+        for agent in self._agents.values():
+            if agent.name == name:
+                return agent.id
+        return name
+
+    async def _create_and_process(self, thread_id: str, agent_id: str, **kwargs) -> ThreadRun:
+        await self._call("runs.create_and_process")
+        run_id = self._next_id("run")
+
+        user_messages = [m for m in self._threads[thread_id] if m.role == "user"]
+        last_user_text = user_messages[-1].text_messages[-1].text.value if user_messages else ""
+        reply = self._responder(self._agent_name(agent_id), last_user_text)
+
+        now = int(time.time())
+        self._run_steps[run_id] = [
+            RunStep({
+                "id": self._next_id("step"),
+                "object": "thread.run.step",
+                "type": "tool_calls",
+                "status": "completed",
+                "run_id": run_id,
+                "thread_id": thread_id,
+                "created_at": now,
+                "completed_at": now,
+                "step_details": {
+                    "type": "tool_calls",
+                    "tool_calls": [{
+                        "id": self._next_id("call"),
+                        "type": "connected_agent",
+                        "connected_agent": {
+                            "assistant_id": self._agent_id_by_name(connected),
+                            "name": connected,
+                        },
+                    }],
+                },
+            })
+            for connected in reply.connected_agents
+        ]
+        self._threads[thread_id].append(self._new_message(thread_id, "assistant", reply.text, run_id))
+
+        run = ThreadRun({
+            "id": run_id,
+            "object": "thread.run",
+            "thread_id": thread_id,
+            "assistant_id": agent_id,
+            "status": reply.status,
+        })
+        self._runs.setdefault(thread_id, []).append(run)
+        return run
+
+    def _list_runs(self, thread_id: str, limit: Optional[int] = None, order=ListSortOrder.DESCENDING, **kwargs) -> _Pager:
+        runs = list(self._runs.get(thread_id, []))
+        if order == ListSortOrder.DESCENDING:
+            runs.reverse()
+        return self._paged("runs.list", runs[:limit] if limit is not None else runs)
+
+    async def _cancel_run(self, thread_id: str, run_id: str, **kwargs) -> ThreadRun:
+        await self._call("runs.cancel")
+        for run in self._runs.get(thread_id, []):
+            if run.id == run_id:
+                run.status = "cancelled"
+                return run
+        raise ValueError(f"Run {run_id} no encontrado")
+
+    def _list_run_steps(self, thread_id: str, run_id: str, **kwargs) -> _Pager:
+        return self._paged("run_steps.list", list(self._run_steps.get(run_id, [])))
+
+    def _paged(self, operation: str, items: List) -> _Pager:
+        return _Pager(items, lambda: self._call(operation))
+
+    async def close(self) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+@contextmanager
+def count_calls():
+    """Cuenta las llamadas al SDK hechas dentro del bloque (por tarea asyncio)"""
+    calls: Dict[str, int] = {}
+    token = _request_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _request_calls.reset(token)
@@ -0,0 +1,245 @@
+"""
+Benchmark del orquestador contra el AgentsClient falso
+
+Recorre cada rama de process_request (auto-aprobación, aprobación
+requerida, denegación, preguntas y confirmación sí/no/ambigua) y reporta latencia
+p50/p95/p99, throughput y llamadas al SDK por solicitud.
+
+Uso (desde src/autoservicedesk-orchestrator):
+    python -m benchmarks.run_benchmark --iterations 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+POLICY_AGENT_ID = "policy-guard"
+KNOWLEDGE_BASE_AGENT_ID = "knowledge-base"
+MCP_AGENT_NAME = "mcp_research_agent"
+USER_EMAIL = "josue.atehortua@empresa.com"
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: str
+    # Solicitud previa (no medida) que deja el thread esperando confirmación
+    setup_request: Optional[str] = None
+
+
+SCENARIOS = [
+    Scenario("auto_approve", "Necesito acceso de lectura al repositorio de documentación"),
+    Scenario("needs_approval", "Necesito permisos de administrador en el pipeline de builds"),
+    Scenario("deny", "Necesito acceso a la base de datos de nómina"),
+    Scenario("kb_question", "¿Cómo instalo Visual Studio?"),
+    # Preguntas que pasan por el Policy Guard con --no-intent-routing (ver --speculative)
+    Scenario("guarded_question", "¿Cómo configuro la VPN en Windows?"),
+    Scenario("guarded_denied", "¿Cuáles son los salarios de la nómina del equipo?"),
+    Scenario("confirm_yes", "sí", setup_request="Necesito permisos de administrador en el pipeline de builds"),
+    Scenario("confirm_no", "no", setup_request="Necesito permisos de administrador en el pipeline de builds"),
+    Scenario("confirm_unclear", "mmm déjame pensarlo", setup_request="Necesito permisos de administrador en el pipeline de builds"),
+]
+
+POLICY_DECISIONS = {
+    "Necesito acceso de lectura al repositorio de documentación": "AUTO_APROBAR",
+    "Necesito permisos de administrador en el pipeline de builds": "REQUIERE_APROBACION",
+    "Necesito acceso a la base de datos de nómina": "DENEGAR",
+    "¿Cuáles son los salarios de la nómina del equipo?": "DENEGAR",
+}
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(s.name for s in SCENARIOS),
+                        help="Escenarios separados por coma")
+    parser.add_argument("--iterations", type=int, default=50, help="Solicitudes medidas por escenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Solicitudes simultáneas")
+    parser.add_argument("--warmup", type=int, default=1, help="Solicitudes no medidas por escenario")
+    parser.add_argument("--run-ms", type=float, default=200, help="Latencia media de runs.create_and_process")
+    parser.add_argument("--api-ms", type=float, default=20, help="Latencia media del resto de llamadas al SDK")
+    parser.add_argument("--distribution", choices=["constant", "uniform", "lognormal"], default="lognormal")
+    parser.add_argument("--jitter", type=float, default=0.3,
+                        help="Sigma (lognormal) o fracción de la media (uniform)")
+    parser.add_argument("--local-shortcuts", action="store_true",
+                        help="Activa reglas locales, cachés de políticas y de Knowledge Base e índice FAQ "
+                             "(por defecto se mide el camino completo)")
+    parser.add_argument("--speculative", action="store_true",
+                        help="Consulta la Knowledge Base en paralelo al Policy Guard para preguntas")
+    parser.add_argument("--no-intent-routing", action="store_true",
+                        help="Las preguntas también pasan por el Policy Guard (INTENT_ROUTING_ENABLED=false)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte en JSON")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    """Fija la configuración antes de importar los módulos del orquestador"""
+    shortcuts = "true" if args.local_shortcuts else "false"
+    os.environ["POLICY_AGENT_ID"] = POLICY_AGENT_ID
+    os.environ["KNOWLEDGE_BASE_AGENT_ID"] = KNOWLEDGE_BASE_AGENT_ID
+    os.environ["POLICY_RULES_ENABLED"] = shortcuts
+    os.environ["POLICY_CACHE_ENABLED"] = shortcuts
+    os.environ["KB_CACHE_ENABLED"] = shortcuts
+    os.environ["FAQ_INDEX_ENABLED"] = shortcuts
+    os.environ["SPECULATIVE_KB_ENABLED"] = "true" if args.speculative else "false"
+    os.environ["INTENT_ROUTING_ENABLED"] = "false" if args.no_intent_routing else "true"
+    os.environ["CONTEXT_BACKEND"] = "memory"
+    os.environ.setdefault("MODEL_DEPLOYMENT_NAME", "benchmark-model")
+    os.environ.setdefault("MCP_SERVER_URL", "http://localhost:8000/mcp")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def responder(agent_name: str, content: str):
+    """Respuestas guionizadas de cada agente"""
+    from benchmarks.fake_agents_client import ScriptedReply
+
+    if agent_name == POLICY_AGENT_ID:
+        request = json.loads(content)["user_request"]
+        decision = POLICY_DECISIONS.get(request, "AUTO_APROBAR")
+        return ScriptedReply(json.dumps({
+            "decision": decision,
+            "risk_level": "medium",
+            "reason": "Decisión guionizada del benchmark.",
+            "policy_refs": ["POL-BENCH-001"],
+            "required_approver_role": "IT_Manager",
+        }))
+
+    if agent_name == "triage-support-agent":
+        payload = json.loads(content)
+        if payload.get("mode") == "CREATE_APPROVAL_TICKET":
+            return ScriptedReply("✅ Ticket de aprobación creado.", connected_agents=[MCP_AGENT_NAME])
+        return ScriptedReply("Estos son los pasos a seguir.", connected_agents=[KNOWLEDGE_BASE_AGENT_ID])
+
+    if agent_name == "confirmation-agent":
+        return ScriptedReply(json.dumps({"confirmation": "unclear"}))
+
+    if agent_name == "ux-agent":
+        return ScriptedReply("Mensaje para el usuario.")
+
+    return ScriptedReply(f"Respuesta de {agent_name}")
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Percentil por rango más cercano"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+async def run_scenario(scenario: Scenario, args: argparse.Namespace) -> Dict:
+    from benchmarks.fake_agents_client import count_calls
+    from orchestrator import process_request
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def prepare_thread() -> Optional[str]:
+        if scenario.setup_request is None:
+            return None
+        async with semaphore:
+            result = await process_request(scenario.setup_request, USER_EMAIL)
+        return result["thread_id"]
+
+    async def measured(thread_id: Optional[str]) -> Dict:
+        async with semaphore:
+            with count_calls() as calls:
+                start = time.perf_counter()
+                try:
+                    result = await process_request(scenario.request, USER_EMAIL, thread_id)
+                    status = str(getattr(result["run_status"], "value", result["run_status"]))
+                except Exception as e:
+                    status = f"error: {e}"
+                elapsed = time.perf_counter() - start
+        return {"elapsed": elapsed, "status": status, "calls": sum(calls.values()), "by_operation": dict(calls)}
+
+    for _ in range(args.warmup):
+        await measured(await prepare_thread())
+
+    thread_ids = await asyncio.gather(*(prepare_thread() for _ in range(args.iterations)))
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(measured(thread_id) for thread_id in thread_ids))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(s["elapsed"] * 1000 for s in samples)
+    operations: Dict[str, int] = {}
+    for sample in samples:
+        for operation, count in sample["by_operation"].items():
+            operations[operation] = operations.get(operation, 0) + count
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[sample["status"]] = statuses.get(sample["status"], 0) + 1
+
+    return {
+        "scenario": scenario.name,
+        "requests": len(samples),
+        "statuses": statuses,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "throughput_rps": round(len(samples) / wall, 1) if wall else 0.0,
+        "sdk_calls_per_request": round(sum(s["calls"] for s in samples) / len(samples), 2),
+        "sdk_calls_by_operation": {op: round(n / len(samples), 2) for op, n in sorted(operations.items())},
+    }
+
+
+def print_report(results: List[Dict], args: argparse.Namespace) -> None:
+    print(
+        f"\nrun={args.run_ms}ms api={args.api_ms}ms ({args.distribution}) "
+        f"iterations={args.iterations} concurrency={args.concurrency} "
+        f"local_shortcuts={args.local_shortcuts} speculative={args.speculative}\n"
+    )
+    header = f"{'escenario':<18}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'SDK/req':>9}  estados"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        statuses = ", ".join(f"{k}={v}" for k, v in r["statuses"].items())
+        print(
+            f"{r['scenario']:<18}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+            f"{r['throughput_rps']:>9}{r['sdk_calls_per_request']:>9}  {statuses}"
+        )
+    print()
+    for r in results:
+        calls = ", ".join(f"{op}={n}" for op, n in r["sdk_calls_by_operation"].items())
+        print(f"{r['scenario']:<18}{calls}")
+
+
+async def main(argv: List[str]) -> None:
+    args = parse_args(argv)
+    random.seed(args.seed)
+    configure_environment(args)
+
+    import clients
+    from benchmarks.fake_agents_client import FakeAgentsClient, LatencyModel
+
+    def latency(mean_ms: float) -> LatencyModel:
+        jitter = args.jitter if args.distribution == "lognormal" else mean_ms * args.jitter
+        return LatencyModel(mean_ms, jitter, args.distribution)
+
+    client = FakeAgentsClient(
+        responder,
+        latencies={
+            "runs.create_and_process": latency(args.run_ms),
+            "default": latency(args.api_ms),
+        },
+        agent_names={POLICY_AGENT_ID: POLICY_AGENT_ID, KNOWLEDGE_BASE_AGENT_ID: KNOWLEDGE_BASE_AGENT_ID},
+    )
+    # El orquestador obtiene el cliente compartido de clients.get_agents_client()
+    clients._agents_client = client
+
+    selected = set(args.scenarios.split(","))
+    results = [await run_scenario(s, args) for s in SCENARIOS if s.name in selected]
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_report(results, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
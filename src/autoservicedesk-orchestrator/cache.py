@@ -0,0 +1,99 @@
+"""
+Caché en memoria acotada con expiración (TTL) y desalojo LRU
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+
+def fingerprint(value: Any) -> str:
+    """Huella estable de un valor serializable a JSON"""
+    raw = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """
+    Caché con tamaño máximo y TTL opcional.
+
+    Al superar max_size se desaloja la entrada usada hace más tiempo; las
+    entradas con más de ttl_seconds desde su escritura se descartan al leerlas.
+    Con sliding=True el TTL cuenta desde el último acceso (TTL de inactividad).
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: Optional[float] = None, sliding: bool = False):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.sliding = sliding
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _is_expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at > self.ttl_seconds
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor cacheado o None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self._is_expired(stored_at, now):
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if self.sliding:
+                self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Guarda un valor, desalojando la entrada menos usada si hace falta"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def purge_expired(self) -> int:
+        """Elimina las entradas expiradas y retorna cuántas se eliminaron"""
+        if self.ttl_seconds is None:
+            return 0
+
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            for key, (_, stored_at) in list(self._entries.items()):
+                if self._is_expired(stored_at, now):
+                    del self._entries[key]
+                    removed += 1
+                elif self.sliding:
+                    # En modo sliding el orden LRU coincide con el del último acceso
+                    break
+            self.expirations += removed
+        return removed
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
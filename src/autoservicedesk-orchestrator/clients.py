@@ -0,0 +1,145 @@
+"""
+Cliente compartido de Azure AI Agents y caché de tokens
+"""
+from azure.ai.agents.aio import AgentsClient
+from azure.core.credentials import AccessToken
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.identity.aio import DefaultAzureCredential
+import aiohttp
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+import config
+import logs
+import metrics
+
+logger = logs.get_logger(__name__)
+
+
+class CachingCredential:
+    """
+    Envuelve una credencial asíncrona y cachea sus tokens por scope.
+
+    Los tokens se renuevan antes de expirar (TOKEN_REFRESH_MARGIN_SECONDS),
+    de modo que ninguna solicitud espera una adquisición en frío.
+    """
+
+    def __init__(self, credential: DefaultAzureCredential, refresh_margin: int):
+        self._credential = credential
+        self._refresh_margin = refresh_margin
+        # (scopes, tenant_id, enable_cae) -> token
+        self._tokens: Dict[Tuple, AccessToken] = {}
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self, token: Optional[AccessToken]) -> bool:
+        return token is not None and token.expires_on - time.time() > self._refresh_margin
+
+    async def get_token(self, *scopes: str, **kwargs) -> AccessToken:
+        """Retorna un token vigente, renovándolo si está cerca de expirar"""
+        metrics.increment("credential_token_requests_total")
+        key = (tuple(sorted(scopes)), kwargs.get("tenant_id"), bool(kwargs.get("enable_cae")))
+
+        if kwargs.get("claims"):
+            # Desafío de claims tras un 401: el token cacheado ya no sirve
+            async with self._lock:
+                self._tokens.pop(key, None)
+                metrics.increment("credential_token_refreshes_total")
+                return await self._credential.get_token(*scopes, **kwargs)
+
+        token = self._tokens.get(key)
+        if self._is_fresh(token):
+            return token
+
+        async with self._lock:
+            token = self._tokens.get(key)
+            if self._is_fresh(token):
+                return token
+
+            token = await self._credential.get_token(*scopes, **kwargs)
+            self._tokens[key] = token
+            metrics.increment("credential_token_refreshes_total")
+            return token
+
+    async def close(self) -> None:
+        await self._credential.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+
+async def _on_connection_create(session, trace_ctx, params) -> None:
+    metrics.increment("agents_http_connections_created_total")
+
+
+async def _on_connection_reuse(session, trace_ctx, params) -> None:
+    metrics.increment("agents_http_connections_reused_total")
+
+
+def _create_transport() -> AioHttpTransport:
+    """Crea el transporte HTTP con un pool de conexiones persistente"""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(_on_connection_create)
+    trace_config.on_connection_reuseconn.append(_on_connection_reuse)
+
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=config.AGENTS_HTTP_POOL_SIZE),
+        trace_configs=[trace_config],
+    )
+    return AioHttpTransport(session=session, session_owner=True)
+
+
+def create_credential() -> CachingCredential:
+    """Crea la credencial de Azure con caché de tokens"""
+    credential = DefaultAzureCredential(
+        exclude_environment_credential=True,
+        exclude_managed_identity_credential=True,
+    )
+    return CachingCredential(credential, config.TOKEN_REFRESH_MARGIN_SECONDS)
+
+
+def create_agents_client(credential: CachingCredential) -> AgentsClient:
+    """Crea el cliente asíncrono de Azure AI Agents"""
+    metrics.increment("agents_client_created_total")
+    return AgentsClient(
+        endpoint=config.PROJECT_ENDPOINT,
+        credential=credential,
+        transport=_create_transport(),
+    )
+
+
+# Cliente compartido por todo el proceso
+_credential: Optional[CachingCredential] = None
+_agents_client: Optional[AgentsClient] = None
+
+
+async def startup() -> None:
+    """Crea el cliente compartido (se llama al iniciar la aplicación)"""
+    global _credential, _agents_client
+    if _agents_client is None:
+        _credential = create_credential()
+        _agents_client = create_agents_client(_credential)
+        logger.info("✅ AgentsClient compartido inicializado")
+
+
+async def shutdown() -> None:
+    """Cierra el cliente compartido y su credencial"""
+    global _credential, _agents_client
+    if _agents_client is not None:
+        await _agents_client.close()
+        _agents_client = None
+    if _credential is not None:
+        await _credential.close()
+        _credential = None
+    logger.info("🔌 AgentsClient compartido cerrado")
+
+
+async def get_agents_client() -> AgentsClient:
+    """Retorna el cliente compartido, creándolo si la aplicación no lo inicializó"""
+    if _agents_client is None:
+        await startup()
+    metrics.increment("agents_client_acquired_total")
+    return _agents_client
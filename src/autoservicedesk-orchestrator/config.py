@@ -13,3 +13,128 @@ MCP_SERVER_URL = os.getenv("MCP_SERVER_URL")
 POLICY_AGENT_ID = os.getenv("POLICY_AGENT_ID")
 KNOWLEDGE_BASE_AGENT_ID = os.getenv("KNOWLEDGE_BASE_AGENT_ID")
 
+# Cliente compartido de Azure AI Agents
+AGENTS_HTTP_POOL_SIZE = int(os.getenv("AGENTS_HTTP_POOL_SIZE", "100"))
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+
+# Mensajes UX
+UX_CACHE_SIZE = int(os.getenv("UX_CACHE_SIZE", "512"))
+
+# Caché de decisiones del Policy Guard
+POLICY_CACHE_ENABLED = os.getenv("POLICY_CACHE_ENABLED", "true").lower() == "true"
+POLICY_CACHE_SIZE = int(os.getenv("POLICY_CACHE_SIZE", "2048"))
+POLICY_CACHE_TTL_SECONDS = int(os.getenv("POLICY_CACHE_TTL_SECONDS", "900"))
+POLICY_VERSION = os.getenv("POLICY_VERSION", "1")
+
+# Motor local de reglas de política
+POLICY_RULES_ENABLED = os.getenv("POLICY_RULES_ENABLED", "true").lower() == "true"
+POLICY_RULES_PATH = os.getenv(
+    "POLICY_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "policy_rules.json"),
+)
+
+# Contexto de conversaciones
+CONTEXT_MAX_THREADS = int(os.getenv("CONTEXT_MAX_THREADS", "100000"))
+CONTEXT_IDLE_TTL_SECONDS = int(os.getenv("CONTEXT_IDLE_TTL_SECONDS", "86400"))
+CONTEXT_BACKEND = os.getenv("CONTEXT_BACKEND", "memory").lower()  # memory | sqlite
+# SQLite: hilos para las operaciones del contexto y espera máxima por el lock de escritura
+CONTEXT_SQLITE_THREADS = int(os.getenv("CONTEXT_SQLITE_THREADS", "4"))
+CONTEXT_SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv("CONTEXT_SQLITE_BUSY_TIMEOUT_SECONDS", "2"))
+CONTEXT_SQLITE_PATH = os.getenv(
+    "CONTEXT_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "context.db"),
+)
+
+# Procesamiento por lotes
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+
+# Control de admisión de /support (0 = sin límite)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+USER_RATE_LIMIT_PER_MINUTE = float(os.getenv("USER_RATE_LIMIT_PER_MINUTE", "20"))
+USER_RATE_LIMIT_BURST = int(os.getenv("USER_RATE_LIMIT_BURST", "5"))
+USER_RATE_LIMIT_MAX_USERS = int(os.getenv("USER_RATE_LIMIT_MAX_USERS", "10000"))
+# Header con la identidad autenticada por el gateway; vacío = se usa el user_email del cuerpo
+USER_RATE_LIMIT_IDENTITY_HEADER = os.getenv("USER_RATE_LIMIT_IDENTITY_HEADER", "")
+
+
+# Modo asíncrono (trabajos en cola)
+JOBS_SQLITE_PATH = os.getenv(
+    "JOBS_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "jobs.db"),
+)
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", "4"))
+JOBS_MAX_QUEUED = int(os.getenv("JOBS_MAX_QUEUED", "1000"))
+JOBS_POLL_INTERVAL_SECONDS = float(os.getenv("JOBS_POLL_INTERVAL_SECONDS", "2"))
+# Latido de los trabajos en ejecución: sin latido por JOBS_HEARTBEAT_TIMEOUT_SECONDS vuelven a la cola
+JOBS_HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("JOBS_HEARTBEAT_INTERVAL_SECONDS", "10"))
+JOBS_HEARTBEAT_TIMEOUT_SECONDS = float(os.getenv("JOBS_HEARTBEAT_TIMEOUT_SECONDS", "60"))
+JOBS_RETENTION_SECONDS = int(os.getenv("JOBS_RETENTION_SECONDS", "86400"))
+# Hosts a los que se permite notificar callback_url (https); vacío = callbacks deshabilitados
+JOBS_CALLBACK_ALLOWED_HOSTS = [
+    h.strip().lower() for h in os.getenv("JOBS_CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()
+]
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | text
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+
+# Pool de threads para runs auxiliares y conversaciones nuevas
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "8"))
+THREAD_MAX_USES = int(os.getenv("THREAD_MAX_USES", "1"))  # >1 recicla borrando los mensajes
+THREAD_IDLE_TTL_SECONDS = int(os.getenv("THREAD_IDLE_TTL_SECONDS", "3600"))
+THREAD_JANITOR_INTERVAL_SECONDS = float(os.getenv("THREAD_JANITOR_INTERVAL_SECONDS", "60"))
+# Threads de conversación sin uso por este tiempo se eliminan (por defecto, cuando expira su contexto)
+THREAD_CONVERSATION_TTL_SECONDS = int(os.getenv("THREAD_CONVERSATION_TTL_SECONDS", str(CONTEXT_IDLE_TTL_SECONDS)))
+
+# Barrido de agentes huérfanos
+AGENT_SWEEPER_ENABLED = os.getenv("AGENT_SWEEPER_ENABLED", "true").lower() == "true"
+AGENT_SWEEPER_NAME_PREFIXES = [
+    p.strip()
+    for p in os.getenv(
+        "AGENT_SWEEPER_NAME_PREFIXES",
+        "triage-support-agent,mcp_research_agent,confirmation-agent,ux-agent",
+    ).split(",")
+]
+AGENT_SWEEPER_MAX_AGE_SECONDS = int(os.getenv("AGENT_SWEEPER_MAX_AGE_SECONDS", "86400"))
+AGENT_SWEEPER_INTERVAL_SECONDS = float(os.getenv("AGENT_SWEEPER_INTERVAL_SECONDS", "3600"))
+
+# Apagado ordenado: espera a los runs en curso antes de cancelarlos
+SHUTDOWN_DRAIN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT_SECONDS", "20"))
+
+# Truncado del historial en threads de conversación (0 = sin truncar)
+THREAD_TRUNCATION_LAST_MESSAGES = int(os.getenv("THREAD_TRUNCATION_LAST_MESSAGES", "0"))
+
+# Payloads compactos al Triage: deltas por thread y keyframe cada N turnos
+PAYLOAD_DELTA_ENABLED = os.getenv("PAYLOAD_DELTA_ENABLED", "true").lower() == "true"
+PAYLOAD_KEYFRAME_INTERVAL = int(os.getenv("PAYLOAD_KEYFRAME_INTERVAL", "8"))
+
+# Caché de respuestas de la Knowledge Base (cambiar KB_VERSION al actualizar los documentos)
+KB_CACHE_ENABLED = os.getenv("KB_CACHE_ENABLED", "true").lower() == "true"
+KB_CACHE_SIZE = int(os.getenv("KB_CACHE_SIZE", "1024"))
+KB_CACHE_TTL_SECONDS = int(os.getenv("KB_CACHE_TTL_SECONDS", "21600"))
+KB_VERSION = os.getenv("KB_VERSION", "1")
+
+# Índice local (BM25) de respuestas aprobadas de la Knowledge Base
+FAQ_INDEX_ENABLED = os.getenv("FAQ_INDEX_ENABLED", "true").lower() == "true"
+FAQ_INDEX_DIR = os.getenv(
+    "FAQ_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "var", "faq_index"),
+)
+FAQ_INDEX_MIN_CONFIDENCE = float(os.getenv("FAQ_INDEX_MIN_CONFIDENCE", "0.8"))
+FAQ_INDEX_COMPACT_EVERY = int(os.getenv("FAQ_INDEX_COMPACT_EVERY", "64"))
+
+# Modo especulativo: Knowledge Base en paralelo al Policy Guard para preguntas que pasan
+# por él (con INTENT_ROUTING_ENABLED=false); usa el mismo umbral INTENT_CONFIDENCE_THRESHOLD
+SPECULATIVE_KB_ENABLED = os.getenv("SPECULATIVE_KB_ENABLED", "false").lower() == "true"
+
+# Clasificador local de intención: preguntas directo a la Knowledge Base
+INTENT_ROUTING_ENABLED = os.getenv("INTENT_ROUTING_ENABLED", "true").lower() == "true"
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.7"))
+
+# Clave para las rutas /admin (header X-Admin-Key); vacía = rutas deshabilitadas
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "")
@@ -0,0 +1,123 @@
+"""
+Clasificador local de confirmaciones (sí / no) en español e inglés
+"""
+from typing import List, Optional
+
+from text_utils import normalize
+
+# Respuestas con más palabras que esto se delegan al agente de confirmación
+MAX_TOKENS = 8
+
+# Frases completas (ya normalizadas) que se resuelven sin mirar palabra por palabra
+PHRASES = {
+    "claro que si": "yes",
+    "por supuesto que si": "yes",
+    "go ahead": "yes",
+    "de acuerdo": "yes",
+    "me parece bien": "yes",
+    "por favor": "yes",
+    "sounds good": "yes",
+    "claro que no": "no",
+    "por supuesto que no": "no",
+    "mejor no": "no",
+    "ahora no": "no",
+    "todavia no": "no",
+    "aun no": "no",
+    "not now": "no",
+    "no thanks": "no",
+    "no thank you": "no",
+    "no gracias": "no",
+    "no se": "unclear",
+    "no lo se": "unclear",
+    "no estoy seguro": "unclear",
+    "no estoy segura": "unclear",
+    "not sure": "unclear",
+    "i dont know": "unclear",
+    "i don't know": "unclear",
+    "tal vez": "unclear",
+    "a lo mejor": "unclear",
+}
+
+YES_WORDS = {
+    "si", "s", "sip", "simon", "claro", "ok", "okay", "okey", "vale", "dale",
+    "adelante", "hazlo", "procede", "crealo", "confirmo", "confirmado",
+    "afirmativo", "perfecto", "correcto", "exacto", "listo", "bueno", "obvio",
+    "yes", "y", "yep", "yeah", "yup", "sure", "please", "proceed", "confirm",
+    "confirmed", "absolutely", "definitely", "okk", "k",
+}
+
+NO_WORDS = {
+    "no", "n", "nop", "nope", "nel", "negativo", "cancela", "cancelar",
+    "cancelalo", "olvidalo", "dejalo", "nunca", "jamas", "nah", "never",
+    "cancel", "stop", "abort",
+}
+
+UNCLEAR_WORDS = {"quizas", "quiza", "maybe", "perhaps", "depende", "hmm", "mmm"}
+
+# Negadores que invierten una palabra afirmativa posterior ("don't proceed", "nunca lo confirmo")
+NEGATORS = {"no", "not", "dont", "don't", "ni", "nunca", "never"}
+
+# Negadores que también son una respuesta completa: sin la puntuación, "no, por favor
+# créalo" y "no lo crees" no se distinguen, así que seguidos de una afirmación son ambiguos
+STANDALONE_NEGATORS = {"no"}
+
+# Palabras de relleno que no cambian el sentido de la respuesta
+FILLER_WORDS = {
+    "por", "favor", "gracias", "muchas", "thanks", "thank", "you", "pues",
+    "entonces", "que", "lo", "la", "el", "eso", "it", "do", "that",
+    "senor", "ya", "mismo", "de", "una", "vez", "a", "the", "ticket",
+    "crea", "crear", "create", "quiero", "want", "i",
+}
+
+def _classify_tokens(tokens: List[str]) -> Optional[str]:
+    """Clasifica palabra por palabra; None si hay palabras desconocidas o señales mixtas"""
+    signals = set()
+    negate_next = False
+    standalone_no = False
+
+    for token in tokens:
+        if token in NEGATORS and token not in YES_WORDS:
+            # "no" solo también es una negativa; "not"/"nunca" niegan la siguiente afirmación
+            negate_next = True
+            standalone_no = standalone_no or token in STANDALONE_NEGATORS
+            signals.add("no")
+            continue
+        if token in YES_WORDS:
+            if standalone_no:
+                return None
+            signals.add("no" if negate_next else "yes")
+            negate_next = False
+            continue
+        if token in NO_WORDS:
+            signals.add("no")
+            continue
+        if token in UNCLEAR_WORDS:
+            signals.add("unclear")
+            continue
+        if token in FILLER_WORDS:
+            continue
+        return None
+
+    if len(signals) != 1:
+        return None
+    return signals.pop()
+
+
+def classify_confirmation(user_text: str) -> Optional[str]:
+    """
+    Clasifica localmente una respuesta de confirmación.
+    Retorna: "yes", "no", "unclear" o None si el texto es ambiguo y debe
+    resolverlo el agente de confirmación.
+    """
+    normalized = normalize(user_text)
+    if not normalized:
+        return None
+
+    if normalized in PHRASES:
+        return PHRASES[normalized]
+
+    tokens = normalized.split()
+    if len(tokens) > MAX_TOKENS:
+        return None
+
+    return _classify_tokens(tokens)
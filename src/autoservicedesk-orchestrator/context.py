@@ -1,38 +1,351 @@
 """
 Gestión de contexto de conversaciones
 """
-from typing import Dict
+import asyncio
+import contextvars
+import copy
+import functools
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
 
-# Contexto global en memoria
-_conversation_context: Dict[str, Dict] = {}
+import config
+import logs
+import metrics
+from cache import LRUCache
+from sqlite_utils import ThreadLocalConnection
 
+logger = logs.get_logger(__name__)
 
-def get_context(thread_id: str) -> Dict:
-    """Obtiene el contexto de una conversación"""
-    return _conversation_context.get(thread_id, {
+
+# Snapshots del último payload enviado a cada agente (ver payload_codec); no se envían a los agentes
+PAYLOAD_SNAPSHOTS_KEY = "_payload_snapshots"
+
+
+def _default_context() -> Dict:
+    return {
         "awaiting_work_item_confirmation": False,
         "last_denied_request": None,
         "last_policy_decision": None,
-    })
+    }
+
+
+class MemoryContextStore:
+    """
+    Contexto en memoria acotado: máximo de threads, TTL de inactividad y
+    desalojo LRU, para que la memoria no crezca con cada thread visto.
+    """
+
+    # Frecuencia mínima entre barridos de contextos expirados
+    PURGE_INTERVAL_SECONDS = 60
+
+    def __init__(self, max_size: int, idle_ttl_seconds: int):
+        self._entries = LRUCache(max_size=max_size, ttl_seconds=idle_ttl_seconds, sliding=True)
+        self._last_purge = time.monotonic()
+        self._update_lock = threading.Lock()
+
+    def get(self, thread_id: str) -> Optional[Dict]:
+        entry = self._entries.get(thread_id)
+        return copy.deepcopy(entry) if entry is not None else None
+
+    def set(self, thread_id: str, context: Dict) -> None:
+        self._entries.set(thread_id, copy.deepcopy(context))
+
+        now = time.monotonic()
+        if now - self._last_purge > self.PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            self._entries.purge_expired()
+
+    def update(self, thread_id: str, mutate: Callable[[Dict], None]) -> Dict:
+        """Lee, modifica y guarda el contexto de forma atómica"""
+        with self._update_lock:
+            context = self.get(thread_id) or _default_context()
+            mutate(context)
+            self.set(thread_id, context)
+            return context
+
+    def last_activity(self, thread_id: str) -> Optional[float]:
+        # El contexto en memoria es del proceso: su actividad ya la registra el thread manager
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "hits": self._entries.hits,
+            "misses": self._entries.misses,
+            "evictions": self._entries.evictions,
+            "expirations": self._entries.expirations,
+        }
+
+
+class SQLiteContextStore:
+    """
+    Contexto persistente en SQLite (modo WAL), compartido por todos los
+    workers del host. Las modificaciones se hacen dentro de transacciones
+    BEGIN IMMEDIATE, por lo que el read-modify-write de los flags de
+    confirmación es atómico entre procesos.
+
+    Sus métodos bloquean (esperan el lock de escritura hasta busy_timeout):
+    las funciones del módulo los ejecutan en un pool de hilos propio.
+    """
+
+    PURGE_INTERVAL_SECONDS = 60
+
+    def __init__(self, path: str, max_size: int, idle_ttl_seconds: int, busy_timeout: float):
+        self._connections = ThreadLocalConnection(path, timeout=busy_timeout)
+        self._max_size = max_size
+        self._idle_ttl_seconds = idle_ttl_seconds
+        self._last_purge = 0.0
+        # Cantidad de contextos al último barrido (para /metrics sin consultar desde el event loop)
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        conn = self._connections.get()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_context ("
+            " thread_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_conversation_context_updated_at"
+            " ON conversation_context (updated_at)"
+        )
+
+    def _read(self, conn: sqlite3.Connection, thread_id: str) -> Optional[Dict]:
+        row = conn.execute(
+            "SELECT data, updated_at FROM conversation_context WHERE thread_id = ?",
+            (thread_id,),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        if time.time() - row[1] > self._idle_ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def _write(self, conn: sqlite3.Connection, thread_id: str, context: Dict) -> None:
+        conn.execute(
+            "INSERT INTO conversation_context (thread_id, data, updated_at) VALUES (?, ?, ?)"
+            " ON CONFLICT(thread_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+            (thread_id, json.dumps(context, ensure_ascii=False), time.time()),
+        )
+
+    def get(self, thread_id: str) -> Optional[Dict]:
+        return self._read(self._connections.get(), thread_id)
+
+    def last_activity(self, thread_id: str) -> Optional[float]:
+        """Última escritura del contexto (epoch) desde cualquier proceso del host, o None"""
+        row = self._connections.get().execute(
+            "SELECT updated_at FROM conversation_context WHERE thread_id = ?",
+            (thread_id,),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, thread_id: str, context: Dict) -> None:
+        conn = self._connections.get()
+        self._write(conn, thread_id, context)
+        self._maybe_purge(conn)
+
+    def update(self, thread_id: str, mutate: Callable[[Dict], None]) -> Dict:
+        """Lee, modifica y guarda el contexto dentro de una transacción exclusiva"""
+        conn = self._connections.get()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            context = self._read(conn, thread_id) or _default_context()
+            mutate(context)
+            self._write(conn, thread_id, context)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_purge(conn)
+        return context
+
+    def _maybe_purge(self, conn: sqlite3.Connection) -> None:
+        """Elimina contextos inactivos y recorta la tabla a max_size"""
+        now = time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+
+        expired = conn.execute(
+            "DELETE FROM conversation_context WHERE updated_at < ?",
+            (now - self._idle_ttl_seconds,),
+        ).rowcount
+        evicted = conn.execute(
+            "DELETE FROM conversation_context WHERE thread_id IN ("
+            " SELECT thread_id FROM conversation_context ORDER BY updated_at DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self._max_size,),
+        ).rowcount
+        self.expirations += expired
+        self.evictions += evicted
+        self._size = conn.execute("SELECT COUNT(*) FROM conversation_context").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def _create_store():
+    if config.CONTEXT_BACKEND == "sqlite":
+        logger.info("🗄️ Contexto en SQLite: %s", config.CONTEXT_SQLITE_PATH)
+        return SQLiteContextStore(
+            path=config.CONTEXT_SQLITE_PATH,
+            max_size=config.CONTEXT_MAX_THREADS,
+            idle_ttl_seconds=config.CONTEXT_IDLE_TTL_SECONDS,
+            busy_timeout=config.CONTEXT_SQLITE_BUSY_TIMEOUT_SECONDS,
+        )
+    return MemoryContextStore(
+        max_size=config.CONTEXT_MAX_THREADS,
+        idle_ttl_seconds=config.CONTEXT_IDLE_TTL_SECONDS,
+    )
+
+
+_store = _create_store()
 
+# Pool de hilos para el backend SQLite; el de memoria se usa directamente en el event loop
+_executor: Optional[ThreadPoolExecutor] = None
+if isinstance(_store, SQLiteContextStore):
+    _executor = ThreadPoolExecutor(max_workers=config.CONTEXT_SQLITE_THREADS, thread_name_prefix="context-store")
 
-def update_context(thread_id: str, new_context: Dict) -> None:
+
+async def _call(method: Callable, *args) -> Any:
+    """Ejecuta una operación del store sin bloquear el event loop (conserva los contextvars de logs)"""
+    if _executor is None:
+        return method(*args)
+    call = functools.partial(contextvars.copy_context().run, method, *args)
+    return await asyncio.get_running_loop().run_in_executor(_executor, call)
+
+
+def _collect_metrics():
+    stats = _store.stats()
+    yield "context_store_size", "gauge", {}, stats["size"]
+    yield "context_store_hits_total", "counter", {}, stats["hits"]
+    yield "context_store_misses_total", "counter", {}, stats["misses"]
+    yield "context_store_evictions_total", "counter", {"reason": "lru"}, stats["evictions"]
+    yield "context_store_evictions_total", "counter", {"reason": "idle_ttl"}, stats["expirations"]
+
+
+metrics.register_collector(_collect_metrics)
+
+
+async def get_context(thread_id: str) -> Dict:
+    """Obtiene el contexto de una conversación"""
+    context = await _call(_store.get, thread_id)
+    return context if context is not None else _default_context()
+
+
+async def last_activity(thread_id: str) -> Optional[float]:
+    """
+    Última escritura del contexto de la conversación (epoch) hecha por
+    cualquier proceso que comparta el store, o None si no se sabe
+    """
+    return await _call(_store.last_activity, thread_id)
+
+
+async def update_context(thread_id: str, new_context: Dict) -> None:
     """Actualiza el contexto de una conversación"""
-    _conversation_context[thread_id] = new_context
-    print(f"[CTX] Contexto actualizado para thread {thread_id}")
+    await _call(_store.set, thread_id, new_context)
+    logger.debug("[CTX] Contexto actualizado", extra={"thread_id": thread_id})
+
 
+async def set_last_policy_decision(thread_id: str, policy_decision: Dict) -> Dict:
+    """Guarda la última decisión de política y retorna el contexto actualizado"""
+    def mutate(context: Dict) -> None:
+        context["last_policy_decision"] = policy_decision
 
-def clear_confirmation_flag(thread_id: str) -> None:
+    return await _call(_store.update, thread_id, mutate)
+
+
+async def clear_confirmation_flag(thread_id: str) -> None:
     """Limpia el flag de espera de confirmación"""
-    context = get_context(thread_id)
-    context["awaiting_work_item_confirmation"] = False
-    update_context(thread_id, context)
+    def mutate(context: Dict) -> None:
+        context["awaiting_work_item_confirmation"] = False
+
+    await _call(_store.update, thread_id, mutate)
+    logger.debug("[CTX] Confirmación limpiada", extra={"thread_id": thread_id})
+
 
+async def consume_confirmation(thread_id: str) -> bool:
+    """
+    Limpia el flag de espera de confirmación de forma atómica.
+    Retorna True solo para la primera solicitud que lo consume, de modo que
+    una confirmación duplicada no ejecute la acción dos veces.
+    """
+    consumed = []
 
-def set_waiting_confirmation(thread_id: str, request: str, policy_decision: Dict) -> None:
+    def mutate(context: Dict) -> None:
+        consumed.append(context.get("awaiting_work_item_confirmation", False))
+        context["awaiting_work_item_confirmation"] = False
+
+    await _call(_store.update, thread_id, mutate)
+    return consumed[0]
+
+
+async def restore_confirmation(thread_id: str) -> None:
+    """
+    Vuelve a esperar confirmación tras consumirla: la acción confirmada
+    falló y el usuario puede reintentarla respondiendo "sí" otra vez.
+    """
+    def mutate(context: Dict) -> None:
+        context["awaiting_work_item_confirmation"] = True
+
+    await _call(_store.update, thread_id, mutate)
+    logger.info("[CTX] Confirmación restablecida tras un fallo", extra={"thread_id": thread_id})
+
+
+async def set_waiting_confirmation(thread_id: str, request: str, policy_decision: Dict) -> None:
     """Marca que se está esperando confirmación"""
-    context = get_context(thread_id)
-    context["awaiting_work_item_confirmation"] = True
-    context["last_denied_request"] = request
-    context["last_policy_decision"] = policy_decision
-    update_context(thread_id, context)
\ No newline at end of file
+    def mutate(context: Dict) -> None:
+        context["awaiting_work_item_confirmation"] = True
+        context["last_denied_request"] = request
+        context["last_policy_decision"] = policy_decision
+
+    await _call(_store.update, thread_id, mutate)
+    logger.info("[CTX] Esperando confirmación", extra={"thread_id": thread_id})
+
+
+def conversation_state(conv_context: Dict) -> Dict:
+    """Retorna el contexto sin los campos internos del orquestador"""
+    return {k: v for k, v in conv_context.items() if not k.startswith("_")}
+
+
+async def swap_payload_snapshot(thread_id: str, agent: str, encode: Callable[[Optional[Dict]], Tuple[Any, Dict]]) -> Any:
+    """
+    Codifica un payload contra el snapshot guardado para agent en el thread y
+    reemplaza el snapshot de forma atómica. encode recibe el snapshot (o None)
+    y retorna (mensaje, nuevo snapshot); se retorna el mensaje.
+    """
+    result = []
+
+    def mutate(context: Dict) -> None:
+        snapshots = context.setdefault(PAYLOAD_SNAPSHOTS_KEY, {})
+        message, snapshots[agent] = encode(snapshots.get(agent))
+        result.append(message)
+
+    await _call(_store.update, thread_id, mutate)
+    return result[0]
+
+
+async def add_payload_snapshot_messages(thread_id: str, count: int) -> None:
+    """Suma mensajes agregados al thread a los snapshots existentes (ventana de truncado)"""
+    def mutate(context: Dict) -> None:
+        for snapshot in context.get(PAYLOAD_SNAPSHOTS_KEY, {}).values():
+            snapshot["messages_since_keyframe"] += count
+
+    await _call(_store.update, thread_id, mutate)
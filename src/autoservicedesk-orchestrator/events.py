@@ -0,0 +1,71 @@
+"""
+Eventos de progreso de una solicitud (endpoint de streaming)
+"""
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+import logs
+
+logger = logs.get_logger(__name__)
+
+EventSink = Callable[[str, Dict], Awaitable[None]]
+
+# Destino de los eventos de la solicitud en curso (None si no se está transmitiendo)
+_sink: ContextVar[Optional[EventSink]] = ContextVar("event_sink", default=None)
+
+
+def is_streaming() -> bool:
+    """Indica si la solicitud en curso tiene un cliente escuchando eventos"""
+    return _sink.get() is not None
+
+
+async def emit(event: str, data: Dict) -> None:
+    """Publica un evento si hay un cliente escuchando; no hace nada en caso contrario"""
+    sink = _sink.get()
+    if sink is not None:
+        await sink(event, data)
+
+
+@contextmanager
+def bind(sink: EventSink):
+    """Asocia un destino de eventos al contexto actual"""
+    token = _sink.set(sink)
+    try:
+        yield
+    finally:
+        _sink.reset(token)
+
+
+async def stream(run: Callable[[], Awaitable[Dict]]) -> AsyncIterator[Tuple[str, Dict]]:
+    """
+    Ejecuta `run` en segundo plano y produce sus eventos a medida que ocurren.
+    El último evento es "result" con la respuesta completa, o "error".
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def sink(event: str, data: Dict) -> None:
+        await queue.put((event, data))
+
+    async def runner() -> None:
+        with bind(sink):
+            try:
+                result = await run()
+                await queue.put(("result", result))
+            except Exception as e:
+                logger.exception("Error en la solicitud transmitida")
+                await queue.put(("error", {"detail": str(e)}))
+            finally:
+                await queue.put(None)
+
+    task = asyncio.create_task(runner())
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,401 @@
+"""
+Índice léxico local (BM25) sobre respuestas aprobadas de la Knowledge Base
+
+Las respuestas aprobadas se agregan a un log (answers.jsonl) y se indexan
+de inmediato en un segmento en memoria. Cada cierto número de altas ese
+segmento se fusiona con el segmento en disco (segment.bin), que se lee con
+mmap: las listas de postings y las longitudes de documento son arreglos de
+uint32 que se consultan sin copiarlos a memoria.
+
+Formato de segment.bin:
+    b"FAQ1" | uint32 largo del encabezado | encabezado JSON | relleno a 4 bytes
+    | uint32[doc_count] longitudes | uint32[2 * postings] pares (doc, tf)
+"""
+from array import array
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import config
+import logs
+import metrics
+from text_utils import normalize
+
+logger = logs.get_logger(__name__)
+
+ANSWERS_FILE = "answers.jsonl"
+SEGMENT_FILE = "segment.bin"
+SEGMENT_MAGIC = b"FAQ1"
+
+# Parámetros estándar de BM25
+K1 = 1.2
+B = 0.75
+
+# Candidatos (por puntaje BM25) sobre los que se calcula la confianza
+CONFIDENCE_CANDIDATES = 10
+
+CONFIDENCE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+# Palabras sin contenido (ya normalizadas) que no se indexan. Los interrogativos
+# (como, que, donde, how, what...) sí se indexan: distinguen "¿Cómo reseteo mi
+# contraseña?" de la orden "Resetea mi contraseña"
+STOPWORDS = frozenset("""
+    a al con de del el en es esta este esto hay la las lo los me mi mis para
+    por puedo se si sin sobre su sus tengo un una uno y o u
+    a an and are can do does for i in is it me my of on or the to with
+""".split())
+
+# Interrogativos: aparecen en casi todas las preguntas (idf bajo), pero su
+# presencia o ausencia separa una consulta de una orden, así que pesan como
+# un término raro
+INTERROGATIVES = frozenset("""
+    como que cual cuales cuando donde porque quien quienes cuanto cuantos
+    how what when where which who why
+""".split())
+
+# Versión de la tokenización: un segment.bin de otra versión se reconstruye desde el log
+TOKENIZER_VERSION = 2
+
+# Truncado de términos: un stemming mínimo para que "instalo" e "instalar" coincidan
+STEM_LENGTH = 6
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t[:STEM_LENGTH] for t in _TOKEN.findall(normalize(text)) if t not in STOPWORDS]
+
+
+def _term_frequencies(text: str) -> Dict[str, int]:
+    frequencies: Dict[str, int] = defaultdict(int)
+    for term in tokenize(text):
+        frequencies[term] += 1
+    return frequencies
+
+
+def _data_offset(header_size: int) -> int:
+    """Inicio de los arreglos: tras magic, largo y encabezado, alineado a 4 bytes"""
+    offset = 8 + header_size
+    return offset + -offset % 4
+
+
+class _Segment:
+    """Segmento inmutable en disco, leído con mmap"""
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:4] != SEGMENT_MAGIC:
+            raise ValueError("segment.bin no tiene el formato esperado")
+        (header_size,) = struct.unpack_from("<I", self._map, 4)
+        header = json.loads(self._map[8:8 + header_size].decode("utf-8"))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("segment.bin fue escrito con otro orden de bytes")
+        if header.get("tokenizer") != TOKENIZER_VERSION:
+            raise ValueError("segment.bin fue escrito con otra versión de la tokenización")
+
+        self.doc_count: int = header["doc_count"]
+        self.total_length: int = header["total_length"]
+        # término -> (posición del primer par, cantidad de pares)
+        self.terms: Dict[str, Tuple[int, int]] = {t: tuple(v) for t, v in header["terms"].items()}
+
+        start = _data_offset(header_size)
+        lengths_end = start + 4 * self.doc_count
+        self.doc_lengths = memoryview(self._map)[start:lengths_end].cast("I")
+        self.postings = memoryview(self._map)[lengths_end:].cast("I")
+
+    def postings_for(self, term: str) -> List[Tuple[int, int]]:
+        entry = self.terms.get(term)
+        if entry is None:
+            return []
+        first, count = entry
+        pairs = self.postings[2 * first:2 * (first + count)]
+        return list(zip(pairs[0::2], pairs[1::2]))
+
+    def close(self) -> None:
+        self.doc_lengths.release()
+        self.postings.release()
+        self._map.close()
+        self._file.close()
+
+
+class FaqIndex:
+    """
+    Índice invertido con puntuación BM25 sobre las preguntas de las
+    respuestas aprobadas.
+
+    La confianza de un resultado compara su puntuación con la que obtendrían
+    la consulta y la pregunta indexada contra sí mismas: 1.0 para una
+    pregunta repetida y menos cuantos más términos falten o sobren.
+    """
+
+    def __init__(self, directory: str, compact_every: int):
+        self._directory = directory
+        self._compact_every = compact_every
+        self._answers_path = os.path.join(directory, ANSWERS_FILE)
+        self._segment_path = os.path.join(directory, SEGMENT_FILE)
+        self._segment: Optional[_Segment] = None
+        self._documents: List[Dict] = []
+        # Segmento en memoria con los documentos posteriores al segmento en disco
+        self._delta: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._delta_lengths: List[int] = []
+        self._total_length = 0
+        # Bytes del log ya indexados (otros procesos pueden agregar respuestas)
+        self._log_offset = 0
+
+    @property
+    def doc_count(self) -> int:
+        return len(self._documents)
+
+    def load(self) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        if os.path.exists(self._segment_path):
+            try:
+                self._segment = _Segment(self._segment_path)
+                self._total_length = self._segment.total_length
+            except (ValueError, KeyError, OSError) as e:
+                logger.warning("⚠️ Segmento del índice FAQ descartado, se reconstruye: %s", e)
+                self._segment = None
+        self._sync()
+        logger.info("📚 Índice FAQ cargado (%s respuestas aprobadas)", self.doc_count)
+
+    def close(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+
+    def _segment_docs(self) -> int:
+        return self._segment.doc_count if self._segment is not None else 0
+
+    def _sync(self) -> None:
+        """Indexa las respuestas agregadas al log desde la última lectura"""
+        if not os.path.exists(self._answers_path):
+            return
+        if os.path.getsize(self._answers_path) <= self._log_offset:
+            return
+        with open(self._answers_path, "rb") as f:
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Línea a medio escribir por otro proceso: se lee en la próxima sincronización
+                    break
+                self._log_offset += len(line)
+                if line.strip():
+                    self._index_document(json.loads(line))
+        metrics.set_gauge("faq_index_documents", self.doc_count)
+
+    def _index_document(self, document: Dict) -> None:
+        doc_id = len(self._documents)
+        self._documents.append(document)
+        if doc_id < self._segment_docs():
+            # Ya está en el segmento en disco
+            return
+        frequencies = _term_frequencies(document["question"])
+        length = sum(frequencies.values())
+        for term, tf in frequencies.items():
+            self._delta[term].append((doc_id, tf))
+        self._delta_lengths.append(length)
+        self._total_length += length
+
+    def add(self, question: str, answer: str, citations: List[Dict], roles: List[str], areas: List[str]) -> Dict:
+        """Agrega una respuesta aprobada y la deja consultable de inmediato"""
+        document = {
+            "id": uuid.uuid4().hex,
+            "question": question,
+            "answer": answer,
+            "citations": citations,
+            "roles": roles,
+            "areas": areas,
+            "approved_at": time.time(),
+        }
+        line = (json.dumps(document, ensure_ascii=False) + "\n").encode("utf-8")
+        with open(self._answers_path, "ab") as f:
+            f.write(line)
+        self._sync()
+
+        if len(self._delta_lengths) >= self._compact_every:
+            self.compact()
+        return document
+
+    def _doc_length(self, doc_id: int) -> int:
+        segment_docs = self._segment_docs()
+        if doc_id < segment_docs:
+            return self._segment.doc_lengths[doc_id]
+        return self._delta_lengths[doc_id - segment_docs]
+
+    def _postings(self, term: str) -> List[Tuple[int, int]]:
+        main = self._segment.postings_for(term) if self._segment is not None else []
+        return main + self._delta.get(term, [])
+
+    def _idf(self, df: int) -> float:
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def _term_idf(self, term: str, df: int) -> float:
+        if term in INTERROGATIVES:
+            return max(self._idf(df), self._idf(1))
+        return self._idf(df)
+
+    def _term_score(self, idf: float, tf: int, length: int, avg_length: float) -> float:
+        return idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+
+    def _self_score(self, frequencies: Dict[str, int], avg_length: float) -> float:
+        """Puntaje BM25 de un texto contra sí mismo: el máximo que puede alcanzar"""
+        length = sum(frequencies.values())
+        return sum(
+            self._term_score(self._term_idf(term, len(self._postings(term))), tf, length, avg_length)
+            for term, tf in frequencies.items()
+        )
+
+    def search(self, query: str, user_profile: Dict, limit: int = 3) -> List[Dict]:
+        """
+        Retorna las mejores respuestas visibles para el perfil, con su confianza.
+
+        La confianza normaliza el puntaje por el puntaje ideal de la consulta y
+        el de la pregunta indexada (media geométrica), de modo que los términos
+        de sobra en cualquiera de los dos la bajan: "¿Cómo instalo Visual
+        Studio?" no equivale a "¿Cómo instalo Visual Studio Code en Windows?".
+        """
+        self._sync()
+        query_terms = _term_frequencies(query)
+        if not query_terms or not self._documents:
+            return []
+
+        avg_length = max(self._total_length / self.doc_count, 1.0)
+        query_length = sum(query_terms.values())
+        scores: Dict[int, float] = defaultdict(float)
+        query_ideal = 0.0
+        for term, query_tf in query_terms.items():
+            postings = self._postings(term)
+            idf = self._term_idf(term, len(postings))
+            query_ideal += self._term_score(idf, query_tf, query_length, avg_length)
+            for doc_id, tf in postings:
+                scores[doc_id] += self._term_score(idf, tf, self._doc_length(doc_id), avg_length)
+
+        # La confianza se calcula para los mejores candidatos por BM25 y ordena el resultado
+        candidates = []
+        for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            document = self._documents[doc_id]
+            if not _visible_to(document, user_profile):
+                continue
+            doc_ideal = self._self_score(_term_frequencies(document["question"]), avg_length)
+            confidence = min(score / math.sqrt(query_ideal * doc_ideal), 1.0)
+            candidates.append({**document, "confidence": round(confidence, 3)})
+            if len(candidates) >= max(limit, CONFIDENCE_CANDIDATES):
+                break
+
+        candidates.sort(key=lambda result: result["confidence"], reverse=True)
+        return candidates[:limit]
+
+    def compact(self) -> None:
+        """Fusiona el segmento en memoria con el de disco en un nuevo segment.bin"""
+        segment_docs = self._segment_docs()
+        terms = set(self._delta)
+        if self._segment is not None:
+            terms.update(self._segment.terms)
+
+        lengths = array("I", (self._doc_length(doc_id) for doc_id in range(self.doc_count)))
+        postings = array("I")
+        lexicon = {}
+        for term in sorted(terms):
+            pairs = self._postings(term)
+            lexicon[term] = [len(postings) // 2, len(pairs)]
+            for doc_id, tf in pairs:
+                postings.append(doc_id)
+                postings.append(tf)
+
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "tokenizer": TOKENIZER_VERSION,
+            "doc_count": self.doc_count,
+            "total_length": self._total_length,
+            "terms": lexicon,
+        }, ensure_ascii=False).encode("utf-8")
+
+        temp_path = f"{self._segment_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(SEGMENT_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(b"\0" * (_data_offset(len(header)) - 8 - len(header)))
+            lengths.tofile(f)
+            postings.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._segment_path)
+
+        self.close()
+        self._segment = _Segment(self._segment_path)
+        self._delta.clear()
+        self._delta_lengths.clear()
+        metrics.increment("faq_index_compactions_total")
+        logger.info(
+            "📚 Índice FAQ compactado (%s respuestas, %s nuevas)",
+            self.doc_count, self.doc_count - segment_docs,
+        )
+
+
+def _visible_to(document: Dict, user_profile: Dict) -> bool:
+    roles = document.get("roles") or []
+    areas = document.get("areas") or []
+    if roles and user_profile.get("role") not in roles:
+        return False
+    if areas and user_profile.get("area") not in areas:
+        return False
+    return True
+
+
+_index: Optional[FaqIndex] = None
+
+
+def _get_index() -> FaqIndex:
+    global _index
+    if _index is None:
+        _index = FaqIndex(config.FAQ_INDEX_DIR, config.FAQ_INDEX_COMPACT_EVERY)
+        _index.load()
+    return _index
+
+
+def find_answer(question: str, user_profile: Dict) -> Optional[Dict]:
+    """
+    Retorna la respuesta aprobada que coincide con la pregunta con confianza
+    mayor o igual a FAQ_INDEX_MIN_CONFIDENCE, o None
+    """
+    if not config.FAQ_INDEX_ENABLED:
+        return None
+
+    results = _get_index().search(question, user_profile, limit=1)
+    match = results[0] if results else None
+    if match is not None:
+        metrics.observe("faq_index_match_confidence", match["confidence"], buckets=CONFIDENCE_BUCKETS)
+    hit = match is not None and match["confidence"] >= config.FAQ_INDEX_MIN_CONFIDENCE
+    metrics.increment("faq_index_lookups_total", result="hit" if hit else "miss")
+    return match if hit else None
+
+
+def add_answer(
+        question: str,
+        answer: str,
+        citations: Optional[List[Dict]] = None,
+        roles: Optional[List[str]] = None,
+        areas: Optional[List[str]] = None,
+) -> Dict:
+    """Agrega una respuesta aprobada al índice"""
+    document = _get_index().add(question, answer, citations or [], roles or [], areas or [])
+    logger.info("📚 Respuesta aprobada agregada al índice FAQ", extra={"faq_id": document["id"]})
+    return document
+
+
+def close() -> None:
+    """Libera el mmap del segmento (al apagar la aplicación)"""
+    global _index
+    if _index is not None:
+        _index.close()
+        _index = None
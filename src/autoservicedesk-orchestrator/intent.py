@@ -0,0 +1,203 @@
+"""
+Clasificador local de intención: pregunta de conocimiento o requerimiento
+
+Es determinista y basado en rasgos léxicos. Solo marca como pregunta lo
+que tiene señales claras de consulta y ninguna de requerimiento, de modo
+que ante la duda la solicitud sigue el flujo completo (Policy Guard + Triage).
+
+Evaluación contra el corpus etiquetado de las pruebas (desde src/autoservicedesk-orchestrator):
+    python intent.py [tests/data/intent_corpus.json]
+"""
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import config
+from text_utils import normalize
+
+QUESTION = "question"
+REQUEST = "request"
+UNKNOWN = "unknown"
+
+# Rasgos de pregunta: (nombre, términos normalizados, peso)
+QUESTION_FEATURES: List[Tuple[str, List[str], float]] = [
+    ("interrogative_start", [
+        "como", "que", "cual", "cuales", "donde", "cuando", "por que", "para que", "quien",
+        "cuanto", "cuanta", "cuantos", "cuantas",
+        "existe", "hay", "se puede", "es posible", "puedo",
+        "how", "what", "which", "where", "when", "why", "who", "is there", "are there",
+        "how many", "how much", "can i", "do we", "does", "is it",
+    ], 0.5),
+    ("explain_verb", [
+        "explicame", "explica", "ayudame a entender", "ayudame con", "cuentame", "dime",
+        "informacion sobre", "explain", "tell me", "help me understand", "info about",
+    ], 0.5),
+    ("knowledge_topic", [
+        "instalar", "instalo", "instalacion", "version", "versiones", "permitido", "permitida",
+        "permitidos", "recomendada", "recomendado", "politica", "politicas", "procedimiento",
+        "manual", "guia", "documentacion", "configurar", "configuro", "proceso", "licencia",
+        "licencias", "vacaciones", "soporte", "significa",
+        "install", "installation", "allowed", "recommended", "policy", "procedure", "guide",
+        "documentation", "configure", "setup", "process", "license", "licenses", "mean",
+    ], 0.2),
+]
+
+
+
+def _ar_verb_forms(stem: str, first_person: bool = False) -> List[str]:
+    """
+    Formas de un verbo regular en -ar que piden la acción: infinitivo,
+    imperativo (con pronombres), 2.ª y 3.ª persona del plural ("borras",
+    "resetean") y, con first_person, la 1.ª persona ("reseteo", "elimino")
+    """
+    endings = [
+        "ar", "arlo", "arla", "arme", "a", "ame", "alo", "ala", "amelo",
+        "as", "an", "e", "es", "en", "enlo", "emelo",
+    ]
+    if first_person:
+        endings.append("o")
+    return [stem + ending for ending in endings]
+
+
+# Verbos de acción sobre cuentas y recursos: cualquier forma, incluida la 1.ª
+# persona ("¿Cómo desbloqueo mi cuenta?"), sigue el flujo completo
+ACTION_VERB_STEMS = ["resete", "desbloque", "reinici", "borr", "elimin"]
+# Verbos de requerimiento sin la 1.ª persona ("cambio" también es sustantivo)
+REQUEST_VERB_STEMS = ["asign", "habilit", "cambi", "instal"]
+
+# Rasgos de requerimiento: cualquiera impide enrutar la solicitud como pregunta,
+# aunque tenga rasgos de pregunta ("¿Qué tal si borras el repo legacy?")
+REQUEST_FEATURES: List[Tuple[str, List[str]]] = [
+    ("action_verb", [
+        form for stem in ACTION_VERB_STEMS for form in _ar_verb_forms(stem, first_person=True)
+    ] + [
+        "haz", "hazlo", "hagalo", "haganlo", "hazme", "ejecuta", "ejecutalo", "ejecutar", "ejecutes",
+        "reset", "resets", "unlock", "restart", "reboot", "wipe", "erase", "do it",
+    ]),
+    ("request_verb", [
+        "necesito", "dame", "quiero", "requiero", "solicito", "solicitar", "pido", "pedir",
+        "asigna", "asignar", "asigname", "otorga", "otorgar", "otorgame", "agrega", "agregame",
+        "agregar", "crea", "crear", "creame", "habilita", "habilitar", "elimina", "eliminar",
+        "borra", "borrar", "cambia", "cambiar", "modifica", "modificar",
+        "importa", "importar", "dar", "darme",
+        "need", "give", "grant", "want", "request", "add", "create", "enable", "delete",
+        "remove", "change", "modify", "import",
+    ] + [
+        form for stem in REQUEST_VERB_STEMS for form in _ar_verb_forms(stem)
+        # "instalar" y "se instala" son temas de pregunta ("¿Qué está permitido instalar?")
+        if form not in ("instalar", "instala", "instalarlo", "instalarla", "instalarme")
+    ]),
+    ("access_term", [
+        "acceso", "accesos", "permiso", "permisos", "contributor", "contribuidor", "admin",
+        "administrador", "reader", "lector", "owner", "rol", "access", "permission",
+        "permissions", "administrator", "role",
+    ]),
+    ("devops_action", [
+        "work item", "ticket", "pipeline", "branch policy", "politica de rama", "revisores",
+        "reviewers", "aprobacion", "approval", "repositorio nuevo", "new repository",
+    ]),
+]
+
+# Signo de interrogación en el texto original (se pierde al normalizar)
+QUESTION_MARK_WEIGHT = 0.3
+
+
+def _compile(terms: List[str]) -> re.Pattern:
+    alternatives = sorted((re.escape(normalize(t)) for t in terms), key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+
+_QUESTION_PATTERNS = [
+    (name, re.compile(r"^(?:" + _compile(terms).pattern + r")") if name == "interrogative_start" else _compile(terms), weight)
+    for name, terms, weight in QUESTION_FEATURES
+]
+_REQUEST_PATTERNS = [(name, _compile(terms)) for name, terms in REQUEST_FEATURES]
+
+
+@dataclass
+class IntentResult:
+    intent: str
+    confidence: float
+    features: List[str] = field(default_factory=list)
+
+    def is_confident_question(self, threshold: Optional[float] = None) -> bool:
+        threshold = config.INTENT_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        return self.intent == QUESTION and self.confidence >= threshold
+
+
+def classify_intent(user_request: str) -> IntentResult:
+    """
+    Clasifica la solicitud. La confianza de una pregunta es la suma de los
+    pesos de sus rasgos (máximo 1); con cualquier rasgo de requerimiento la
+    intención es REQUEST.
+    """
+    text = normalize(user_request)
+    if not text:
+        return IntentResult(UNKNOWN, 0.0)
+
+    request_features = [name for name, pattern in _REQUEST_PATTERNS if pattern.search(text)]
+    if request_features:
+        return IntentResult(REQUEST, 1.0, request_features)
+
+    features = []
+    score = 0.0
+    for name, pattern, weight in _QUESTION_PATTERNS:
+        if pattern.search(text):
+            features.append(name)
+            score += weight
+    if "?" in (user_request or ""):
+        features.append("question_mark")
+        score += QUESTION_MARK_WEIGHT
+
+    if not features:
+        return IntentResult(UNKNOWN, 0.0)
+    return IntentResult(QUESTION, round(min(score, 1.0), 2), features)
+
+
+# Corpus etiquetado que usan las pruebas (tests/test_intent.py)
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "data", "intent_corpus.json")
+
+
+def load_corpus(path: Optional[str] = None) -> List[Dict]:
+    with open(path or CORPUS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)["examples"]
+
+
+def evaluate(corpus: List[Dict], threshold: Optional[float] = None) -> Dict:
+    """
+    Evalúa el enrutamiento directo a Knowledge Base sobre un corpus etiquetado
+    ({"text", "label": "question" | "request"}).
+
+    - precision: de las solicitudes enrutadas como pregunta, cuántas lo eran
+    - recall: de las preguntas, cuántas se enrutaron directo
+    - misrouted: requerimientos enrutados como pregunta (se saltarían el Policy Guard)
+    """
+    routed_questions, routed_requests, missed = [], [], []
+    for example in corpus:
+        routed = classify_intent(example["text"]).is_confident_question(threshold)
+        if routed and example["label"] == QUESTION:
+            routed_questions.append(example["text"])
+        elif routed:
+            routed_requests.append(example["text"])
+        elif example["label"] == QUESTION:
+            missed.append(example["text"])
+
+    questions = sum(1 for e in corpus if e["label"] == QUESTION)
+    routed = len(routed_questions) + len(routed_requests)
+    return {
+        "examples": len(corpus),
+        "questions": questions,
+        "precision": round(len(routed_questions) / routed, 3) if routed else 1.0,
+        "recall": round(len(routed_questions) / questions, 3) if questions else 0.0,
+        "misrouted": routed_requests,
+        "missed": missed,
+    }
+
+
+if __name__ == "__main__":
+    report = evaluate(load_corpus(sys.argv[1] if len(sys.argv) > 1 else None))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if report["misrouted"] else 0)
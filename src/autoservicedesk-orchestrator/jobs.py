@@ -0,0 +1,461 @@
+"""
+Modo asíncrono: cola persistente de solicitudes y pool local de workers
+"""
+import aiohttp
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import config
+import logs
+import metrics
+from sqlite_utils import ThreadLocalConnection
+
+logger = logs.get_logger(__name__)
+
+JobHandler = Callable[[Dict], Awaitable[Dict]]
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# Error de los trabajos interrumpidos después de iniciar acciones con efectos
+INTERRUPTED_ERROR = "Interrumpido después de iniciar acciones con efectos; no se reintenta para no repetirlas"
+
+
+class QueueFullError(Exception):
+    """La cola alcanzó JOBS_MAX_QUEUED"""
+
+
+class InvalidCallbackError(ValueError):
+    """callback_url no es https o su host no está en JOBS_CALLBACK_ALLOWED_HOSTS"""
+
+
+def validate_callback_url(url: str) -> None:
+    """
+    Acepta solo URLs https sin credenciales cuyo host esté en
+    JOBS_CALLBACK_ALLOWED_HOSTS (exacto, o subdominios con "*.dominio").
+    Evita que el servicio haga peticiones a hosts internos (SSRF).
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme != "https" or not host or parts.username or parts.password:
+        raise InvalidCallbackError("callback_url debe ser una URL https sin credenciales")
+    for allowed in config.JOBS_CALLBACK_ALLOWED_HOSTS:
+        if host == allowed or (allowed.startswith("*.") and host.endswith(allowed[1:])):
+            return
+    raise InvalidCallbackError(f"El host {host} no está permitido como callback_url")
+
+
+class JobStore:
+    """Cola de trabajos persistida en SQLite (compartida por los procesos del host)"""
+
+    def __init__(self, path: str):
+        self._connections = ThreadLocalConnection(path)
+        conn = self._connections.get()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS support_jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " callback_url TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " owner TEXT,"
+            " heartbeat_at REAL,"
+            " side_effects_at REAL)"
+        )
+        # Colas creadas antes de registrar el dueño, el latido y la marca de efectos de cada trabajo
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(support_jobs)")}
+        for column, column_type in (("owner", "TEXT"), ("heartbeat_at", "REAL"), ("side_effects_at", "REAL")):
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE support_jobs ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError as e:
+                    # Otro proceso la agregó al mismo tiempo
+                    if "duplicate column" not in str(e):
+                        raise
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_support_jobs_status_created"
+            " ON support_jobs (status, created_at)"
+        )
+
+    def submit(self, payload: Dict, callback_url: Optional[str], max_queued: int) -> str:
+        """Encola un trabajo; lanza QueueFullError si la cola está llena"""
+        conn = self._connections.get()
+        job_id = uuid.uuid4().hex
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            queued = conn.execute(
+                "SELECT COUNT(*) FROM support_jobs WHERE status = ?", (QUEUED,)
+            ).fetchone()[0]
+            if queued >= max_queued:
+                raise QueueFullError(f"La cola de trabajos está llena ({queued} pendientes)")
+            conn.execute(
+                "INSERT INTO support_jobs (id, status, payload, callback_url, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False), callback_url, time.time()),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return job_id
+
+    def claim_next(self, owner: str) -> Optional[Dict]:
+        """Toma el trabajo pendiente más antiguo y lo marca en ejecución por owner (atómico entre procesos)"""
+        conn = self._connections.get()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, payload, callback_url FROM support_jobs"
+                " WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is not None:
+                now = time.time()
+                conn.execute(
+                    "UPDATE support_jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ? WHERE id = ?",
+                    (RUNNING, now, owner, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        return {"id": row[0], "payload": json.loads(row[1]), "callback_url": row[2]}
+
+    def finish(self, job_id: str, owner: str, result: Optional[Dict], error: Optional[str]) -> bool:
+        """Registra el resultado; retorna False si el trabajo ya no pertenece a owner (fue reencolado)"""
+        return self._connections.get().execute(
+            "UPDATE support_jobs SET status = ?, result = ?, error = ?, finished_at = ?"
+            " WHERE id = ? AND owner = ? AND status = ?",
+            (
+                FAILED if error else COMPLETED,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                error,
+                time.time(),
+                job_id,
+                owner,
+                RUNNING,
+            ),
+        ).rowcount == 1
+
+    def heartbeat(self, owner: str) -> int:
+        """Renueva el latido de los trabajos en ejecución de owner"""
+        return self._connections.get().execute(
+            "UPDATE support_jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+            (time.time(), owner, RUNNING),
+        ).rowcount
+
+    def mark_side_effects(self, job_id: str, owner: str) -> bool:
+        """Marca que el trabajo empezó acciones con efectos (MCP, tickets); ya no se reencola"""
+        return self._connections.get().execute(
+            "UPDATE support_jobs SET side_effects_at = COALESCE(side_effects_at, ?)"
+            " WHERE id = ? AND owner = ? AND status = ?",
+            (time.time(), job_id, owner, RUNNING),
+        ).rowcount == 1
+
+    def _interrupt(self, condition: str, params: tuple) -> Tuple[int, int]:
+        """
+        Trabajos en ejecución que cumplen condition: los que pasaron la marca de
+        efectos fallan (repetirlos duplicaría tickets o permisos) y el resto
+        vuelve a la cola. Retorna (reencolados, fallidos).
+        """
+        conn = self._connections.get()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            failed = conn.execute(
+                "UPDATE support_jobs SET status = ?, error = ?, finished_at = ?"
+                f" WHERE status = ? AND side_effects_at IS NOT NULL AND {condition}",
+                (FAILED, INTERRUPTED_ERROR, time.time(), RUNNING, *params),
+            ).rowcount
+            requeued = conn.execute(
+                "UPDATE support_jobs SET status = ?, started_at = NULL, owner = NULL, heartbeat_at = NULL"
+                f" WHERE status = ? AND {condition}",
+                (QUEUED, RUNNING, *params),
+            ).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return requeued, failed
+
+    def release(self, owner: str) -> Tuple[int, int]:
+        """Interrumpe los trabajos en ejecución de owner al apagar (ver _interrupt)"""
+        return self._interrupt("owner = ?", (owner,))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._connections.get().execute(
+            "SELECT id, status, result, error, created_at, started_at, finished_at"
+            " FROM support_jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "result": json.loads(row[2]) if row[2] else None,
+            "error": row[3],
+            "created_at": row[4],
+            "started_at": row[5],
+            "finished_at": row[6],
+        }
+
+    def requeue_stale(self, heartbeat_timeout_seconds: float) -> Tuple[int, int]:
+        """
+        Interrumpe los trabajos cuyo proceso dejó de latir (murió en plena
+        ejecución; ver _interrupt). Los que siguen latiendo en otro proceso no se tocan.
+        """
+        return self._interrupt("COALESCE(heartbeat_at, started_at) < ?", (time.time() - heartbeat_timeout_seconds,))
+
+    def purge_finished(self, retention_seconds: int) -> int:
+        return self._connections.get().execute(
+            "DELETE FROM support_jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (COMPLETED, FAILED, time.time() - retention_seconds),
+        ).rowcount
+
+    def count_by_status(self) -> Dict[str, int]:
+        rows = self._connections.get().execute(
+            "SELECT status, COUNT(*) FROM support_jobs GROUP BY status"
+        ).fetchall()
+        return dict(rows)
+
+
+class JobWorkerPool:
+    """
+    Pool acotado de workers asyncio que vacía la cola. Cada worker espera
+    nuevos trabajos con un aviso local o, como respaldo, consultando la cola
+    cada JOBS_POLL_INTERVAL_SECONDS (trabajos encolados por otros procesos).
+
+    Los trabajos tomados quedan a nombre del pool (owner), que renueva su
+    latido cada JOBS_HEARTBEAT_INTERVAL_SECONDS; los de un proceso que deja
+    de latir por JOBS_HEARTBEAT_TIMEOUT_SECONDS vuelven a la cola.
+    """
+
+    def __init__(self, store: JobStore, handler: JobHandler, workers: int, poll_interval: float):
+        self._store = store
+        self._handler = handler
+        self._workers = workers
+        self._poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        # Conteo por estado para /metrics, actualizado con cada latido
+        self.status_counts: Dict[str, int] = {}
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        await self._requeue_stale()
+        self.status_counts = await asyncio.to_thread(self._store.count_by_status)
+        self._http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10))
+        self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        self._tasks = [asyncio.create_task(self._run_worker(i)) for i in range(self._workers)]
+        logger.info("👷 Pool de trabajos iniciado con %s workers", self._workers)
+
+    async def stop(self, drain_timeout: float = 0) -> None:
+        """
+        Deja de tomar trabajos, espera los que están en ejecución hasta
+        drain_timeout y cancela el resto, que vuelve a la cola
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._tasks and drain_timeout > 0:
+            _, pending = await asyncio.wait(self._tasks, timeout=drain_timeout)
+            if pending:
+                logger.warning("⏳ %s workers siguen en ejecución tras el drenaje; se cancelan", len(pending))
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        requeued, failed = await asyncio.to_thread(self._store.release, self._owner)
+        if requeued:
+            logger.warning("♻️ %s trabajos interrumpidos devueltos a la cola", requeued)
+        self._record_interrupted(failed)
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            await asyncio.gather(self._heartbeat_task, return_exceptions=True)
+            self._heartbeat_task = None
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    async def _requeue_stale(self) -> None:
+        requeued, failed = await asyncio.to_thread(self._store.requeue_stale, config.JOBS_HEARTBEAT_TIMEOUT_SECONDS)
+        if requeued:
+            logger.warning("♻️ %s trabajos de procesos sin latido reencolados", requeued)
+            self.notify()
+        self._record_interrupted(failed)
+
+    @staticmethod
+    def _record_interrupted(failed: int) -> None:
+        if failed:
+            metrics.increment("jobs_finished_total", failed, status=FAILED)
+            metrics.increment("jobs_interrupted_total", failed)
+            logger.warning("🛑 %s trabajos interrumpidos tras iniciar acciones con efectos marcados como fallidos", failed)
+
+    async def _heartbeat_loop(self) -> None:
+        """Renueva el latido de los trabajos propios y reencola los de procesos caídos"""
+        while True:
+            await asyncio.sleep(config.JOBS_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(self._store.heartbeat, self._owner)
+                await self._requeue_stale()
+                self.status_counts = await asyncio.to_thread(self._store.count_by_status)
+            except sqlite3.Error as e:
+                logger.warning("⚠️ No se pudo renovar el latido de los trabajos: %s", e)
+
+    async def _run_worker(self, worker_index: int) -> None:
+        while not self._stopping:
+            try:
+                await self._run_next()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Un error de la cola ("database is locked", disco lleno) no debe detener al worker
+                metrics.increment("jobs_worker_errors_total")
+                logger.exception("Error en el worker de trabajos %s; se reintenta", worker_index)
+                await asyncio.sleep(self._poll_interval)
+
+    async def _run_next(self) -> None:
+        """Toma y ejecuta el siguiente trabajo, o espera uno nuevo si la cola está vacía"""
+        job = await asyncio.to_thread(self._store.claim_next, self._owner)
+        if job is None:
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_interval)
+            except asyncio.TimeoutError:
+                await asyncio.to_thread(self._store.purge_finished, config.JOBS_RETENTION_SECONDS)
+            return
+
+        await self._execute(job)
+
+    async def _execute(self, job: Dict) -> None:
+        result, error = None, None
+        token = _current_job.set((self._store, self._owner, job["id"]))
+        try:
+            result = await self._handler(job["payload"])
+        except asyncio.CancelledError:
+            # Apagado: stop() devuelve el trabajo a la cola (o lo marca fallido si pasó mark_side_effects)
+            raise
+        except Exception as e:
+            logger.exception("Error procesando el trabajo", extra={"job_id": job["id"]})
+            error = str(e)
+        finally:
+            _current_job.reset(token)
+
+        if not await self._finish(job["id"], result, error):
+            # Se dejó de latir a tiempo y otro worker lo tomó: su resultado es el que vale
+            logger.warning("⚠️ El trabajo fue reencolado mientras se ejecutaba; se descarta el resultado", extra={"job_id": job["id"]})
+            return
+        metrics.increment("jobs_finished_total", status=FAILED if error else COMPLETED)
+
+        if job["callback_url"]:
+            await self._send_callback(job["callback_url"], await asyncio.to_thread(self._store.get, job["id"]))
+
+    async def _finish(self, job_id: str, result: Optional[Dict], error: Optional[str]) -> bool:
+        """
+        Registra el resultado reintentando ante errores de la cola: el trabajo
+        ya se ejecutó y, sin registrarlo, quedaría en ejecución mientras el pool lata
+        """
+        while True:
+            try:
+                return await asyncio.to_thread(self._store.finish, job_id, self._owner, result, error)
+            except sqlite3.Error as e:
+                metrics.increment("jobs_worker_errors_total")
+                logger.warning("⚠️ No se pudo registrar el resultado del trabajo; se reintenta: %s", e, extra={"job_id": job_id})
+                await asyncio.sleep(self._poll_interval)
+
+    async def _send_callback(self, url: str, job: Dict) -> None:
+        """Notifica el resultado al callback del cliente; los fallos no afectan al trabajo"""
+        try:
+            # Se revalida al enviar: la lista de hosts permitidos pudo cambiar desde que se encoló
+            validate_callback_url(url)
+            async with self._http.post(url, json=job, allow_redirects=False) as response:
+                metrics.increment("jobs_callbacks_total", status=str(response.status))
+        except Exception as e:
+            metrics.increment("jobs_callbacks_total", status="error")
+            logger.warning("⚠️ No se pudo notificar el trabajo a %s: %s", url, e, extra={"job_id": job["job_id"]})
+
+
+_store: Optional[JobStore] = None
+_pool: Optional[JobWorkerPool] = None
+
+# Trabajo que ejecuta la tarea actual: (cola, owner, job_id)
+_current_job: ContextVar[Optional[Tuple[JobStore, str, str]]] = ContextVar("current_job", default=None)
+
+
+async def mark_side_effects() -> None:
+    """
+    Llamar antes de acciones con efectos (MCP, tickets de aprobación). Si el
+    trabajo en curso se interrumpe después, se marca fallido en lugar de
+    volver a la cola. Fuera de un trabajo no hace nada.
+    """
+    current = _current_job.get()
+    if current is None:
+        return
+    store, owner, job_id = current
+    await asyncio.to_thread(store.mark_side_effects, job_id, owner)
+
+
+def _collect_metrics():
+    if _pool is None:
+        return
+    counts = _pool.status_counts
+    for status in (QUEUED, RUNNING):
+        yield "jobs_in_state", "gauge", {"status": status}, counts.get(status, 0)
+
+
+metrics.register_collector(_collect_metrics)
+
+
+async def start_workers(handler: JobHandler) -> None:
+    """Abre la cola e inicia el pool de workers (al iniciar la aplicación)"""
+    global _store, _pool
+    _store = await asyncio.to_thread(JobStore, config.JOBS_SQLITE_PATH)
+    _pool = JobWorkerPool(_store, handler, config.JOBS_MAX_WORKERS, config.JOBS_POLL_INTERVAL_SECONDS)
+    await _pool.start()
+
+
+async def stop_workers(drain_timeout: float = 0) -> None:
+    """Detiene el pool de workers esperando hasta drain_timeout a los trabajos en curso (al apagar la aplicación)"""
+    global _pool
+    if _pool is not None:
+        await _pool.stop(drain_timeout)
+        _pool = None
+
+
+async def submit_job(payload: Dict, callback_url: Optional[str] = None) -> str:
+    """Encola una solicitud y retorna su id; lanza InvalidCallbackError o QueueFullError"""
+    if callback_url:
+        validate_callback_url(callback_url)
+    job_id = await asyncio.to_thread(_store.submit, payload, callback_url, config.JOBS_MAX_QUEUED)
+    metrics.increment("jobs_submitted_total")
+    if _pool is not None:
+        _pool.notify()
+    return job_id
+
+
+async def get_job(job_id: str) -> Optional[Dict]:
+    """Retorna el estado y resultado de un trabajo"""
+    return await asyncio.to_thread(_store.get, job_id)
@@ -0,0 +1,90 @@
+"""
+Caché de respuestas de la Knowledge Base para preguntas frecuentes
+"""
+from typing import Dict, List, Optional
+
+import config
+import logs
+import metrics
+from cache import LRUCache, fingerprint
+from text_utils import normalize
+
+logger = logs.get_logger(__name__)
+
+_answers = LRUCache(
+    max_size=config.KB_CACHE_SIZE,
+    ttl_seconds=config.KB_CACHE_TTL_SECONDS,
+)
+
+# Versión vigente de los documentos; cambia al invalidar tras una actualización
+_kb_version = config.KB_VERSION
+
+
+def _cache_key(question: str, user_profile: Dict, kb_version: str) -> tuple:
+    """Huella de la pregunta normalizada + rol y área + versión de la Knowledge Base"""
+    return (
+        fingerprint(normalize(question)),
+        user_profile.get("role"),
+        user_profile.get("area"),
+        config.KNOWLEDGE_BASE_AGENT_ID,
+        kb_version,
+    )
+
+
+def get_answer(question: str, user_profile: Dict) -> Optional[Dict]:
+    """Retorna {"response", "citations"} cacheado para la pregunta y el perfil, o None"""
+    if not config.KB_CACHE_ENABLED:
+        return None
+
+    answer = _answers.get(_cache_key(question, user_profile, _kb_version))
+    metrics.increment("kb_cache_lookups_total", result="hit" if answer else "miss")
+    if answer is None:
+        return None
+    return {"response": answer["response"], "citations": [dict(c) for c in answer["citations"]]}
+
+
+def store_answer(
+        question: str,
+        user_profile: Dict,
+        response: str,
+        citations: List[Dict],
+        kb_version: str,
+) -> None:
+    """
+    Guarda la respuesta de la Knowledge Base con sus citas. kb_version es la
+    versión vigente al lanzar el run: si se invalidó mientras tanto, la
+    respuesta puede venir de documentos anteriores y no se guarda.
+    """
+    if not config.KB_CACHE_ENABLED or not response or kb_version != _kb_version:
+        return
+    _answers.set(
+        _cache_key(question, user_profile, kb_version),
+        {"response": response, "citations": [dict(c) for c in citations]},
+    )
+    metrics.set_gauge("kb_cache_entries", len(_answers))
+
+
+def invalidate(kb_version: Optional[str] = None) -> int:
+    """
+    Vacía la caché tras un cambio en los documentos y adopta kb_version (o
+    una nueva versión derivada de la actual), de modo que las respuestas en
+    vuelo no vuelvan a entrar. Retorna las entradas eliminadas.
+    """
+    global _kb_version
+    _kb_version = kb_version or _next_version(_kb_version)
+    removed = len(_answers)
+    _answers.clear()
+    metrics.increment("kb_cache_invalidations_total")
+    metrics.set_gauge("kb_cache_entries", 0)
+    logger.info("🧹 Caché de Knowledge Base invalidada (%s entradas, versión %s)", removed, _kb_version)
+    return removed
+
+
+def _next_version(version: str) -> str:
+    base, _, generation = version.partition("+")
+    return f"{base}+{int(generation or 0) + 1}"
+
+
+def current_version() -> str:
+    """Versión vigente de la Knowledge Base (se pasa luego a store_answer)"""
+    return _kb_version
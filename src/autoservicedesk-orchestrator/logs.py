@@ -0,0 +1,167 @@
+"""
+Logging estructurado y no bloqueante
+
+Los registros se encolan en el hilo que los emite y un QueueListener los
+formatea y escribe en stdout desde un hilo aparte, para que la E/S no
+compita con la atención de solicitudes. Cada registro lleva el id de
+correlación de la solicitud en curso y su thread_id.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+import config
+
+ROOT_LOGGER = "techdesk"
+
+_correlation_id: ContextVar[Optional[str]] = ContextVar("correlation_id", default=None)
+_thread_id: ContextVar[Optional[str]] = ContextVar("thread_id", default=None)
+
+# Atributos estándar de LogRecord que no se copian como campos extra
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+class _ContextFilter(logging.Filter):
+    """Copia el contexto de la solicitud al registro antes de encolarlo"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = _correlation_id.get()
+        record.thread_id = getattr(record, "thread_id", None) or _thread_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por línea con los campos extra del registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Formato legible para desarrollo local"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(correlation_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "correlation_id"):
+            record.correlation_id = None
+        text = super().format(record)
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            text += "\n" + json.dumps(payload, indent=2, ensure_ascii=False, default=str)
+        return text
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que no formatea en el hilo emisor: solo resuelve el mensaje
+    y la traza de la excepción, el formato final lo hace el listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure() -> None:
+    """Configura el logger raíz de la aplicación (idempotente)"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter() if config.LOG_FORMAT == "json" else TextFormatter())
+
+        log_queue: queue.Queue = queue.Queue(-1)
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(_ContextFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(config.LOG_LEVEL)
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """Vacía la cola de registros y detiene el listener"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+            logging.getLogger(ROOT_LOGGER).handlers.clear()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Retorna un logger de la aplicación"""
+    configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+@contextmanager
+def request_context(thread_id: Optional[str] = None):
+    """Asigna un id de correlación nuevo a la solicitud en curso"""
+    correlation_token = _correlation_id.set(uuid.uuid4().hex[:16])
+    thread_token = _thread_id.set(thread_id)
+    try:
+        yield
+    finally:
+        _thread_id.reset(thread_token)
+        _correlation_id.reset(correlation_token)
+
+
+def bind_thread(thread_id: str) -> None:
+    """Asocia el thread_id (una vez conocido) a los registros de la solicitud en curso"""
+    _thread_id.set(thread_id)
+
+
+def should_sample() -> bool:
+    """Indica si se debe registrar un volcado detallado (LOG_PAYLOAD_SAMPLE_RATE)"""
+    rate = config.LOG_PAYLOAD_SAMPLE_RATE
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def log_payload(logger: logging.Logger, message: str, payload: Any) -> None:
+    """
+    Registra un volcado completo en DEBUG solo para una muestra de las
+    solicitudes; la serialización se omite si no se va a registrar. Se
+    copia el payload porque el listener lo serializa más tarde.
+    """
+    if logger.isEnabledFor(logging.DEBUG) and should_sample():
+        logger.debug(message, extra={"payload": copy.deepcopy(payload)})
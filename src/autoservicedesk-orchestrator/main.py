@@ -1,17 +1,61 @@
 """
 API FastAPI para TechDesk Copilot
 """
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
-from typing import Optional
-import traceback
+from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
+from typing import Dict, List, Optional
+import hmac
+import json
+
+import admission
+import agent_sweeper
+import clients
+import config
+import events
+import faq_index
+import jobs
+import kb_cache
+import logs
+import metrics
+import policy_cache
+import policy_rules
+import run_utils
+import thread_manager
+from orchestrator import process_batch, process_request
+from services.user_profile import reload_profiles
+
+logger = logs.get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Crea el cliente compartido, los pools de threads y trabajos y el barrido de
+    agentes al iniciar. Al apagar drena los trabajos y runs en curso antes de cerrarlos.
+    """
+    await clients.startup()
+    await thread_manager.start()
+    await agent_sweeper.start()
+    await jobs.start_workers(run_job)
+    yield
+    await jobs.stop_workers(config.SHUTDOWN_DRAIN_TIMEOUT_SECONDS)
+    await run_utils.drain_runs(await clients.get_agents_client(), config.SHUTDOWN_DRAIN_TIMEOUT_SECONDS)
+    await agent_sweeper.stop()
+    await thread_manager.stop()
+    await clients.shutdown()
+    faq_index.close()
+    logs.shutdown()
 
-from orchestrator import process_request
 
 app = FastAPI(
     title="TechDesk Copilot API",
     description="API de soporte TI multiagente",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
@@ -21,19 +65,191 @@ class SupportRequest(BaseModel):
     thread_id: Optional[str] = None
 
 
+class JobSupportRequest(SupportRequest):
+    callback_url: Optional[str] = None
+
+
+class BatchSupportRequest(BaseModel):
+    items: List[SupportRequest]
+    max_concurrency: Optional[int] = None
+
+
+class KbCacheInvalidateRequest(BaseModel):
+    kb_version: Optional[str] = None
+
+
+class ApprovedAnswerRequest(BaseModel):
+    question: str
+    answer: str
+    citations: List[Dict] = []
+    # Restricción opcional por rol y área del usuario (vacío = todos)
+    roles: List[str] = []
+    areas: List[str] = []
+
+
+async def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """Exige la clave ADMIN_API_KEY en X-Admin-Key; sin clave configurada las rutas /admin quedan deshabilitadas"""
+    if not config.ADMIN_API_KEY:
+        raise HTTPException(status_code=403, detail="Rutas de administración deshabilitadas (ADMIN_API_KEY no configurada)")
+    if not x_admin_key or not hmac.compare_digest(x_admin_key.encode(), config.ADMIN_API_KEY.encode()):
+        raise HTTPException(status_code=401, detail="Clave de administración inválida")
+
+
+def rate_limit_key(request: Request, user_email: Optional[str]) -> Optional[str]:
+    """
+    Clave del límite de tasa: la identidad autenticada que agrega el gateway
+    en USER_RATE_LIMIT_IDENTITY_HEADER o, si no está configurado, el
+    user_email del cuerpo (no autenticado: un cliente puede variarlo)
+    """
+    if not config.USER_RATE_LIMIT_IDENTITY_HEADER:
+        return user_email
+    identity = request.headers.get(config.USER_RATE_LIMIT_IDENTITY_HEADER)
+    if not identity:
+        raise HTTPException(status_code=401, detail="Falta la identidad autenticada de la solicitud")
+    return identity
+
+
+def _too_many_requests(e: admission.AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"Demasiadas solicitudes ({e.reason}), intenta de nuevo más tarde",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def admit(request: Request, user_email: str) -> admission.Admission:
+    """Admite la solicitud o responde 429 con Retry-After si el usuario o el servicio están saturados"""
+    try:
+        return await admission.admit(rate_limit_key(request, user_email))
+    except admission.AdmissionRejected as e:
+        raise _too_many_requests(e)
+
+
+async def run_job(payload: Dict) -> Dict:
+    """Ejecuta un trabajo encolado ocupando un lugar del control de admisión"""
+    ticket = await admission.acquire_slot(queue_limits=False)
+    try:
+        return await process_request(**payload)
+    finally:
+        ticket.release()
+
+
 @app.post("/support")
-async def support_endpoint(payload: SupportRequest):
+async def support_endpoint(payload: SupportRequest, request: Request):
     """Endpoint principal de soporte"""
+    ticket = await admit(request, payload.user_email)
     try:
-        result = process_request(
+        result = await process_request(
             user_request=payload.user_request,
             user_email=payload.user_email,
             thread_id=payload.thread_id,
         )
         return result
     except Exception as e:
-        traceback.print_exc()
+        logger.exception("Error procesando la solicitud")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
+
+
+@app.post("/support/stream")
+async def support_stream_endpoint(payload: SupportRequest, request: Request):
+    """
+    Endpoint de soporte con Server-Sent Events: publica la decisión de
+    política, las llamadas a agentes y los fragmentos de la respuesta final
+    a medida que ocurren, y termina con el evento "result".
+    """
+    async def run():
+        return await process_request(
+            user_request=payload.user_request,
+            user_email=payload.user_email,
+            thread_id=payload.thread_id,
+        )
+
+    ticket = await admit(request, payload.user_email)
+
+    async def event_generator():
+        try:
+            async for event, data in events.stream(run):
+                yield {"event": event, "data": json.dumps(data, ensure_ascii=False)}
+        finally:
+            ticket.release()
+
+    # La tarea de fondo libera el lugar si el stream nunca llega a iniciarse
+    return EventSourceResponse(event_generator(), background=BackgroundTask(ticket.release))
+
+
+@app.post("/support/batch")
+async def support_batch_endpoint(payload: BatchSupportRequest, request: Request):
+    """Procesa un lote de solicitudes con concurrencia acotada y resultados por elemento"""
+    if len(payload.items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {config.BATCH_MAX_ITEMS} solicitudes",
+        )
+
+    # Sin identidad autenticada cada elemento usa su propio user_email
+    user_key = rate_limit_key(request, None)
+    max_concurrency = min(
+        payload.max_concurrency or config.BATCH_MAX_CONCURRENCY,
+        config.BATCH_MAX_CONCURRENCY,
+    )
+    return await process_batch(
+        [item.model_dump() for item in payload.items],
+        max(1, max_concurrency),
+        user_key=user_key,
+    )
+
+
+@app.post("/support/jobs", status_code=202)
+async def support_job_endpoint(payload: JobSupportRequest, request: Request):
+    """Encola una solicitud y retorna su id sin esperar a que se procese"""
+    # El límite de tasa se aplica al encolar; al ejecutarse el trabajo solo ocupa un lugar
+    try:
+        admission.check_rate_limit(rate_limit_key(request, payload.user_email))
+    except admission.AdmissionRejected as e:
+        raise _too_many_requests(e)
+    try:
+        job_id = await jobs.submit_job(
+            payload.model_dump(exclude={"callback_url"}),
+            callback_url=payload.callback_url,
+        )
+    except jobs.InvalidCallbackError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except jobs.QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return {"job_id": job_id, "status": jobs.QUEUED}
+
+
+@app.get("/support/jobs/{job_id}")
+async def support_job_status_endpoint(job_id: str):
+    """Estado y resultado de una solicitud encolada"""
+    job = await jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return job
+
+
+@app.post("/admin/policy-cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_policy_cache():
+    """Invalida las decisiones cacheadas y recarga reglas y perfiles tras un cambio"""
+    reload_profiles()
+    policy_rules.reload_rules()
+    removed = policy_cache.invalidate()
+    return {"status": "ok", "removed_entries": removed}
+
+
+@app.post("/admin/kb-cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_kb_cache(payload: Optional[KbCacheInvalidateRequest] = None):
+    """Invalida las respuestas cacheadas de la Knowledge Base tras actualizar sus documentos"""
+    removed = kb_cache.invalidate(payload.kb_version if payload else None)
+    return {"status": "ok", "removed_entries": removed, "kb_version": kb_cache.current_version()}
+
+
+@app.post("/admin/faq-index/answers", status_code=201, dependencies=[Depends(require_admin)])
+async def add_approved_answer(payload: ApprovedAnswerRequest):
+    """Agrega una respuesta aprobada al índice local de preguntas frecuentes"""
+    return faq_index.add_answer(**payload.model_dump())
 
 
 @app.get("/health")
@@ -41,6 +257,15 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métricas en formato de texto de Prometheus"""
+    return PlainTextResponse(
+        metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=3000, reload=True)
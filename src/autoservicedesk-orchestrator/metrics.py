@@ -0,0 +1,133 @@
+"""
+Métricas del proceso en formato Prometheus
+"""
+import threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelSet, float]] = {}
+_gauges: Dict[str, Dict[LabelSet, float]] = {}
+_histograms: Dict[str, Dict[LabelSet, "_HistogramSeries"]] = {}
+
+# Límites (en segundos) de los buckets de latencia por defecto
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Funciones que publican valores calculados al momento de exponer las métricas:
+# cada una retorna tuplas (nombre, tipo, labels, valor)
+_collectors: List[Callable[[], Iterable[Tuple[str, str, Dict, float]]]] = []
+
+
+def _label_set(labels: Dict) -> LabelSet:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels) -> None:
+    """Incrementa un contador"""
+    key = _label_set(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels) -> None:
+    """Fija el valor de un gauge"""
+    key = _label_set(labels)
+    with _lock:
+        _gauges.setdefault(name, {})[key] = value
+
+
+class _HistogramSeries:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels) -> None:
+    """Registra una observación en un histograma"""
+    key = _label_set(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = _HistogramSeries(buckets)
+        histogram.observe(value)
+
+
+def get_value(name: str, **labels) -> float:
+    """Retorna el valor actual de un contador o gauge (o el número de observaciones de un histograma)"""
+    key = _label_set(labels)
+    with _lock:
+        if name in _histograms:
+            histogram = _histograms[name].get(key)
+            return histogram.count if histogram else 0
+        series = _counters.get(name) or _gauges.get(name) or {}
+        return series.get(key, 0)
+
+
+def register_collector(collector: Callable[[], Iterable[Tuple[str, str, Dict, float]]]) -> None:
+    """Registra una función que publica métricas al momento de exponerlas"""
+    _collectors.append(collector)
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels:
+        escaped = v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _render_histogram(name: str, series: Dict[LabelSet, _HistogramSeries]) -> List[str]:
+    lines = [f"# TYPE {name} histogram"]
+    for labels, histogram in sorted(series.items()):
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            bucket_labels = labels + (("le", f"{bound:g}"),)
+            lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+        lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """Genera la exposición de texto de Prometheus"""
+    families: Dict[str, Tuple[str, Dict[LabelSet, float]]] = {}
+    with _lock:
+        for kind, family in (("counter", _counters), ("gauge", _gauges)):
+            for name, series in family.items():
+                families[name] = (kind, dict(series))
+        histograms = {}
+        for name, series in _histograms.items():
+            histograms[name] = {}
+            for labels, histogram in series.items():
+                snapshot = _HistogramSeries(histogram.buckets)
+                snapshot.counts = list(histogram.counts)
+                snapshot.sum, snapshot.count = histogram.sum, histogram.count
+                histograms[name][labels] = snapshot
+
+    for collector in _collectors:
+        for name, kind, labels, value in collector():
+            families.setdefault(name, (kind, {}))[1][_label_set(labels)] = value
+
+    lines = []
+    for name in sorted(families):
+        kind, series = families[name]
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in sorted(series.items()):
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    for name in sorted(histograms):
+        lines.extend(_render_histogram(name, histograms[name]))
+    return "\n".join(lines) + "\n"
@@ -1,34 +1,42 @@
 """
 Orquestador principal del sistema multiagente
 """
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import MessageRole, ToolSet
-from azure.identity import DefaultAzureCredential
-import json
-from typing import Dict, Optional
-
+from azure.ai.agents.aio import AgentsClient
+from azure.ai.agents.models import Agent, MessageRole, AsyncToolSet, McpTool, RunStatus
+from azure.core.exceptions import ResourceNotFoundError
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+import admission
+import agent_registry
+import clients
 import config
 import context
+import events
+import faq_index
+import jobs
+import kb_cache
+import logs
+import metrics
+import payload_codec
+import policy_cache
+import policy_rules
+import thread_manager
+import timing
 from policy import call_policy_guard
 from agents_utils import interpret_confirmation, generate_ux_message, create_triage_agent
-from run_utils import analyze_run_steps, get_final_response
+from intent import IntentResult, classify_intent
+from run_utils import analyze_run_steps, get_final_answer, get_final_response, stream_run, track_run, truncation_strategy
 from services.user_profile import get_user_profile
+from speculation import Speculation
 from agents.mcp_devops_agent import create_mcp_devops_agent
 from agents.knowledge_base_agent import create_knowledge_base_tool
 
-
-def create_agents_client() -> AgentsClient:
-    """Crea el cliente de Azure AI Agents"""
-    return AgentsClient(
-        endpoint=config.PROJECT_ENDPOINT,
-        credential=DefaultAzureCredential(
-            exclude_environment_credential=True,
-            exclude_managed_identity_credential=True,
-        ),
-    )
+logger = logs.get_logger(__name__)
 
 
-def handle_confirmation_flow(
+async def handle_confirmation_flow(
         agents_client: AgentsClient,
         user_request: str,
         user_email: str,
@@ -36,15 +44,17 @@ def handle_confirmation_flow(
 ) -> Dict:
     """Maneja el flujo cuando estamos esperando confirmación del usuario"""
 
-    conv_context = context.get_context(thread_id)
+    conv_context = await context.get_context(thread_id)
+    timing.set_decision((conv_context.get("last_policy_decision") or {}).get("decision"))
 
     # Interpretar respuesta del usuario
-    decision = interpret_confirmation(
+    decision = await interpret_confirmation(
         agents_client,
         config.MODEL_DEPLOYMENT_NAME,
         user_request
     )
-    print(f"🤖 Interpretación confirmación: {decision}")
+    logger.info("🤖 Interpretación confirmación: %s", decision)
+    await events.emit("confirmation", {"decision": decision})
 
     tools_called = {
         "policy_guard": True,
@@ -54,7 +64,7 @@ def handle_confirmation_flow(
 
     # Usuario dijo NO
     if decision == "no":
-        context.clear_confirmation_flag(thread_id)
+        await context.clear_confirmation_flag(thread_id)
 
         state = {
             "mode": "INFO",
@@ -63,7 +73,7 @@ def handle_confirmation_flow(
                 "reason": "Usuario rechazó la creación del ticket de aprobación.",
             },
         }
-        response_text = generate_ux_message(
+        response_text = await generate_ux_message(
             agents_client,
             config.MODEL_DEPLOYMENT_NAME,
             state
@@ -78,22 +88,52 @@ def handle_confirmation_flow(
 
     # Usuario dijo SÍ
     if decision == "yes":
+        # Solo la primera confirmación ejecuta la acción (otro worker pudo recibir un "sí" duplicado)
+        if not await context.consume_confirmation(thread_id):
+            state = {
+                "mode": "INFO",
+                "policy_decision": conv_context.get("last_policy_decision"),
+                "extra_context": {
+                    "reason": "Tu confirmación ya fue recibida y la solicitud se está procesando.",
+                },
+            }
+            response_text = await generate_ux_message(
+                agents_client,
+                config.MODEL_DEPLOYMENT_NAME,
+                state
+            )
+
+            return {
+                "thread_id": thread_id,
+                "response": response_text,
+                "tools_used": tools_called,
+                "run_status": "completed",
+            }
+
         original_request = conv_context.get("last_denied_request") or user_request
         user_profile = get_user_profile(user_email)
         last_policy_decision = conv_context.get("last_policy_decision")
 
-        print("✅ Usuario confirmó creación de ticket, llamando al multiagente...")
-
-        return execute_multiagent_flow(
-            agents_client,
-            original_request,
-            user_email,
-            user_profile,
-            thread_id,
-            conv_context,
-            last_policy_decision,
-            mode="CREATE_APPROVAL_TICKET",
-        )
+        logger.info("✅ Usuario confirmó creación de ticket, llamando al multiagente...")
+
+        try:
+            result = await execute_multiagent_flow(
+                agents_client,
+                original_request,
+                user_email,
+                user_profile,
+                thread_id,
+                conv_context,
+                last_policy_decision,
+                mode="CREATE_APPROVAL_TICKET",
+            )
+        except BaseException:
+            # La acción no se ejecutó: un nuevo "sí" debe poder reintentarla
+            await asyncio.shield(context.restore_confirmation(thread_id))
+            raise
+        if result["run_status"] != "completed":
+            await context.restore_confirmation(thread_id)
+        return result
 
     # No está claro
     state = {
@@ -103,7 +143,7 @@ def handle_confirmation_flow(
             "instruction": "El usuario no fue claro, pídele que responda solo sí o no.",
         },
     }
-    response_text = generate_ux_message(
+    response_text = await generate_ux_message(
         agents_client,
         config.MODEL_DEPLOYMENT_NAME,
         state
@@ -117,7 +157,45 @@ def handle_confirmation_flow(
     }
 
 
-def execute_multiagent_flow(
+async def get_triage_agents(agents_client: AgentsClient) -> Tuple[Agent, Agent, McpTool]:
+    """
+    Obtiene del registro los agentes MCP y de Triage (se crean solo si su
+    definición cambió). Retorna (agente MCP, agente de Triage, McpTool).
+    """
+    mcp_agent, mcp_agent_tool, mcp_tool = await create_mcp_devops_agent(
+        agents_client,
+        config.MODEL_DEPLOYMENT_NAME,
+        config.MCP_SERVER_URL
+    )
+
+    knowledge_base_tool = create_knowledge_base_tool(config.KNOWLEDGE_BASE_AGENT_ID)
+
+    triage_agent = await create_triage_agent(
+        agents_client,
+        config.MODEL_DEPLOYMENT_NAME,
+        [knowledge_base_tool.definitions[0], mcp_agent_tool.definitions[0]],
+    )
+    return mcp_agent, triage_agent, mcp_tool
+
+
+async def run_triage(agents_client: AgentsClient, thread_id: str, triage_agent: Agent, mcp_agent: Agent):
+    """Ejecuta el run de Triage en el thread (con streaming de eventos si hay suscriptores)"""
+    if events.is_streaming():
+        return await stream_run(
+            agents_client,
+            thread_id,
+            triage_agent.id,
+            {mcp_agent.id: "mcp_ado", config.KNOWLEDGE_BASE_AGENT_ID: "knowledge_base"},
+        )
+    return await agents_client.runs.create_and_process(
+        thread_id=thread_id,
+        agent_id=triage_agent.id,
+        truncation_strategy=truncation_strategy(),
+        #toolset=toolset,
+    )
+
+
+async def execute_multiagent_flow(
         agents_client: AgentsClient,
         user_request: str,
         user_email: str,
@@ -126,66 +204,82 @@ def execute_multiagent_flow(
         conv_context: Dict,
         policy_decision: Dict,
         mode: Optional[str] = None,
+        cached_policy_decision: Optional[Dict] = None,
 ) -> Dict:
     """Ejecuta el flujo completo multiagente (Triage + MCP + Knowledge)"""
 
-    # Crear agentes dinámicos
-    mcp_agent, mcp_agent_tool, mcp_tool = create_mcp_devops_agent(
-        agents_client,
-        config.MODEL_DEPLOYMENT_NAME,
-        config.MCP_SERVER_URL
-    )
-    print(f"✅ MCP Agent creado: {mcp_agent.id}")
-
-    knowledge_base_tool = create_knowledge_base_tool(config.KNOWLEDGE_BASE_AGENT_ID)
+    # Preguntas ya respondidas o aprobadas: sin Triage ni llamadas a la red.
+    # Solo con un veredicto de pregunta seguro: el índice compara términos y
+    # "Resetea mi contraseña" se parece a "¿Cómo reseteo mi contraseña?"
+    if mode is None and classify_intent(user_request).is_confident_question():
+        answer = find_local_answer(user_request, user_profile)
+        if answer is not None:
+            return knowledge_base_result(thread_id, answer, policy_guard=True)
 
-    triage_agent = create_triage_agent(
-        agents_client,
-        config.MODEL_DEPLOYMENT_NAME,
-        [knowledge_base_tool.definitions[0], mcp_agent_tool.definitions[0]],
-    )
+    mcp_agent, triage_agent, mcp_tool = await get_triage_agents(agents_client)
 
     # Asegurar thread
     if thread_id is None:
-        thread = agents_client.threads.create()
-        thread_id = thread.id
-        print(f"✨ Nuevo thread: {thread_id}")
+        thread_id = await thread_manager.new_thread(agents_client)
+        logs.bind_thread(thread_id)
+        logger.info("✨ Nuevo thread")
     else:
-        print(f"♻️ Reutilizando thread: {thread_id}")
+        logger.info("♻️ Reutilizando thread")
 
     # Preparar payload
+    conversation_state = context.conversation_state(conv_context)
+    if conversation_state.get("last_policy_decision") == policy_decision:
+        # Ya viaja como policy_decision
+        conversation_state.pop("last_policy_decision")
+
     payload = {
         "user_request": user_request,
         "user_email": user_email,
         "user_profile": user_profile,
-        "conversation_state": conv_context,
+        "conversation_state": conversation_state,
         "policy_decision": policy_decision,
     }
 
     if mode:
         payload["mode"] = mode
 
-    print(f"\n📤 Payload:")
-    print(json.dumps(payload, indent=2, ensure_ascii=False))
+    if cached_policy_decision:
+        payload["cached_policy_decision"] = cached_policy_decision
 
-    # Ejecutar
-    agents_client.messages.create(
-        thread_id=thread_id,
-        role=MessageRole.USER,
-        content=json.dumps(payload, ensure_ascii=False),
-    )
+    logs.log_payload(logger, "📤 Payload", payload)
+
+    # Desde aquí el Triage puede ejecutar acciones MCP: un trabajo interrumpido no se repite
+    await jobs.mark_side_effects()
 
-    toolset = ToolSet()
+    # Ejecutar: solo se envían los campos que cambiaron desde el turno anterior
+    content = await payload_codec.encode_for_thread("triage", thread_id, payload)
+    try:
+        await agents_client.messages.create(
+            thread_id=thread_id,
+            role=MessageRole.USER,
+            content=content,
+        )
+    except Exception:
+        # El agente no recibió este estado: el próximo turno envía un keyframe
+        await payload_codec.reset_thread(thread_id, "triage")
+        raise
+
+    toolset = AsyncToolSet()
     toolset.add(mcp_tool)
 
-    run = agents_client.runs.create_and_process(
-        thread_id=thread_id,
-        agent_id=triage_agent.id,
-        #toolset=toolset,
-    )
+    with timing.stage("triage_run"), track_run(agents_client, thread_id):
+        try:
+            run = await run_triage(agents_client, thread_id, triage_agent, mcp_agent)
+        except ResourceNotFoundError as e:
+            # Un agente cacheado se borró en el servicio: se resuelven de nuevo y se reintenta una vez
+            if not agent_registry.forget(triage_agent.id, mcp_agent.id):
+                raise
+            logger.warning("⚠️ Agente de Triage o MCP no encontrado; se vuelven a resolver: %s", e)
+            mcp_agent, triage_agent, mcp_tool = await get_triage_agents(agents_client)
+            run = await run_triage(agents_client, thread_id, triage_agent, mcp_agent)
 
     # Analizar resultados
-    tools_called = analyze_run_steps(
+    tools_called = await analyze_run_steps(
         agents_client,
         thread_id,
         run.id,
@@ -193,18 +287,8 @@ def execute_multiagent_flow(
         config.KNOWLEDGE_BASE_AGENT_ID,
     )
 
-    response_text = get_final_response(agents_client, thread_id)
-
-    # Limpieza
-    print(f'\n{"=" * 80}')
-    print("LIMPIEZA")
-    print(f'{"=" * 80}')
-    agents_client.delete_agent(triage_agent.id)
-    agents_client.delete_agent(mcp_agent.id)
-    print("✅ Agentes temporales eliminados")
-
-    if mode == "CREATE_APPROVAL_TICKET":
-        context.clear_confirmation_flag(thread_id)
+    with timing.stage("final_response"):
+        response_text = await get_final_response(agents_client, thread_id, run.id)
 
     return {
         "thread_id": thread_id,
@@ -214,7 +298,200 @@ def execute_multiagent_flow(
     }
 
 
-def handle_policy_decision(
+def find_local_answer(user_request: str, user_profile: Dict) -> Optional[Dict]:
+    """
+    Respuesta de la caché de Knowledge Base o del índice de respuestas
+    aprobadas, sin llamar a ningún agente
+    """
+    cached_answer = kb_cache.get_answer(user_request, user_profile)
+    if cached_answer is not None:
+        logger.info("⚡ Respuesta de Knowledge Base obtenida de caché")
+        return {**cached_answer, "run_status": "completed"}
+
+    match = faq_index.find_answer(user_request, user_profile)
+    if match is not None:
+        logger.info(
+            "📚 Respuesta aprobada obtenida del índice local",
+            extra={"faq_id": match["id"], "faq_confidence": match["confidence"]},
+        )
+        return {"response": match["answer"], "citations": match["citations"], "run_status": "completed"}
+    return None
+
+
+async def run_knowledge_base(
+        agents_client: AgentsClient,
+        thread_id: str,
+        user_request: str,
+        user_profile: Dict,
+        stream: bool = False,
+        stage_prefix: str = "",
+) -> Dict:
+    """
+    Pregunta al agente de Knowledge Base en el thread y cachea la respuesta.
+    stage_prefix distingue en las métricas de latencia el trabajo especulativo.
+    """
+    kb_version = kb_cache.current_version()
+
+    payload = {
+        "question": user_request,
+        "user_context": {"role": user_profile.get("role"), "area": user_profile.get("area")},
+    }
+    await agents_client.messages.create(
+        thread_id=thread_id,
+        role=MessageRole.USER,
+        content=payload_codec.encode_compact("knowledge_base", payload),
+    )
+
+    with timing.stage(f"{stage_prefix}knowledge_base_run"), track_run(agents_client, thread_id):
+        if stream:
+            run = await stream_run(agents_client, thread_id, config.KNOWLEDGE_BASE_AGENT_ID, {})
+        else:
+            run = await agents_client.runs.create_and_process(
+                thread_id=thread_id,
+                agent_id=config.KNOWLEDGE_BASE_AGENT_ID,
+                truncation_strategy=truncation_strategy(),
+            )
+
+    with timing.stage(f"{stage_prefix}final_response"):
+        response_text, citations = await get_final_answer(agents_client, thread_id, run.id)
+
+    if run.status == RunStatus.COMPLETED:
+        kb_cache.store_answer(user_request, user_profile, response_text, citations, kb_version)
+
+    return {"response": response_text, "citations": citations, "run_status": run.status}
+
+
+def knowledge_base_result(thread_id: str, answer: Dict, policy_guard: bool) -> Dict:
+    """Respuesta final de una solicitud resuelta por la Knowledge Base"""
+    return {
+        "thread_id": thread_id,
+        "response": answer["response"],
+        "citations": answer["citations"],
+        "tools_used": {
+            "policy_guard": policy_guard,
+            "mcp_ado": False,
+            "knowledge_base": True,
+        },
+        "run_status": answer["run_status"],
+    }
+
+
+async def execute_knowledge_base_flow(
+        agents_client: AgentsClient,
+        user_request: str,
+        user_profile: Dict,
+        thread_id: Optional[str],
+) -> Dict:
+    """
+    Responde una pregunta con la caché, el índice de respuestas aprobadas o
+    llamando directamente al agente de Knowledge Base
+    """
+    timing.set_decision(timing.KNOWLEDGE_BASE_DECISION)
+
+    reused_thread = thread_id is not None
+    if not reused_thread:
+        thread_id = await thread_manager.new_thread(agents_client)
+        logs.bind_thread(thread_id)
+        logger.info("✨ Nuevo thread")
+    await events.emit("intent", {"thread_id": thread_id, "intent": "question"})
+
+    answer = find_local_answer(user_request, user_profile)
+    if answer is None:
+        answer = await run_knowledge_base(
+            agents_client,
+            thread_id,
+            user_request,
+            user_profile,
+            stream=events.is_streaming(),
+        )
+        if reused_thread:
+            await payload_codec.note_thread_messages(thread_id)
+
+    return knowledge_base_result(thread_id, answer, policy_guard=False)
+
+
+async def prefetch_knowledge_base_answer(
+        agents_client: AgentsClient,
+        user_request: str,
+        user_profile: Dict,
+) -> Dict:
+    """Respuesta de la Knowledge Base en un thread auxiliar (el de la conversación está ocupado)"""
+    answer = find_local_answer(user_request, user_profile)
+    if answer is not None:
+        return answer
+    async with thread_manager.ephemeral_thread(agents_client) as kb_thread_id:
+        return await run_knowledge_base(
+            agents_client,
+            kb_thread_id,
+            user_request,
+            user_profile,
+            stage_prefix="speculative_",
+        )
+
+
+async def call_policy_guard_with_speculation(
+        agents_client: AgentsClient,
+        user_request: str,
+        user_email: str,
+        user_profile: Dict,
+        thread_id: Optional[str],
+        intent_result: IntentResult,
+) -> Tuple[Dict, Optional[Dict]]:
+    """
+    Llama al Policy Guard y, si el clasificador de intención considera la
+    solicitud una pregunta de conocimiento con la confianza del enrutamiento
+    (INTENT_CONFIDENCE_THRESHOLD), consulta en paralelo la Knowledge Base.
+    Retorna (resultado del Policy Guard, respuesta de la Knowledge Base o None).
+
+    La respuesta se usa por ese veredicto, no porque el Policy Guard
+    auto-apruebe: una acción auto-aprobada debe pasar por el Triage. El
+    Policy Guard solo puede vetarla (denegación o aprobación previa); en
+    ese caso se descarta y se cancela el run si sigue en curso. Un "?" no
+    basta: "¿Me instalas Docker?" es una acción y debe llegar al Triage.
+    """
+    if not intent_result.is_confident_question():
+        with timing.stage("policy_guard"):
+            policy_result = await call_policy_guard(
+                agents_client,
+                config.POLICY_AGENT_ID,
+                user_request,
+                user_email,
+                user_profile,
+                thread_id,
+            )
+        return policy_result, None
+
+    speculation = Speculation(
+        "knowledge_base",
+        prefetch_knowledge_base_answer(agents_client, user_request, user_profile),
+    )
+    try:
+        with timing.stage("policy_guard"):
+            policy_result = await call_policy_guard(
+                agents_client,
+                config.POLICY_AGENT_ID,
+                user_request,
+                user_email,
+                user_profile,
+                thread_id,
+            )
+    except BaseException:
+        speculation.discard()
+        raise
+
+    vetoed = policy_result["decision"].get("decision", "").upper() in ("DENEGAR", "REQUIERE_APROBACION")
+    if vetoed or policy_result["run_status"] != "completed":
+        speculation.discard()
+        return policy_result, None
+
+    with timing.stage("speculative_wait"):
+        answer = await speculation.use()
+    if answer is None or answer["run_status"] != "completed" or not answer["response"]:
+        return policy_result, None
+    return policy_result, answer
+
+
+async def handle_policy_decision(
         agents_client: AgentsClient,
         decision: Dict,
         user_request: str,
@@ -234,7 +511,7 @@ def handle_policy_decision(
 
     # REQUIERE APROBACIÓN
     if decision_value == "REQUIERE_APROBACION":
-        context.set_waiting_confirmation(thread_id, user_request, decision)
+        await context.set_waiting_confirmation(thread_id, user_request, decision)
 
         state = {
             "mode": "NEEDS_APPROVAL",
@@ -247,7 +524,7 @@ def handle_policy_decision(
                 ),
             },
         }
-        response_text = generate_ux_message(
+        response_text = await generate_ux_message(
             agents_client,
             config.MODEL_DEPLOYMENT_NAME,
             state
@@ -266,7 +543,7 @@ def handle_policy_decision(
             "mode": "DENIED",
             "policy_decision": decision,
         }
-        response_text = generate_ux_message(
+        response_text = await generate_ux_message(
             agents_client,
             config.MODEL_DEPLOYMENT_NAME,
             state
@@ -283,7 +560,22 @@ def handle_policy_decision(
     return None
 
 
-def process_request(
+async def process_request(
+        user_request: str,
+        user_email: str,
+        thread_id: Optional[str] = None,
+) -> Dict:
+    """
+    Procesa una solicitud del usuario midiendo la latencia de cada etapa
+    (ver _process_request).
+    """
+    with logs.request_context(thread_id), timing.request() as timer:
+        result = await _process_request(user_request, user_email, thread_id)
+        timer.run_status = result.get("run_status") or timing.UNKNOWN
+        return result
+
+
+async def _process_request(
         user_request: str,
         user_email: str,
         thread_id: Optional[str] = None,
@@ -293,68 +585,182 @@ def process_request(
 
     Flujo:
     1. Si hay thread con confirmación pendiente -> manejar confirmación
-    2. Si no, evaluar con Policy Guard
-    3. Según decisión:
+    2. Si el clasificador local está seguro de que es una pregunta -> Knowledge Base
+    3. Si no, evaluar con Policy Guard
+    4. Según decisión:
        - REQUIERE_APROBACION -> preguntar
        - DENEGAR -> denegar
        - AUTO_APROBAR -> ejecutar multiagente
     """
-    agents_client = create_agents_client()
-
-    with agents_client:
-        # 1) Verificar si estamos esperando confirmación
-        if thread_id is not None:
-            conv_context = context.get_context(thread_id)
-
-            if conv_context.get("awaiting_work_item_confirmation", False):
-                return handle_confirmation_flow(
+    with timing.stage("client"):
+        agents_client = await clients.get_agents_client()
+
+    # 1) Verificar si estamos esperando confirmación
+    if thread_id is not None:
+        thread_manager.touch(thread_id)
+        conv_context = await context.get_context(thread_id)
+
+        if conv_context.get("awaiting_work_item_confirmation", False):
+            return await handle_confirmation_flow(
+                agents_client,
+                user_request,
+                user_email,
+                thread_id,
+            )
+
+    user_profile = get_user_profile(user_email)
+
+    intent_result = classify_intent(user_request)
+
+    # 2) Preguntas de conocimiento: directo a la Knowledge Base, sin Policy Guard ni Triage
+    if config.INTENT_ROUTING_ENABLED:
+        routed = intent_result.is_confident_question()
+        metrics.increment("intent_classifications_total", intent=intent_result.intent, routed=str(routed).lower())
+        if routed:
+            logger.info(
+                "❓ Pregunta detectada localmente, llamando a la Knowledge Base...",
+                extra={"intent_confidence": intent_result.confidence, "intent_features": intent_result.features},
+            )
+            return await execute_knowledge_base_flow(agents_client, user_request, user_profile, thread_id)
+
+    # 3) Flujo normal: reglas locales, caché o Policy Guard
+    speculative_answer = None
+    rule_decision = policy_rules.evaluate(user_request, user_email, user_profile)
+    cached_decision = rule_decision or policy_cache.get_decision(user_request, user_profile)
+
+    if cached_decision is not None:
+        if rule_decision is not None:
+            logger.info("📐 Decisión resuelta por la regla local %s", rule_decision["rule_id"])
+            decision_source = "rules"
+        else:
+            logger.info("⚡ Decisión de Policy Guard obtenida de caché")
+            decision_source = "cache"
+        decision = cached_decision
+
+        if thread_id is None:
+            thread_id = await thread_manager.new_thread(agents_client)
+            logs.bind_thread(thread_id)
+            logger.info("✨ Nuevo thread")
+    else:
+        logger.info("🔍 Llamando a Policy Guard antes del multiagente...")
+        decision_source = "policy_guard"
+
+        # Pregunta que pasa por el Policy Guard: la Knowledge Base se consulta en paralelo
+        if config.SPECULATIVE_KB_ENABLED:
+            policy_result, speculative_answer = await call_policy_guard_with_speculation(
+                agents_client,
+                user_request,
+                user_email,
+                user_profile,
+                thread_id,
+                intent_result,
+            )
+        else:
+            with timing.stage("policy_guard"):
+                policy_result = await call_policy_guard(
                     agents_client,
+                    config.POLICY_AGENT_ID,
                     user_request,
                     user_email,
+                    user_profile,
                     thread_id,
                 )
 
-        # 2) Flujo normal: Policy Guard primero
-        user_profile = get_user_profile(user_email)
-        print("🔍 Llamando a Policy Guard antes del multiagente...")
-
-        policy_result = call_policy_guard(
-            agents_client,
-            config.POLICY_AGENT_ID,
-            user_request,
-            user_email,
-            user_profile,
-            thread_id,
-        )
-
         thread_id = policy_result["thread_id"]
+        logs.bind_thread(thread_id)
         decision = policy_result["decision"]
 
-        # Actualizar contexto
-        conv_context = context.get_context(thread_id)
-        conv_context["last_policy_decision"] = decision
-        context.update_context(thread_id, conv_context)
+        if policy_result["run_status"] == "completed":
+            policy_cache.store_decision(user_request, user_profile, decision)
 
-        # 3) Manejar decisión de política
-        policy_response = handle_policy_decision(
-            agents_client,
-            decision,
-            user_request,
-            thread_id,
-        )
+    metrics.increment("policy_evaluations_total", source=decision_source)
+    timing.set_decision(decision.get("decision"))
+    await events.emit("policy_decision", {
+        "thread_id": thread_id,
+        "source": decision_source,
+        "decision": decision,
+    })
 
-        if policy_response:
-            return policy_response
+    # Actualizar contexto
+    conv_context = await context.set_last_policy_decision(thread_id, decision)
 
-        # 4) Auto-aprobado: ejecutar multiagente
-        print("✅ Policy Guard permite continuar, llamando al orquestador multiagente...")
+    # 4) Manejar decisión de política
+    policy_response = await handle_policy_decision(
+        agents_client,
+        decision,
+        user_request,
+        thread_id,
+    )
 
-        return execute_multiagent_flow(
-            agents_client,
-            user_request,
-            user_email,
-            user_profile,
-            thread_id,
-            conv_context,
-            decision,
-        )
+    if policy_response:
+        return policy_response
+
+    if speculative_answer is not None:
+        logger.info("🔮 Usando la respuesta especulativa de la Knowledge Base")
+        return knowledge_base_result(thread_id, speculative_answer, policy_guard=True)
+
+    # 5) Auto-aprobado: ejecutar multiagente
+    logger.info("✅ Policy Guard permite continuar, llamando al orquestador multiagente...")
+
+    return await execute_multiagent_flow(
+        agents_client,
+        user_request,
+        user_email,
+        user_profile,
+        thread_id,
+        conv_context,
+        decision,
+        cached_policy_decision=cached_decision,
+    )
+
+
+async def process_batch(items: List[Dict], max_concurrency: int, user_key: Optional[str] = None) -> Dict:
+    """
+    Procesa varias solicitudes con process_request, con como máximo
+    max_concurrency en paralelo. Un fallo no detiene el resto del lote.
+
+    Cada elemento pasa por el control de admisión: consume un token del
+    límite de tasa de user_key (o de su user_email) y ocupa un lugar del
+    límite global de solicitudes en curso.
+
+    Retorna el resultado o error de cada elemento (en el orden recibido),
+    su duración y un resumen del lote.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    batch_start = time.perf_counter()
+
+    async def run_item(index: int, item: Dict) -> Dict:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ticket = await admission.admit(user_key or item["user_email"], queue_limits=False)
+            except admission.AdmissionRejected as e:
+                return {"index": index, "status": "error", "error": e.reason, "retry_after": e.retry_after, "elapsed_ms": 0.0}
+            try:
+                result = await process_request(
+                    user_request=item["user_request"],
+                    user_email=item["user_email"],
+                    thread_id=item.get("thread_id"),
+                )
+                outcome = {"index": index, "status": "ok", "result": result}
+            except Exception as e:
+                logger.exception("Error procesando el elemento %s del lote", index)
+                outcome = {"index": index, "status": "error", "error": str(e)}
+            finally:
+                ticket.release()
+            outcome["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            return outcome
+
+    results = await asyncio.gather(*(run_item(i, item) for i, item in enumerate(items)))
+    failed = sum(1 for r in results if r["status"] == "error")
+
+    return {
+        "results": results,
+        "summary": {
+            "total": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "max_concurrency": max_concurrency,
+            "elapsed_ms": round((time.perf_counter() - batch_start) * 1000, 1),
+        },
+    }
@@ -0,0 +1,149 @@
+"""
+Codificación compacta de los payloads enviados a los agentes
+
+Los campos nulos o por defecto se omiten y, en threads de conversación,
+solo se envía lo que cambió desde el último payload (JSON Merge Patch:
+null = campo eliminado). Cada cierto número de turnos se envía el estado
+completo (keyframe), y siempre antes de que el último keyframe salga de la
+ventana de truncado del thread.
+
+Cada payload lleva un número de secuencia ("seq") y cada delta el de
+su base ("base"): en el thread se intercalan mensajes de otros agentes y
+respuestas, así que el agente no debe suponer que la base es el mensaje
+anterior.
+"""
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import config
+import context
+import logs
+import metrics
+
+logger = logs.get_logger(__name__)
+
+FULL = "full"
+DELTA = "delta"
+
+# Mensajes que agrega cada run sobre el thread: el payload y la respuesta del agente
+MESSAGES_PER_RUN = 2
+
+# Aproximación de caracteres por token para estimar el ahorro sin un tokenizador
+CHARS_PER_TOKEN = 4
+
+TOKEN_BUCKETS = (0, 25, 50, 100, 200, 400, 800, 1600, 3200)
+
+
+def _is_default(value: Any) -> bool:
+    return value is None or value is False or (isinstance(value, (str, list, dict)) and not value)
+
+
+def compact(value: Any) -> Any:
+    """Elimina recursivamente los campos nulos, vacíos o en False"""
+    if isinstance(value, dict):
+        items = ((k, compact(v)) for k, v in value.items())
+        return {k: v for k, v in items if not _is_default(v)}
+    if isinstance(value, list):
+        return [compact(v) for v in value]
+    return value
+
+
+def merge_patch(previous: Dict, current: Dict) -> Dict:
+    """Calcula el JSON Merge Patch (RFC 7386) que transforma previous en current"""
+    patch = {}
+    for key in previous.keys() - current.keys():
+        patch[key] = None
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(old, dict) and isinstance(value, dict):
+            nested = merge_patch(old, value)
+            if nested:
+                patch[key] = nested
+        elif old != value:
+            patch[key] = value
+    return patch
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _dumps(payload: Dict) -> str:
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def _needs_keyframe(snapshot: Optional[Dict]) -> bool:
+    if snapshot is None or "seq" not in snapshot:
+        return True
+    if snapshot["turns_since_keyframe"] >= config.PAYLOAD_KEYFRAME_INTERVAL:
+        return True
+    # El keyframe y todos los deltas posteriores deben seguir dentro de la ventana de truncado
+    window = config.THREAD_TRUNCATION_LAST_MESSAGES
+    return window > 0 and snapshot["messages_since_keyframe"] + MESSAGES_PER_RUN > window
+
+
+def encode(snapshot: Optional[Dict], payload: Dict) -> Tuple[Dict, Dict]:
+    """
+    Codifica payload contra el snapshot del último estado enviado.
+    Retorna (mensaje a enviar, nuevo snapshot).
+    """
+    state = compact(payload)
+    seq = (snapshot or {}).get("seq", 0) + 1
+    if not config.PAYLOAD_DELTA_ENABLED or _needs_keyframe(snapshot):
+        message = {"encoding": FULL, "seq": seq, **state}
+        return message, {
+            "state": state,
+            "seq": seq,
+            "turns_since_keyframe": 0,
+            "messages_since_keyframe": MESSAGES_PER_RUN - 1,
+        }
+
+    message = {"encoding": DELTA, "seq": seq, "base": snapshot["seq"], **merge_patch(snapshot["state"], state)}
+    return message, {
+        "state": state,
+        "seq": seq,
+        "turns_since_keyframe": snapshot["turns_since_keyframe"] + 1,
+        "messages_since_keyframe": snapshot["messages_since_keyframe"] + MESSAGES_PER_RUN,
+    }
+
+
+def _record_savings(agent: str, payload: Dict, content: str, encoding: str) -> None:
+    baseline = estimate_tokens(json.dumps(payload, ensure_ascii=False))
+    sent = estimate_tokens(content)
+    metrics.increment("payload_tokens_estimated_total", baseline, agent=agent, kind="baseline")
+    metrics.increment("payload_tokens_estimated_total", sent, agent=agent, kind="sent")
+    metrics.increment("payloads_encoded_total", agent=agent, encoding=encoding)
+    metrics.observe("payload_tokens_saved", max(baseline - sent, 0), buckets=TOKEN_BUCKETS, agent=agent)
+    logger.debug(
+        "📦 Payload compacto para %s", agent,
+        extra={"encoding": encoding, "baseline_tokens": baseline, "sent_tokens": sent},
+    )
+
+
+def encode_compact(agent: str, payload: Dict) -> str:
+    """Serializa el payload sin campos nulos ni por defecto (para agentes que no entienden deltas)"""
+    content = _dumps(compact(payload))
+    _record_savings(agent, payload, content, FULL)
+    return content
+
+
+async def encode_for_thread(agent: str, thread_id: str, payload: Dict) -> str:
+    """
+    Serializa el payload como delta respecto del último enviado a agent en
+    el thread (o como keyframe) y guarda el nuevo snapshot en el contexto.
+    """
+    message = await context.swap_payload_snapshot(thread_id, agent, lambda snapshot: encode(snapshot, payload))
+    content = _dumps(message)
+    _record_savings(agent, payload, content, message["encoding"])
+    return content
+
+
+async def note_thread_messages(thread_id: str, count: int = MESSAGES_PER_RUN) -> None:
+    """Registra mensajes agregados al thread por otros runs (cuentan para la ventana de truncado)"""
+    if config.THREAD_TRUNCATION_LAST_MESSAGES > 0:
+        await context.add_payload_snapshot_messages(thread_id, count)
+
+
+async def reset_thread(thread_id: str, agent: str) -> None:
+    """Descarta el snapshot de agent en el thread para que el próximo payload sea un keyframe"""
+    await context.swap_payload_snapshot(thread_id, agent, lambda snapshot: (None, None))
@@ -1,13 +1,20 @@
 """
 Evaluación de políticas con Policy Guard
 """
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import MessageRole, ListSortOrder
+from azure.ai.agents.aio import AgentsClient
+from azure.ai.agents.models import MessageRole
 import json
 from typing import Dict, Optional
 
+import logs
+import payload_codec
+import thread_manager
+from run_utils import get_last_agent_message, track_run, truncation_strategy
 
-def call_policy_guard(
+logger = logs.get_logger(__name__)
+
+
+async def call_policy_guard(
         agents_client: AgentsClient,
         policy_agent_id: str,
         user_request: str,
@@ -31,12 +38,12 @@ def call_policy_guard(
             "run_status": str
         }
     """
-    if thread_id is None:
-        thread = agents_client.threads.create()
-        thread_id = thread.id
-        print(f"✨ Nuevo thread (Policy Guard): {thread_id}")
+    reused_thread = thread_id is not None
+    if not reused_thread:
+        thread_id = await thread_manager.new_thread(agents_client)
+        logger.info("✨ Nuevo thread (Policy Guard)", extra={"thread_id": thread_id})
     else:
-        print(f"♻️ Reutilizando thread (Policy Guard): {thread_id}")
+        logger.info("♻️ Reutilizando thread (Policy Guard)")
 
     payload = {
         "user_request": user_request,
@@ -44,26 +51,23 @@ def call_policy_guard(
         "user_profile": user_profile,
     }
 
-    agents_client.messages.create(
+    await agents_client.messages.create(
         thread_id=thread_id,
         role=MessageRole.USER,
-        content=json.dumps(payload, ensure_ascii=False),
-    )
-
-    run = agents_client.runs.create_and_process(
-        thread_id=thread_id,
-        agent_id=policy_agent_id,
+        content=payload_codec.encode_compact("policy_guard", payload),
     )
+    if reused_thread:
+        # Estos mensajes cuentan para la ventana de truncado de los deltas del Triage
+        await payload_codec.note_thread_messages(thread_id)
 
-    messages = agents_client.messages.list(
-        thread_id=thread_id,
-        order=ListSortOrder.DESCENDING,
-    )
+    with track_run(agents_client, thread_id):
+        run = await agents_client.runs.create_and_process(
+            thread_id=thread_id,
+            agent_id=policy_agent_id,
+            truncation_strategy=truncation_strategy(),
+        )
 
-    policy_msg = next(
-        (m for m in messages if m.role == MessageRole.AGENT and m.text_messages),
-        None,
-    )
+    policy_msg = await get_last_agent_message(agents_client, thread_id, run.id)
 
     if not policy_msg:
         raise RuntimeError("Policy Guard no devolvió respuesta")
@@ -0,0 +1,57 @@
+"""
+Caché de decisiones del Policy Guard
+"""
+from typing import Dict, Optional
+
+import config
+import logs
+import metrics
+from cache import LRUCache, fingerprint
+from text_utils import normalize
+
+logger = logs.get_logger(__name__)
+
+_decisions = LRUCache(
+    max_size=config.POLICY_CACHE_SIZE,
+    ttl_seconds=config.POLICY_CACHE_TTL_SECONDS,
+)
+
+
+def _cache_key(user_request: str, user_profile: Dict) -> tuple:
+    """Huella de la solicitud normalizada + perfil + versión de las políticas"""
+    return (
+        fingerprint(normalize(user_request)),
+        user_profile.get("role"),
+        user_profile.get("area"),
+        user_profile.get("trust_level"),
+        config.POLICY_AGENT_ID,
+        config.POLICY_VERSION,
+    )
+
+
+def get_decision(user_request: str, user_profile: Dict) -> Optional[Dict]:
+    """Retorna la decisión cacheada para la solicitud y el perfil, o None"""
+    if not config.POLICY_CACHE_ENABLED:
+        return None
+
+    decision = _decisions.get(_cache_key(user_request, user_profile))
+    metrics.increment("policy_cache_lookups_total", result="hit" if decision else "miss")
+    return dict(decision) if decision else None
+
+
+def store_decision(user_request: str, user_profile: Dict, decision: Dict) -> None:
+    """Guarda la decisión del Policy Guard"""
+    if not config.POLICY_CACHE_ENABLED:
+        return
+    _decisions.set(_cache_key(user_request, user_profile), dict(decision))
+    metrics.set_gauge("policy_cache_entries", len(_decisions))
+
+
+def invalidate() -> int:
+    """Vacía la caché (cambio de políticas o de perfiles). Retorna las entradas eliminadas"""
+    removed = len(_decisions)
+    _decisions.clear()
+    metrics.increment("policy_cache_invalidations_total")
+    metrics.set_gauge("policy_cache_entries", 0)
+    logger.info("🧹 Caché de políticas invalidada (%s entradas)", removed)
+    return removed
@@ -0,0 +1,176 @@
+"""
+Motor local de reglas de política (evaluación previa al Policy Guard)
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import config
+import logs
+from text_utils import normalize
+
+logger = logs.get_logger(__name__)
+
+WILDCARD = "*"
+GRANT = "grant"
+REVOKE = "revoke"
+
+_EMAIL = re.compile(r"[\w.+'-]+@[\w-]+(?:\.[\w-]+)+")
+
+
+def _compile_terms(terms: List[str]) -> re.Pattern:
+    """Compila una lista de términos normalizados en una regex por palabra completa"""
+    if not terms:
+        return re.compile(r"(?!)")
+    alternatives = sorted((re.escape(normalize(t)) for t in terms), key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+
+class Rule:
+    """Regla declarativa compilada"""
+
+    def __init__(self, position: int, definition: Dict):
+        self.position = position
+        self.id = definition["id"]
+        self.action = definition.get("action", WILDCARD)
+        self.operation = definition.get("operation", GRANT)
+        self.roles = definition.get("roles", [WILDCARD])
+        self.areas = set(definition.get("areas", [WILDCARD]))
+        self.min_trust_level = definition.get("min_trust_level")
+        self.max_trust_level = definition.get("max_trust_level")
+        self.decision = {
+            "decision": definition["decision"],
+            "risk_level": definition.get("risk_level", "medium"),
+            "reason": definition.get("reason", ""),
+            "policy_refs": list(definition.get("policy_refs", [])),
+            "required_approver_role": definition.get("required_approver_role"),
+        }
+
+    def matches(self, user_profile: Dict, resource_area: Optional[str]) -> bool:
+        """Compara el perfil del solicitante y el área dueña del recurso solicitado"""
+        trust_level = user_profile.get("trust_level", 1)
+        if WILDCARD not in self.areas and resource_area not in self.areas:
+            return False
+        if self.min_trust_level is not None and trust_level < self.min_trust_level:
+            return False
+        if self.max_trust_level is not None and trust_level > self.max_trust_level:
+            return False
+        return True
+
+
+class RulesEngine:
+    """
+    Reglas compiladas e indexadas por (operación, acción, rol).
+
+    Solo decide cuando la solicitud es claramente un requerimiento de una
+    única acción conocida, para el propio solicitante, y alguna regla
+    coincide con su perfil y con el área del recurso; en cualquier otro caso
+    retorna None y la decisión queda en manos del Policy Guard.
+    """
+
+    def __init__(self, definition: Dict):
+        self.version = definition.get("version", "0")
+        self._request_markers = _compile_terms(definition.get("request_markers", []))
+        self._question_markers = _compile_terms(definition.get("question_markers", []))
+        self._revoke_markers = _compile_terms(definition.get("revoke_markers", []))
+        self._third_party_markers = _compile_terms(definition.get("third_party_markers", []))
+        self._target_prepositions = _compile_terms(definition.get("target_prepositions", []))
+        self._target_terms = {normalize(t) for t in definition.get("target_terms", [])}
+        self._actions = {
+            action: _compile_terms(terms)
+            for action, terms in definition.get("actions", {}).items()
+        }
+        self._resource_areas = {
+            area: _compile_terms(terms)
+            for area, terms in definition.get("resource_areas", {}).items()
+        }
+
+        self._index: Dict[Tuple[str, str, str], List[Rule]] = {}
+        for position, rule_definition in enumerate(definition.get("rules", [])):
+            rule = Rule(position, rule_definition)
+            for role in rule.roles:
+                self._index.setdefault((rule.operation, rule.action, role), []).append(rule)
+
+    def detect_action(self, user_request: str) -> Optional[Tuple[str, str]]:
+        """Retorna (operación, acción) solicitada, o None si no es un requerimiento inequívoco"""
+        text = normalize(user_request)
+        if self._question_markers.search(text) or not self._request_markers.search(text):
+            return None
+
+        detected = [action for action, pattern in self._actions.items() if pattern.search(text)]
+        if len(detected) != 1:
+            return None
+        operation = REVOKE if self._revoke_markers.search(text) else GRANT
+        return operation, detected[0]
+
+    def is_for_requester(self, user_request: str, user_email: str) -> bool:
+        """
+        True si la solicitud no menciona a otra persona como destinataria:
+        ningún correo distinto al del solicitante, ningún tercero conocido
+        (equipo, proveedor...) y ninguna preposición de destino ("para",
+        "a", "to"...) seguida de algo que no sea el propio solicitante o un
+        recurso.
+        """
+        own_email = (user_email or "").strip().lower()
+        for email in _EMAIL.findall(user_request.lower()):
+            if email != own_email:
+                return False
+
+        text = normalize(_EMAIL.sub(" mi ", user_request))
+        if self._third_party_markers.search(text):
+            return False
+        for match in self._target_prepositions.finditer(text):
+            following = text[match.end():].split(maxsplit=1)
+            if following and following[0] not in self._target_terms:
+                return False
+        return True
+
+    def resource_area(self, user_request: str) -> Optional[str]:
+        """Área dueña del recurso mencionado, o None si no se reconoce uno solo"""
+        text = normalize(user_request)
+        areas = [area for area, pattern in self._resource_areas.items() if pattern.search(text)]
+        return areas[0] if len(areas) == 1 else None
+
+    def evaluate(self, user_request: str, user_email: str, user_profile: Dict) -> Optional[Dict]:
+        """Evalúa la solicitud; retorna una decisión con el formato del Policy Guard o None"""
+        detected = self.detect_action(user_request)
+        if detected is None or not self.is_for_requester(user_request, user_email):
+            return None
+
+        operation, action = detected
+        resource_area = self.resource_area(user_request)
+        role = user_profile.get("role")
+        candidates = []
+        for key in ((action, role), (action, WILDCARD), (WILDCARD, role), (WILDCARD, WILDCARD)):
+            candidates.extend(self._index.get((operation, *key), []))
+
+        for rule in sorted(candidates, key=lambda r: r.position):
+            if rule.matches(user_profile, resource_area):
+                decision = dict(rule.decision)
+                decision["policy_refs"] = list(decision["policy_refs"])
+                decision["action"] = action
+                decision["operation"] = operation
+                decision["rule_id"] = rule.id
+                return decision
+        return None
+
+
+@lru_cache
+def _load_engine() -> RulesEngine:
+    with open(config.POLICY_RULES_PATH, "r", encoding="utf-8") as f:
+        engine = RulesEngine(json.load(f))
+    logger.info("📐 Reglas de política cargadas (versión %s)", engine.version)
+    return engine
+
+
+def evaluate(user_request: str, user_email: str, user_profile: Dict) -> Optional[Dict]:
+    """Evalúa la solicitud con las reglas locales si están habilitadas"""
+    if not config.POLICY_RULES_ENABLED:
+        return None
+    return _load_engine().evaluate(user_request, user_email, user_profile)
+
+
+def reload_rules() -> None:
+    """Descarta las reglas compiladas para que se relean del archivo"""
+    _load_engine.cache_clear()
@@ -1,12 +1,63 @@
 """
 Utilidades para analizar la ejecución de agentes
 """
-from azure.ai.agents import AgentsClient
-from azure.ai.agents.models import MessageRole, ListSortOrder
-from typing import Dict
+from azure.ai.agents.aio import AgentsClient
+from azure.ai.agents.models import (
+    MessageDeltaChunk,
+    MessageRole,
+    ListSortOrder,
+    RunStatus,
+    RunStep,
+    ThreadMessage,
+    ThreadRun,
+    TruncationObject,
+)
+import asyncio
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
 
+import config
+import events
+import logs
+import timing
 
-def analyze_run_steps(
+logger = logs.get_logger(__name__)
+
+_ACTIVE_RUN_STATUSES = {RunStatus.QUEUED, RunStatus.IN_PROGRESS, RunStatus.REQUIRES_ACTION}
+
+# Runs en curso en este proceso por thread y cancelaciones pendientes
+_active_runs: Dict[str, int] = {}
+_cancel_tasks: Set[asyncio.Task] = set()
+
+
+def truncation_strategy() -> Optional[TruncationObject]:
+    """
+    Estrategia de truncado para runs sobre threads de conversación: el modelo
+    solo recibe los últimos THREAD_TRUNCATION_LAST_MESSAGES mensajes (0 = sin truncar).
+    """
+    if config.THREAD_TRUNCATION_LAST_MESSAGES <= 0:
+        return None
+    return TruncationObject(type="last_messages", last_messages=config.THREAD_TRUNCATION_LAST_MESSAGES)
+
+
+def _step_duration(step) -> Optional[float]:
+    """Duración en segundos de un paso del run según sus marcas de tiempo"""
+    created_at = getattr(step, "created_at", None)
+    completed_at = getattr(step, "completed_at", None)
+    if created_at is None or completed_at is None:
+        return None
+    return max((completed_at - created_at).total_seconds(), 0.0)
+
+
+def _connected_agent(tool_call):
+    """Retorna la información del agente conectado de una llamada a herramienta, si existe"""
+    return getattr(tool_call, "connected_agent", None) or getattr(tool_call, "agent", None)
+
+
+async def analyze_run_steps(
         agents_client: AgentsClient,
         thread_id: str,
         run_id: str,
@@ -16,10 +67,6 @@ def analyze_run_steps(
     """
     Analiza los pasos de ejecución y retorna qué herramientas se usaron
     """
-    print(f'\n{"=" * 80}')
-    print("ANÁLISIS DE STEPS")
-    print(f'{"=" * 80}')
-
     tools_called = {
         "policy_guard": True,
         "mcp_ado": False,
@@ -31,62 +78,227 @@ def analyze_run_steps(
         run_id=run_id,
     )
 
-    for idx, step in enumerate(run_steps, 1):
-        print(f"\n┌─ Step {idx}")
-        print(f"│  Type: {step.type}")
-        print(f"│  Status: {step.status}")
+    idx = 0
+    async for step in run_steps:
+        idx += 1
+        logger.debug(
+            "Step %s: %s (%s)", idx, step.type, step.status,
+            extra={"run_id": run_id, "step_type": step.type, "step_status": step.status},
+        )
 
         if hasattr(step, "step_details") and step.step_details:
             if hasattr(step.step_details, "tool_calls") and step.step_details.tool_calls:
                 for tool_call in step.step_details.tool_calls:
-                    print(f"│  🔧 Tool type: {tool_call.type}")
-
-                    if hasattr(tool_call, "function") and tool_call.function:
-                        print(f"│     Function: {tool_call.function.name}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        function = getattr(tool_call, "function", None)
+                        logger.debug(
+                            "🔧 Tool %s", tool_call.type,
+                            extra={"tool_type": tool_call.type, "function": function.name if function else None},
+                        )
 
-                    if hasattr(tool_call, "agent") and tool_call.agent:
-                        agent_id = tool_call.agent.agent_id
-                        print(f"│     Agent ID: {agent_id}")
+                    connected_agent = _connected_agent(tool_call)
+                    if connected_agent:
+                        agent_id = connected_agent.agent_id
 
                         if agent_id == mcp_agent_id:
-                            print("│  ⚙️ MCP ADO llamado")
+                            tool_name = "mcp_ado"
+                        elif agent_id == knowledge_base_agent_id:
+                            tool_name = "knowledge_base"
+                        else:
+                            tool_name = "other"
+
+                        duration = _step_duration(step)
+                        if duration is not None:
+                            timing.record(f"tool_{tool_name}", duration)
+
+                        outcome = None
+                        if tool_name == "mcp_ado":
                             tools_called["mcp_ado"] = True
 
-                            if hasattr(tool_call.agent, "output"):
-                                output = tool_call.agent.output
+                            output = getattr(connected_agent, "output", None)
+                            if output:
                                 if "✅" in output and "EXITOSAMENTE" in output:
-                                    print("│     ✅ Ejecución exitosa")
+                                    outcome = "success"
                                 elif "❌" in output:
-                                    print("│     ❌ Ejecución fallida")
+                                    outcome = "failure"
 
-                        elif agent_id == knowledge_base_agent_id:
-                            print("│  📚 Knowledge Base llamado")
+                        elif tool_name == "knowledge_base":
                             tools_called["knowledge_base"] = True
 
+                        logger.info(
+                            "%s llamado", tool_name,
+                            extra={
+                                "run_id": run_id,
+                                "tool": tool_name,
+                                "agent_id": agent_id,
+                                "outcome": outcome,
+                                "duration_s": duration,
+                            },
+                        )
+
     return tools_called
 
 
-def get_final_response(agents_client: AgentsClient, thread_id: str) -> str:
-    """Obtiene la respuesta final del agente"""
-    print(f'\n{"=" * 80}')
-    print("RESPUESTA FINAL")
-    print(f'{"=" * 80}')
+async def stream_run(
+        agents_client: AgentsClient,
+        thread_id: str,
+        agent_id: str,
+        tool_names: Dict[str, str],
+) -> ThreadRun:
+    """
+    Ejecuta un run en modo streaming publicando las llamadas a agentes
+    conectados y los fragmentos de texto de la respuesta a medida que llegan.
+    tool_names traduce el id de cada agente conectado al nombre del evento.
+    """
+    run = None
+    seen_tool_calls = set()
+
+    async with await agents_client.runs.stream(
+            thread_id=thread_id,
+            agent_id=agent_id,
+            truncation_strategy=truncation_strategy(),
+    ) as stream:
+        async for event_type, event_data, _ in stream:
+            if isinstance(event_data, MessageDeltaChunk):
+                if event_data.text:
+                    await events.emit("delta", {"text": event_data.text})
+
+            elif isinstance(event_data, RunStep):
+                tool_calls = getattr(event_data.step_details, "tool_calls", None) or []
+                for tool_call in tool_calls:
+                    if (tool_call.id, event_data.status) in seen_tool_calls:
+                        continue
+                    seen_tool_calls.add((tool_call.id, event_data.status))
+
+                    connected_agent = _connected_agent(tool_call)
+                    tool = tool_call.type
+                    if connected_agent:
+                        tool = tool_names.get(connected_agent.agent_id, connected_agent.name or tool)
+                    await events.emit("tool_call", {"tool": tool, "status": event_data.status})
+
+            elif isinstance(event_data, ThreadRun):
+                run = event_data
 
+    if run is None:
+        raise RuntimeError("El stream del run terminó sin estado final")
+    return run
+
+
+async def get_last_agent_message(
+        agents_client: AgentsClient,
+        thread_id: str,
+        run_id: Optional[str] = None,
+) -> Optional[ThreadMessage]:
+    """
+    Obtiene el último mensaje de texto escrito por un agente en el thread.
+    Con run_id solo se consultan los mensajes de ese run, de a uno por
+    página, de modo que el costo no crece con el historial del thread.
+    """
     messages = agents_client.messages.list(
         thread_id=thread_id,
+        run_id=run_id,
+        limit=1 if run_id else None,
         order=ListSortOrder.DESCENDING,
     )
 
-    last_message = next(
-        (m for m in messages if m.role == MessageRole.AGENT and m.text_messages),
-        None,
-    )
+    async for message in messages:
+        if message.role == MessageRole.AGENT and message.text_messages:
+            return message
+    return None
+
+
+def extract_citations(message: ThreadMessage) -> List[Dict]:
+    """Citas de documentos y URLs presentes en las anotaciones del mensaje"""
+    citations = []
+    for annotation in message.file_citation_annotations:
+        citations.append({
+            "type": "file",
+            "text": annotation.text,
+            "file_id": annotation.file_citation.file_id,
+            "quote": annotation.file_citation.quote,
+        })
+    for annotation in message.url_citation_annotations:
+        citations.append({
+            "type": "url",
+            "text": annotation.text,
+            "url": annotation.url_citation.url,
+            "title": annotation.url_citation.title,
+        })
+    return citations
+
+
+async def get_final_answer(
+        agents_client: AgentsClient,
+        thread_id: str,
+        run_id: Optional[str] = None,
+) -> Tuple[str, List[Dict]]:
+    """Obtiene la respuesta final del agente y sus citas (del run indicado, si se pasa run_id)"""
+    last_message = await get_last_agent_message(agents_client, thread_id, run_id)
 
-    response_text = ""
-    if last_message:
-        response_text = last_message.text_messages[-1].text.value
-        print(response_text)
-    else:
-        print("⚠️ No hay respuesta")
+    if not last_message:
+        logger.warning("⚠️ No hay respuesta")
+        return "", []
 
+    response_text = last_message.text_messages[-1].text.value
+    logger.info("Respuesta final obtenida", extra={"response_chars": len(response_text)})
+    logs.log_payload(logger, "Respuesta final", response_text)
+    return response_text, extract_citations(last_message)
+
+
+async def get_final_response(agents_client: AgentsClient, thread_id: str, run_id: Optional[str] = None) -> str:
+    """Obtiene la respuesta final del agente (del run indicado, si se pasa run_id)"""
+    response_text, _ = await get_final_answer(agents_client, thread_id, run_id)
     return response_text
+
+
+async def _cancel_active_runs(agents_client: AgentsClient, thread_id: str) -> int:
+    """Cancela en el servicio los runs del thread que siguen activos"""
+    cancelled = 0
+    try:
+        async for run in agents_client.runs.list(thread_id=thread_id, limit=5, order=ListSortOrder.DESCENDING):
+            if run.status in _ACTIVE_RUN_STATUSES:
+                await agents_client.runs.cancel(thread_id=thread_id, run_id=run.id)
+                cancelled += 1
+    except Exception as e:
+        logger.warning("⚠️ No se pudieron cancelar los runs del thread: %s", e, extra={"thread_id": thread_id})
+    return cancelled
+
+
+@contextmanager
+def track_run(agents_client: AgentsClient, thread_id: str):
+    """
+    Registra un run en curso. Si la tarea se cancela (cliente desconectado,
+    apagado) el run seguiría activo en el servicio, así que se cancela allí
+    en segundo plano.
+    """
+    _active_runs[thread_id] = _active_runs.get(thread_id, 0) + 1
+    try:
+        yield
+    except asyncio.CancelledError:
+        task = contextvars.Context().run(asyncio.create_task, _cancel_active_runs(agents_client, thread_id))
+        _cancel_tasks.add(task)
+        task.add_done_callback(_cancel_tasks.discard)
+        raise
+    finally:
+        remaining = _active_runs.pop(thread_id) - 1
+        if remaining:
+            _active_runs[thread_id] = remaining
+
+
+async def drain_runs(agents_client: AgentsClient, timeout: float) -> None:
+    """
+    Espera hasta timeout segundos a que terminen los runs en curso, cancela
+    en el servicio los que sigan activos y espera las cancelaciones pendientes.
+    """
+    deadline = time.monotonic() + timeout
+    if _active_runs:
+        logger.info("⏳ Esperando %s runs en curso antes de apagar", sum(_active_runs.values()))
+    while _active_runs and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    pending = list(_active_runs)
+    if pending:
+        results = await asyncio.gather(*(_cancel_active_runs(agents_client, t) for t in pending))
+        logger.warning("🛑 %s runs cancelados al apagar", sum(results))
+    if _cancel_tasks:
+        await asyncio.gather(*_cancel_tasks, return_exceptions=True)
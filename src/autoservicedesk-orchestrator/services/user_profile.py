@@ -23,3 +23,10 @@ def get_user_profile(email: str) -> dict:
         "area": profile.get("area", "Unknown"),
         "trust_level": profile.get("trust_level", 1),
     }
+
+
+def reload_profiles() -> None:
+    """
+    Discards the cached profiles so the next lookup re-reads the JSON file.
+    """
+    _load_profiles.cache_clear()
@@ -0,0 +1,71 @@
+"""
+Trabajo especulativo lanzado en paralelo al Policy Guard
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Optional
+
+import logs
+import metrics
+
+logger = logs.get_logger(__name__)
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+
+class Speculation:
+    """
+    Ejecuta una corrutina en segundo plano mientras la solicitud sigue su
+    camino. Según la decisión final se usa su resultado (use) o se descarta
+    (discard), cancelándola si aún no terminó.
+
+    - Latencia ahorrada: la parte del trabajo que se solapó con el resto de
+      la solicitud (su duración menos lo que hubo que esperarlo en use).
+    - Trabajo desperdiciado: el tiempo que corrió antes de descartarse.
+    """
+
+    def __init__(self, kind: str, coro: Awaitable[Any]):
+        self.kind = kind
+        self._started = time.monotonic()
+        self._finished: Optional[float] = None
+        # Copia el contexto de la solicitud: los logs y etapas quedan asociados a ella
+        self._task = asyncio.ensure_future(coro)
+        self._task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Future) -> None:
+        self._finished = time.monotonic()
+
+    def _elapsed(self) -> float:
+        return (self._finished or time.monotonic()) - self._started
+
+    async def use(self) -> Optional[Any]:
+        """Espera el resultado; retorna None si el trabajo especulativo falló"""
+        waiting_since = time.monotonic()
+        try:
+            result = await self._task
+        except Exception as e:
+            logger.warning("⚠️ Falló el trabajo especulativo (%s): %s", self.kind, e)
+            self._record("failed", "wasted", self._elapsed())
+            return None
+
+        saved = max(self._elapsed() - (time.monotonic() - waiting_since), 0.0)
+        self._record("used", "saved", saved)
+        metrics.observe("speculative_latency_saved_seconds", saved, buckets=SECONDS_BUCKETS, kind=self.kind)
+        return result
+
+    def discard(self) -> None:
+        """Descarta el resultado y cancela el trabajo si sigue en curso"""
+        if not self._task.done():
+            self._task.cancel()
+        elif not self._task.cancelled() and self._task.exception() is not None:
+            # Marca la excepción como recuperada: el resultado no se necesita
+            logger.debug("Trabajo especulativo fallido descartado (%s)", self.kind)
+        self._record("discarded", "wasted", self._elapsed())
+
+    def _record(self, outcome: str, kind_of_time: str, seconds: float) -> None:
+        metrics.increment("speculative_tasks_total", kind=self.kind, outcome=outcome)
+        metrics.increment("speculative_seconds_total", seconds, kind=self.kind, result=kind_of_time)
+        logger.debug(
+            "🔮 Trabajo especulativo %s", outcome,
+            extra={"speculation": self.kind, "outcome": outcome, f"{kind_of_time}_s": round(seconds, 3)},
+        )
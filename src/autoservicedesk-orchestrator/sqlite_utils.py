@@ -0,0 +1,31 @@
+"""
+Conexiones SQLite compartidas entre hilos y procesos
+"""
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """
+    Abre una conexión SQLite en modo WAL por hilo y proceso (sqlite3 no
+    permite compartir conexiones entre ellos). Las conexiones funcionan en
+    modo autocommit; las transacciones se abren explícitamente.
+    """
+
+    def __init__(self, path: str, timeout: float = 30):
+        self.path = path
+        # Segundos que una operación espera el lock de escritura antes de fallar
+        self._timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self._timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,67 @@
+"""
+Configuración común de las pruebas.
+
+config.py lee las variables de entorno al importarse, por eso se fijan aquí
+antes de que las pruebas importen los módulos del orquestador. Las pruebas de
+flujo usan el AgentsClient falso de benchmarks (sin Azure).
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ORCHESTRATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ORCHESTRATOR_DIR)
+
+_DATA_DIR = tempfile.mkdtemp(prefix="autoservicedesk-tests-")
+
+os.environ.update({
+    "POLICY_AGENT_ID": "policy-guard",
+    "KNOWLEDGE_BASE_AGENT_ID": "knowledge-base",
+    "MODEL_DEPLOYMENT_NAME": "test-model",
+    "MCP_SERVER_URL": "http://localhost:8000/mcp",
+    "CONTEXT_BACKEND": "memory",
+    "FAQ_INDEX_DIR": os.path.join(_DATA_DIR, "faq_index"),
+    "JOBS_SQLITE_PATH": os.path.join(_DATA_DIR, "jobs.db"),
+    "CONTEXT_SQLITE_PATH": os.path.join(_DATA_DIR, "context.db"),
+    "LOG_LEVEL": "WARNING",
+})
+
+
+@pytest.fixture(scope="session")
+def agents_client():
+    """
+    AgentsClient falso con las respuestas guionizadas del benchmark: el
+    Policy Guard auto-aprueba salvo las solicitudes de POLICY_DECISIONS y el
+    Triage responde "Estos son los pasos a seguir.".
+    Es uno por sesión porque el registro de agentes guarda los agentes creados.
+    """
+    import clients
+    from benchmarks.fake_agents_client import FakeAgentsClient
+    from benchmarks.run_benchmark import responder
+
+    client = FakeAgentsClient(responder, agent_names={
+        os.environ["POLICY_AGENT_ID"]: os.environ["POLICY_AGENT_ID"],
+        os.environ["KNOWLEDGE_BASE_AGENT_ID"]: os.environ["KNOWLEDGE_BASE_AGENT_ID"],
+    })
+    clients._agents_client = client
+    yield client
+    clients._agents_client = None
+
+
+@pytest.fixture
+def orchestrator(agents_client, tmp_path, monkeypatch):
+    """Módulo orchestrator con cachés e índice FAQ vacíos en cada prueba"""
+    import config
+    import faq_index
+    import kb_cache
+    import orchestrator
+    import policy_cache
+
+    monkeypatch.setattr(config, "FAQ_INDEX_DIR", str(tmp_path / "faq_index"))
+    faq_index.close()
+    kb_cache.invalidate()
+    policy_cache.invalidate()
+    yield orchestrator
+    faq_index.close()
@@ -0,0 +1,108 @@
+"""
+Pruebas del control de admisión: token bucket por usuario y cola acotada
+"""
+import asyncio
+
+import pytest
+
+import admission
+import cache
+from admission import AdmissionController, AdmissionRejected, TokenBucketLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(admission, "time", clock)
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def test_burst_is_allowed_then_rejected(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=3, max_keys=10)
+
+    assert [limiter.consume("ana") for _ in range(3)] == [None, None, None]
+    # 6 por minuto: un token cada 10 segundos
+    assert limiter.consume("ana") == pytest.approx(10)
+
+
+def test_tokens_refill_over_time(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=3, max_keys=10)
+    for _ in range(3):
+        limiter.consume("ana")
+
+    clock.advance(4)
+    assert limiter.consume("ana") == pytest.approx(6)
+
+    clock.advance(6)
+    assert limiter.consume("ana") is None
+    assert limiter.consume("ana") == pytest.approx(10)
+
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=2, max_keys=10)
+    limiter.consume("ana")
+
+    clock.advance(3600)
+
+    assert [limiter.consume("ana") for _ in range(3)] == [None, None, pytest.approx(10)]
+
+
+def test_buckets_are_per_key(clock):
+    limiter = TokenBucketLimiter(rate_per_minute=6, burst=1, max_keys=10)
+
+    assert limiter.consume("ana") is None
+    assert limiter.consume("ana") is not None
+    assert limiter.consume("bo") is None
+
+
+def test_rate_limit_rejects_with_retry_after(clock, monkeypatch):
+    monkeypatch.setattr(admission, "_user_limiter", TokenBucketLimiter(rate_per_minute=6, burst=1, max_keys=10))
+
+    admission.check_rate_limit("Ana@Example.com")
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.check_rate_limit(" ana@example.com ")
+
+    assert rejected.value.reason == admission.RATE_LIMITED
+    assert rejected.value.retry_after == 10
+
+
+def test_full_queue_is_rejected_immediately():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+        await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+
+        # Al liberar, el lugar pasa directamente a la solicitud en cola
+        controller.release(0.1)
+        await waiting
+        return rejected.value.reason, controller.in_flight, controller.queue_depth
+
+    assert asyncio.run(scenario()) == (admission.QUEUE_FULL, 1, 0)
+
+
+def test_queued_request_times_out():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.01)
+        await controller.acquire()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire()
+        return rejected.value.reason, controller.queue_depth
+
+    assert asyncio.run(scenario()) == (admission.QUEUE_TIMEOUT, 0)
@@ -0,0 +1,63 @@
+"""
+Pruebas del registro de agentes
+"""
+import asyncio
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+
+import agent_registry
+from benchmarks.fake_agents_client import FakeAgentsClient, ScriptedReply
+
+NAME = "ux-agent"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = agent_registry.AgentRegistry()
+    monkeypatch.setattr(agent_registry, "_registry", registry)
+    return registry
+
+
+def _client() -> FakeAgentsClient:
+    return FakeAgentsClient(lambda name, content: ScriptedReply(f"Respuesta de {name}"))
+
+
+def test_agent_deleted_in_service_is_resolved_again(registry):
+    client = _client()
+
+    async def resolve():
+        return await agent_registry.get_or_create_agent(client, NAME, "test-model", "instrucciones")
+
+    async def run(agent):
+        thread = await client.threads.create()
+        await client.messages.create(thread_id=thread.id, role="user", content="hola")
+        return await client.runs.create_and_process(thread_id=thread.id, agent_id=agent.id)
+
+    async def scenario():
+        deleted = await resolve()
+        await client.delete_agent(deleted.id)
+        await agent_registry.run_with_agent(resolve, run)
+        return deleted, await resolve()
+
+    deleted, current = asyncio.run(scenario())
+    assert current.id != deleted.id
+    assert client.calls["create_agent"] == 2
+
+
+def test_other_not_found_errors_are_raised(registry):
+    client = _client()
+
+    async def resolve():
+        return await agent_registry.get_or_create_agent(client, NAME, "test-model", "instrucciones")
+
+    async def run(agent):
+        raise ResourceNotFoundError("No thread found")
+
+    async def scenario():
+        # El agente sí existe: se reintenta una vez y el error del thread se propaga
+        await agent_registry.run_with_agent(resolve, run)
+
+    with pytest.raises(ResourceNotFoundError):
+        asyncio.run(scenario())
+    assert client.calls["create_agent"] == 1
@@ -0,0 +1,82 @@
+"""
+Pruebas del barrido de agentes huérfanos y del reclamo de agentes en uso
+"""
+import asyncio
+import time
+
+import pytest
+from azure.ai.agents.models import Agent
+
+import agent_registry
+from agent_sweeper import AgentSweeper
+from benchmarks.fake_agents_client import FakeAgentsClient, ScriptedReply
+
+DAY = 86400
+NAME = "triage-support-agent"
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = agent_registry.AgentRegistry()
+    monkeypatch.setattr(agent_registry, "_registry", registry)
+    return registry
+
+
+def _agent(agent_id: str, created_ago: float, metadata: dict) -> Agent:
+    return Agent({
+        "id": agent_id,
+        "object": "assistant",
+        "created_at": int(time.time() - created_ago),
+        "name": NAME,
+        "model": "test-model",
+        "instructions": "",
+        "metadata": metadata,
+    })
+
+
+def _sweeper() -> AgentSweeper:
+    return AgentSweeper([NAME], max_age=DAY, interval=3600)
+
+
+def test_version_claimed_by_another_host_is_kept(registry):
+    agent = _agent("asst_other", 3 * DAY, {
+        agent_registry.DEFINITION_HASH_KEY: "other-version",
+        agent_registry.LAST_USED_KEY: str(int(time.time() - 3600)),
+    })
+    assert not _sweeper()._is_stale(agent, time.time())
+
+
+def test_unclaimed_old_versions_are_swept(registry):
+    now = time.time()
+    claimed_long_ago = _agent("asst_old", 3 * DAY, {
+        agent_registry.DEFINITION_HASH_KEY: "old-version",
+        agent_registry.LAST_USED_KEY: str(int(now - 2 * DAY)),
+    })
+    never_claimed = _agent("asst_legacy", 3 * DAY, {})
+    assert _sweeper()._is_stale(claimed_long_ago, now)
+    assert _sweeper()._is_stale(never_claimed, now)
+    assert not _sweeper()._is_stale(_agent("asst_new", 60, {}), now)
+
+
+def test_current_version_is_never_swept(registry):
+    async def scenario():
+        client = FakeAgentsClient(lambda name, content: ScriptedReply(""))
+        agent = await registry.get_or_create(client, NAME, "test-model", "instrucciones")
+        agent.metadata = {agent_registry.LAST_USED_KEY: "0"}
+        return agent
+
+    agent = asyncio.run(scenario())
+    assert not _sweeper()._is_stale(agent, time.time())
+
+
+def test_claim_renews_last_used(registry):
+    async def scenario():
+        client = FakeAgentsClient(lambda name, content: ScriptedReply(""))
+        agent = await registry.get_or_create(client, NAME, "test-model", "instrucciones")
+        agent.metadata = {**agent.metadata, agent_registry.LAST_USED_KEY: "0"}
+        assert await registry.claim_current_versions(client) == 1
+        return agent
+
+    agent = asyncio.run(scenario())
+    assert float(agent.metadata[agent_registry.LAST_USED_KEY]) > time.time() - 60
+    assert agent.metadata[agent_registry.DEFINITION_HASH_KEY]
@@ -0,0 +1,42 @@
+"""
+Pruebas del clasificador local de confirmaciones
+"""
+import pytest
+
+from confirmation import classify_confirmation
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("sí", "yes"),
+    ("Sí, por favor", "yes"),
+    ("dale, créalo", "yes"),
+    ("ok gracias", "yes"),
+    ("go ahead", "yes"),
+    ("no", "no"),
+    ("No, gracias", "no"),
+    ("cancélalo", "no"),
+    ("mejor no", "no"),
+    ("don't proceed", "no"),
+    ("nunca lo confirmo", "no"),
+    ("quizás", "unclear"),
+    ("no sé", "unclear"),
+])
+def test_clear_answers_are_classified_locally(text, expected):
+    assert classify_confirmation(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    # "no" seguido de una afirmación: negativa o "no, (mejor) hazlo"
+    "no, por favor créalo",
+    "no no, hazlo",
+    "no procede",
+    "no, ok",
+    # Señales mixtas, palabras desconocidas o respuestas largas
+    "sí pero no",
+    "sí, pero en el repo de pruebas",
+    "mmm déjame pensarlo",
+    "sí sí sí sí sí sí sí sí sí",
+    "",
+])
+def test_ambiguous_answers_go_to_the_agent(text):
+    assert classify_confirmation(text) is None
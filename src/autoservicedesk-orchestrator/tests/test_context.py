@@ -0,0 +1,108 @@
+"""
+Pruebas de los stores de contexto: TTL de inactividad y desalojo por tamaño
+"""
+import pytest
+
+import cache
+import context
+
+
+class FakeClock:
+    """Reloj controlado para monotonic() y time()"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, "time", clock)
+    monkeypatch.setattr(context, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path, clock):
+    def make(max_size=10, idle_ttl_seconds=60):
+        if request.param == "memory":
+            return context.MemoryContextStore(max_size=max_size, idle_ttl_seconds=idle_ttl_seconds)
+        return context.SQLiteContextStore(
+            path=str(tmp_path / "context.db"),
+            max_size=max_size,
+            idle_ttl_seconds=idle_ttl_seconds,
+            busy_timeout=1,
+        )
+    return make
+
+
+def test_context_expires_after_idle_ttl(make_store, clock):
+    store = make_store(idle_ttl_seconds=60)
+    store.set("thread-1", {"awaiting_work_item_confirmation": True})
+
+    clock.advance(59)
+    assert store.get("thread-1") == {"awaiting_work_item_confirmation": True}
+
+    clock.advance(120)
+    assert store.get("thread-1") is None
+
+
+def test_activity_renews_the_idle_ttl(make_store, clock):
+    store = make_store(idle_ttl_seconds=60)
+    store.set("thread-1", {"step": 1})
+
+    for _ in range(3):
+        clock.advance(40)
+        store.update("thread-1", lambda ctx: ctx.update(step=ctx["step"] + 1))
+
+    assert store.get("thread-1") == {"step": 4}
+
+
+def test_least_recently_used_context_is_evicted(make_store, clock):
+    store = make_store(max_size=2, idle_ttl_seconds=3600)
+    store.set("thread-1", {"n": 1})
+    clock.advance(1)
+    store.set("thread-2", {"n": 2})
+    clock.advance(1)
+    # La memoria ordena por lectura y SQLite por escritura: se renueva thread-1 de ambas formas
+    store.get("thread-1")
+    store.update("thread-1", lambda ctx: None)
+    clock.advance(store.PURGE_INTERVAL_SECONDS + 1)
+    store.set("thread-3", {"n": 3})
+
+    assert store.get("thread-2") is None
+    assert store.get("thread-1") == {"n": 1}
+    assert store.get("thread-3") == {"n": 3}
+    assert store.stats()["evictions"] == 1
+
+
+def test_purge_counts_expired_contexts(make_store, clock):
+    store = make_store(idle_ttl_seconds=60)
+    store.set("thread-1", {"n": 1})
+    store.set("thread-2", {"n": 2})
+    clock.advance(store.PURGE_INTERVAL_SECONDS + 61)
+    store.set("thread-3", {"n": 3})
+
+    stats = store.stats()
+    assert stats["expirations"] == 2
+    assert stats["size"] == 1
+
+
+def test_memory_store_returns_copies(clock):
+    store = context.MemoryContextStore(max_size=10, idle_ttl_seconds=60)
+    original = {"last_policy_decision": {"decision": "DENEGAR"}}
+    store.set("thread-1", original)
+
+    original["last_policy_decision"]["decision"] = "AUTO_APROBAR"
+    store.get("thread-1")["last_policy_decision"]["decision"] = "AUTO_APROBAR"
+
+    assert store.get("thread-1") == {"last_policy_decision": {"decision": "DENEGAR"}}
@@ -0,0 +1,72 @@
+"""
+Pruebas del índice FAQ local (se ejecutan desde src/autoservicedesk-orchestrator
+con: python -m pytest tests)
+"""
+import pytest
+
+from faq_index import FaqIndex
+
+# Valor por defecto de FAQ_INDEX_MIN_CONFIDENCE
+MIN_CONFIDENCE = 0.8
+
+QUESTIONS = [
+    "¿Cómo instalo Visual Studio Code en Windows?",
+    "¿Cuál es la política de vacaciones?",
+]
+
+
+@pytest.fixture(params=[1000, 2], ids=["delta", "segment"])
+def index(tmp_path, request):
+    index = FaqIndex(str(tmp_path), compact_every=request.param)
+    index.load()
+    for question in QUESTIONS:
+        index.add(question, f"Respuesta a: {question}", [], [], [])
+    yield index
+    index.close()
+
+
+def _best(index: FaqIndex, query: str):
+    results = index.search(query, {"role": "Developer", "area": "Technology"}, limit=1)
+    return results[0] if results else None
+
+
+def test_same_question_matches_with_full_confidence(index):
+    match = _best(index, "como instalo visual studio code en windows")
+    assert match["question"] == QUESTIONS[0]
+    assert match["confidence"] == 1.0
+
+
+def test_extra_document_terms_lower_confidence(index):
+    # "Visual Studio" no es "Visual Studio Code en Windows": no debe responderse localmente
+    match = _best(index, "¿Cómo instalo Visual Studio?")
+    assert match["question"] == QUESTIONS[0]
+    assert match["confidence"] < MIN_CONFIDENCE
+
+
+def test_extra_query_terms_lower_confidence(index):
+    match = _best(index, "¿Cómo instalo Visual Studio Code en Windows con extensiones de Python y Docker?")
+    assert match["confidence"] < MIN_CONFIDENCE
+
+
+def test_restricted_answers_are_hidden(tmp_path):
+    index = FaqIndex(str(tmp_path), compact_every=1000)
+    index.load()
+    index.add("¿Qué licencias de Office hay disponibles?", "E3 y E5.", [], ["IT_Manager"], [])
+    try:
+        assert index.search("licencias de office", {"role": "Developer"}) == []
+        assert index.search("licencias de office", {"role": "IT_Manager"})
+    finally:
+        index.close()
+
+
+@pytest.mark.parametrize("query", ["Resetea mi contraseña", "Instala Docker", "instálame docker"])
+def test_imperatives_do_not_match_how_to_questions(tmp_path, query):
+    # Los interrogativos se indexan: una orden no es la pregunta "¿Cómo ...?"
+    index = FaqIndex(str(tmp_path), compact_every=1000)
+    index.load()
+    for question in ["¿Cómo reseteo mi contraseña?", "¿Cómo instalo Docker?"]:
+        index.add(question, f"Respuesta a: {question}", [], [], [])
+    try:
+        assert _best(index, query)["confidence"] < MIN_CONFIDENCE
+    finally:
+        index.close()
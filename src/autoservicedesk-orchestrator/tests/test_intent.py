@@ -0,0 +1,46 @@
+"""
+Pruebas del clasificador local de intención
+"""
+import pytest
+
+from intent import QUESTION, REQUEST, UNKNOWN, classify_intent, evaluate, load_corpus
+
+
+def test_corpus_has_no_misrouted_requests():
+    report = evaluate(load_corpus())
+    assert report["misrouted"] == []
+    assert report["recall"] >= 0.9
+
+
+@pytest.mark.parametrize("text", [
+    "what is going on, reset my MFA now?",
+    "¿Qué tal si borras el repo legacy?",
+    "Por qué no resetean mi contraseña ya?",
+    "¿Cómo desbloqueo mi cuenta? Hazlo tú por favor",
+    "¿Me instalas Docker?",
+    "¿Puedes resetear mi contraseña?",
+])
+def test_action_verbs_outrank_interrogatives(text):
+    result = classify_intent(text)
+    assert result.intent == REQUEST
+    assert not result.is_confident_question()
+
+
+@pytest.mark.parametrize("text", [
+    "¿Cómo instalo Docker?",
+    "¿Cómo se instala Docker?",
+    "¿Qué software está permitido instalar?",
+    "How do I configure Git credentials?",
+])
+def test_how_to_questions_are_routed(text):
+    assert classify_intent(text).is_confident_question()
+
+
+def test_bare_question_mark_is_not_confident():
+    result = classify_intent("¿Salarios de la nómina del equipo?")
+    assert result.intent == QUESTION
+    assert not result.is_confident_question()
+
+
+def test_empty_text_is_unknown():
+    assert classify_intent("  ¿? ").intent == UNKNOWN
@@ -0,0 +1,111 @@
+"""
+Pruebas de la cola de trabajos y su pool de workers
+"""
+import asyncio
+import sqlite3
+
+import jobs
+from jobs import COMPLETED, FAILED, INTERRUPTED_ERROR, QUEUED, JobStore, JobWorkerPool
+
+
+class FlakyJobStore(JobStore):
+    """JobStore que falla las primeras llamadas de cada operación indicada"""
+
+    def __init__(self, path: str, failures: dict):
+        super().__init__(path)
+        self.failures = dict(failures)
+
+    def _maybe_fail(self, operation: str) -> None:
+        if self.failures.get(operation, 0) > 0:
+            self.failures[operation] -= 1
+            raise sqlite3.OperationalError("database is locked")
+
+    def claim_next(self, owner):
+        self._maybe_fail("claim_next")
+        return super().claim_next(owner)
+
+    def finish(self, job_id, owner, result, error):
+        self._maybe_fail("finish")
+        return super().finish(job_id, owner, result, error)
+
+
+async def _run_until_finished(store: JobStore, job_id: str, timeout: float = 5) -> dict:
+    async def handler(payload):
+        return {"echo": payload["value"]}
+
+    pool = JobWorkerPool(store, handler, workers=1, poll_interval=0.01)
+    await pool.start()
+    try:
+        async def finished():
+            while (job := store.get(job_id))["status"] != COMPLETED:
+                await asyncio.sleep(0.01)
+            return job
+        return await asyncio.wait_for(finished(), timeout)
+    finally:
+        await pool.stop()
+
+
+def test_worker_survives_database_errors(tmp_path):
+    store = FlakyJobStore(str(tmp_path / "jobs.db"), {"claim_next": 2})
+    job_id = store.submit({"value": 1}, None, max_queued=10)
+
+    job = asyncio.run(_run_until_finished(store, job_id))
+
+    assert job["result"] == {"echo": 1}
+    assert store.failures == {"claim_next": 0}
+
+
+def test_result_is_recorded_after_finish_errors(tmp_path):
+    store = FlakyJobStore(str(tmp_path / "jobs.db"), {"finish": 2})
+    job_id = store.submit({"value": 2}, None, max_queued=10)
+
+    job = asyncio.run(_run_until_finished(store, job_id))
+
+    assert job["result"] == {"echo": 2}
+
+
+def test_interrupted_jobs_are_requeued_unless_side_effects_started(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    plain_id = store.submit({"value": 1}, None, max_queued=10)
+    acting_id = store.submit({"value": 2}, None, max_queued=10)
+    store.claim_next("host:1")
+    store.claim_next("host:1")
+    assert store.mark_side_effects(acting_id, "host:1")
+
+    assert store.release("host:1") == (1, 1)
+
+    assert store.get(plain_id)["status"] == QUEUED
+    acting = store.get(acting_id)
+    assert acting["status"] == FAILED
+    assert acting["error"] == INTERRUPTED_ERROR
+
+
+def test_stale_jobs_past_side_effects_are_not_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.submit({"value": 1}, None, max_queued=10)
+    store.claim_next("host:1")
+    store.mark_side_effects(job_id, "host:1")
+
+    assert store.requeue_stale(heartbeat_timeout_seconds=-1) == (0, 1)
+    assert store.get(job_id)["status"] == FAILED
+
+
+def test_shutdown_after_mark_side_effects_fails_the_job(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"))
+    job_id = store.submit({"value": 1}, None, max_queued=10)
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def handler(payload):
+            await jobs.mark_side_effects()
+            started.set()
+            await asyncio.sleep(60)
+
+        pool = JobWorkerPool(store, handler, workers=1, poll_interval=0.01)
+        await pool.start()
+        await asyncio.wait_for(started.wait(), 5)
+        await pool.stop()
+
+    asyncio.run(scenario())
+    assert store.get(job_id)["status"] == FAILED
@@ -0,0 +1,71 @@
+"""
+Pruebas de enrutamiento de process_request con el AgentsClient falso
+"""
+import asyncio
+
+import pytest
+
+USER_EMAIL = "josue.atehortua@empresa.com"
+TRIAGE_RESPONSE = "Estos son los pasos a seguir."
+
+FAQS = [
+    "¿Cómo reseteo mi contraseña?",
+    "¿Cómo instalo Docker?",
+]
+
+
+@pytest.fixture
+def faqs(orchestrator, monkeypatch):
+    import config
+    import faq_index
+
+    monkeypatch.setattr(config, "FAQ_INDEX_ENABLED", True)
+    monkeypatch.setattr(config, "INTENT_ROUTING_ENABLED", False)
+    for question in FAQS:
+        faq_index.add_answer(question, f"Respuesta aprobada: {question}")
+    return orchestrator
+
+
+@pytest.mark.parametrize("request_text", ["Resetea mi contraseña", "Instala Docker", "instálame docker"])
+def test_imperative_requests_are_not_answered_from_faq_index(faqs, request_text):
+    result = asyncio.run(faqs.process_request(request_text, USER_EMAIL))
+    assert result["response"] == TRIAGE_RESPONSE
+
+
+def test_questions_are_answered_from_faq_index(faqs):
+    result = asyncio.run(faqs.process_request("¿Cómo instalo Docker?", USER_EMAIL))
+    assert result["response"] == "Respuesta aprobada: ¿Cómo instalo Docker?"
+    assert result["tools_used"]["knowledge_base"]
+
+
+@pytest.fixture
+def speculative(orchestrator, monkeypatch):
+    import config
+
+    monkeypatch.setattr(config, "SPECULATIVE_KB_ENABLED", True)
+    monkeypatch.setattr(config, "INTENT_ROUTING_ENABLED", False)
+    return orchestrator
+
+
+@pytest.mark.parametrize("request_text", ["¿Me instalas Docker?", "¿Puedes resetear mi contraseña?"])
+def test_auto_approved_action_questions_reach_triage(speculative, request_text):
+    result = asyncio.run(speculative.process_request(request_text, USER_EMAIL))
+    assert result["response"] == TRIAGE_RESPONSE
+
+
+def test_confident_questions_use_speculative_answer(speculative):
+    result = asyncio.run(speculative.process_request("¿Cómo configuro la VPN en Windows?", USER_EMAIL))
+    assert result["response"] == "Respuesta de knowledge-base"
+    assert result["tools_used"] == {"policy_guard": True, "mcp_ado": False, "knowledge_base": True}
+
+
+def test_triage_agent_deleted_in_service_is_recreated(orchestrator, agents_client):
+    import agent_registry
+
+    asyncio.run(orchestrator.process_request("Necesito acceso de lectura al repositorio de documentación", USER_EMAIL))
+    for name, (_, agent_id) in agent_registry.current_versions().items():
+        if name == "triage-support-agent":
+            asyncio.run(agents_client.delete_agent(agent_id))
+
+    result = asyncio.run(orchestrator.process_request("Necesito acceso de lectura al repositorio de documentación", USER_EMAIL))
+    assert result["response"] == TRIAGE_RESPONSE
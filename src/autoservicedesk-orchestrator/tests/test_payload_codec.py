@@ -0,0 +1,171 @@
+"""
+Pruebas de la codificación de payloads: deltas encadenados y keyframes
+"""
+import asyncio
+import copy
+import json
+
+import pytest
+
+import config
+import payload_codec
+from payload_codec import DELTA, FULL
+
+
+def apply_patch(target, patch):
+    """Aplica un JSON Merge Patch (RFC 7386), como lo haría el agente"""
+    result = copy.deepcopy(target)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = apply_patch(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+class Receiver:
+    """Reconstruye los estados a partir de los mensajes, validando la cadena seq/base"""
+
+    def __init__(self):
+        self.states = {}
+        self.last_seq = 0
+
+    def receive(self, message):
+        message = dict(message)
+        encoding = message.pop("encoding")
+        seq = message.pop("seq")
+        assert seq == self.last_seq + 1
+        self.last_seq = seq
+        if encoding == FULL:
+            self.states[seq] = message
+        else:
+            base = message.pop("base")
+            self.states[seq] = apply_patch(self.states[base], message)
+        return self.states[seq]
+
+
+@pytest.fixture(autouse=True)
+def codec_config(monkeypatch):
+    monkeypatch.setattr(config, "PAYLOAD_DELTA_ENABLED", True)
+    monkeypatch.setattr(config, "PAYLOAD_KEYFRAME_INTERVAL", 100)
+    monkeypatch.setattr(config, "THREAD_TRUNCATION_LAST_MESSAGES", 0)
+
+
+PAYLOADS = [
+    {"request": "Crea un repo", "profile": {"email": "ana@example.com", "groups": ["dev"]}, "context": None},
+    {"request": "Crea un repo", "profile": {"email": "ana@example.com", "groups": ["dev", "ops"]}, "flag": True},
+    {"request": "Ahora un pipeline", "profile": {"email": "ana@example.com", "groups": ["dev", "ops"]}},
+    {"request": "Ahora un pipeline", "profile": {"email": "ana@example.com"}, "notes": ""},
+    {"request": "Ahora un pipeline", "profile": {"email": "ana@example.com", "manager": {"email": "bo@example.com"}}},
+    {"request": "Ahora un pipeline", "profile": {"email": "ana@example.com", "manager": {}}},
+]
+
+
+def encode_all(payloads):
+    snapshot, messages = None, []
+    for payload in payloads:
+        message, snapshot = payload_codec.encode(snapshot, payload)
+        messages.append(message)
+    return messages
+
+
+def test_compact_drops_null_empty_and_false_fields():
+    assert payload_codec.compact({"a": None, "b": "", "c": [], "d": {}, "e": False, "f": 0, "g": {"h": None}}) == {"f": 0}
+
+
+def test_deltas_rebuild_every_payload():
+    receiver = Receiver()
+    messages = encode_all(PAYLOADS)
+
+    assert [m["encoding"] for m in messages] == [FULL] + [DELTA] * (len(PAYLOADS) - 1)
+    for payload, message in zip(PAYLOADS, messages):
+        assert receiver.receive(message) == payload_codec.compact(payload)
+
+
+def test_delta_references_the_previous_seq():
+    messages = encode_all(PAYLOADS[:3])
+
+    assert [m["seq"] for m in messages] == [1, 2, 3]
+    assert "base" not in messages[0]
+    assert [m["base"] for m in messages[1:]] == [1, 2]
+
+
+def test_unchanged_payload_sends_an_empty_delta():
+    _, delta = encode_all([PAYLOADS[0], PAYLOADS[0]])
+
+    assert delta == {"encoding": DELTA, "seq": 2, "base": 1}
+
+
+def test_snapshot_without_seq_forces_a_keyframe():
+    # Snapshots guardados antes de numerar los payloads
+    legacy = {"state": {"request": "x"}, "turns_since_keyframe": 0, "messages_since_keyframe": 1}
+
+    message, snapshot = payload_codec.encode(legacy, PAYLOADS[0])
+
+    assert message["encoding"] == FULL
+    assert message["seq"] == 1
+    assert snapshot["seq"] == 1
+
+
+def test_keyframe_every_interval(monkeypatch):
+    monkeypatch.setattr(config, "PAYLOAD_KEYFRAME_INTERVAL", 2)
+    receiver = Receiver()
+
+    messages = encode_all(PAYLOADS)
+
+    assert [m["encoding"] for m in messages] == [FULL, DELTA, DELTA, FULL, DELTA, DELTA]
+    for payload, message in zip(PAYLOADS, messages):
+        assert receiver.receive(message) == payload_codec.compact(payload)
+
+
+def test_keyframe_before_leaving_the_truncation_window(monkeypatch):
+    monkeypatch.setattr(config, "THREAD_TRUNCATION_LAST_MESSAGES", 6)
+
+    messages = encode_all(PAYLOADS[:4])
+
+    # keyframe (1 mensaje) + 2 runs con delta (4) = 5; el siguiente run dejaría el keyframe fuera de la ventana
+    assert [m["encoding"] for m in messages] == [FULL, DELTA, DELTA, FULL]
+
+
+def test_disabled_deltas_always_send_keyframes(monkeypatch):
+    monkeypatch.setattr(config, "PAYLOAD_DELTA_ENABLED", False)
+
+    messages = encode_all(PAYLOADS[:3])
+
+    assert [m["encoding"] for m in messages] == [FULL, FULL, FULL]
+    assert [m["seq"] for m in messages] == [1, 2, 3]
+
+
+def test_thread_messages_from_other_runs_count_for_the_window(monkeypatch):
+    monkeypatch.setattr(config, "THREAD_TRUNCATION_LAST_MESSAGES", 6)
+    thread_id = "thread-codec-window"
+
+    async def scenario():
+        encodings = []
+        for payload in PAYLOADS[:3]:
+            content = await payload_codec.encode_for_thread("triage", thread_id, payload)
+            encodings.append(json.loads(content)["encoding"])
+            # Otro agente (Policy Guard) corre sobre el mismo thread
+            await payload_codec.note_thread_messages(thread_id)
+        return encodings
+
+    # 1 + 2 (otro run) + 2 + 2 (otro run) = 7 > 6: el tercer payload necesita un keyframe
+    assert asyncio.run(scenario()) == [FULL, DELTA, FULL]
+
+
+def test_reset_thread_forces_a_keyframe():
+    thread_id = "thread-codec-reset"
+
+    async def scenario():
+        first = await payload_codec.encode_for_thread("triage", thread_id, PAYLOADS[0])
+        await payload_codec.reset_thread(thread_id, "triage")
+        second = await payload_codec.encode_for_thread("triage", thread_id, PAYLOADS[1])
+        return json.loads(first), json.loads(second)
+
+    first, second = asyncio.run(scenario())
+
+    assert first["encoding"] == FULL
+    assert second["encoding"] == FULL
+    assert second["seq"] == 1
@@ -0,0 +1,72 @@
+"""
+Pruebas del motor local de reglas con las reglas incluidas en data/policy_rules.json
+"""
+import json
+
+import pytest
+
+import config
+import policy_rules
+from policy_rules import RulesEngine
+
+EMAIL = "josue.atehortua@empresa.com"
+TECH_LEAD = {"role": "Tech_Lead", "area": "Technology", "trust_level": 4}
+JUNIOR = {"role": "Junior_Developer", "area": "Technology", "trust_level": 3}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    with open(config.POLICY_RULES_PATH, "r", encoding="utf-8") as f:
+        return RulesEngine(json.load(f))
+
+
+def _rule_id(engine, request, profile, email=EMAIL):
+    decision = engine.evaluate(request, email, profile)
+    return decision and decision["rule_id"]
+
+
+def test_tech_lead_contributor_on_technology_repo_is_auto_approved(engine):
+    decision = engine.evaluate("Necesito permisos de contributor en el repo backend", EMAIL, TECH_LEAD)
+    assert decision["decision"] == "AUTO_APROBAR"
+    assert decision["rule_id"] == "RULE-020"
+    assert decision["policy_refs"] == ["policy_rules.json#RULE-020"]
+    assert decision["action"] == "grant_contributor_access"
+
+
+@pytest.mark.parametrize("request_text, profile, expected", [
+    ("Dame acceso de lectura al repositorio de documentación", JUNIOR, "RULE-030"),
+    ("Necesito permisos de contributor en el repo frontend", JUNIOR, "RULE-021"),
+    ("Quiero modificar la política de rama de develop", JUNIOR, "RULE-040"),
+])
+def test_rules_match_by_action_role_and_area(engine, request_text, profile, expected):
+    assert _rule_id(engine, request_text, profile) == expected
+
+
+def test_first_matching_rule_wins(engine):
+    request_text = "Necesito permisos de administrador en el pipeline de builds"
+    # RULE-010 (DENEGAR hasta nivel 3) precede a RULE-011 (aprobación desde nivel 4)
+    assert _rule_id(engine, request_text, {**TECH_LEAD, "trust_level": 3}) == "RULE-010"
+    decision = engine.evaluate(request_text, EMAIL, TECH_LEAD)
+    assert decision["rule_id"] == "RULE-011"
+    assert decision["required_approver_role"] == "IT_Manager"
+
+
+@pytest.mark.parametrize("request_text, profile", [
+    # Tech Lead sin el nivel de confianza de RULE-020
+    ("Necesito permisos de contributor en el repo backend", {**TECH_LEAD, "trust_level": 2}),
+    # Área sin reglas o recurso no reconocido
+    ("Necesito acceso de lectura a la base de datos de nómina", TECH_LEAD),
+    ("Necesito permisos de contributor en el repo legacy", TECH_LEAD),
+    # Preguntas, terceros, revocaciones y varias acciones
+    ("¿Cómo obtengo permisos de contributor en el repo backend?", TECH_LEAD),
+    ("Dame permisos de contributor en el repo backend para ana.gomez@empresa.com", TECH_LEAD),
+    ("Necesito que quites mis permisos de contributor del repo backend", TECH_LEAD),
+    ("Necesito permisos de contributor y de administrador en el repo backend", TECH_LEAD),
+])
+def test_unmatched_requests_fall_back_to_policy_guard(engine, request_text, profile):
+    assert engine.evaluate(request_text, EMAIL, profile) is None
+
+
+def test_disabled_rules_always_defer(monkeypatch):
+    monkeypatch.setattr(config, "POLICY_RULES_ENABLED", False)
+    assert policy_rules.evaluate("Necesito permisos de contributor en el repo backend", EMAIL, TECH_LEAD) is None
@@ -0,0 +1,63 @@
+"""
+Pruebas del ciclo de vida de los threads de conversación
+"""
+import asyncio
+import time
+
+import context
+from benchmarks.fake_agents_client import FakeAgentsClient, ScriptedReply
+from thread_manager import ThreadManager
+
+TTL = 60
+
+
+def _manager() -> ThreadManager:
+    return ThreadManager(pool_size=0, max_uses=1, idle_ttl=TTL, janitor_interval=3600, conversation_ttl=TTL)
+
+
+def _age(manager: ThreadManager, thread_id: str, seconds: float) -> None:
+    manager._conversations[thread_id] = time.time() - seconds
+
+
+def test_janitor_deletes_expired_conversation_threads():
+    client = FakeAgentsClient(lambda name, content: ScriptedReply(""))
+    manager = _manager()
+
+    async def scenario():
+        await manager.start(client)
+        expired = await manager.take(client)
+        active = await manager.take(client)
+        _age(manager, expired, TTL + 1)
+        _age(manager, active, TTL + 1)
+        manager.touch(active)
+        await manager.sweep()
+        await manager.stop()
+        return expired, active
+
+    expired, active = asyncio.run(scenario())
+    assert expired not in client._threads
+    assert active in client._threads
+    assert manager.conversations == 1
+    assert client.calls["threads.delete"] == 1
+
+
+def test_shared_context_activity_keeps_the_thread(monkeypatch):
+    client = FakeAgentsClient(lambda name, content: ScriptedReply(""))
+    manager = _manager()
+
+    async def recent_activity(thread_id):
+        return time.time()
+
+    monkeypatch.setattr(context, "last_activity", recent_activity)
+
+    async def scenario():
+        await manager.start(client)
+        thread_id = await manager.take(client)
+        _age(manager, thread_id, TTL + 1)
+        await manager.sweep()
+        await manager.stop()
+        return thread_id
+
+    thread_id = asyncio.run(scenario())
+    assert thread_id in client._threads
+    assert manager.conversations == 1
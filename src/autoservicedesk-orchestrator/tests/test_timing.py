@@ -0,0 +1,41 @@
+"""
+Pruebas de las etiquetas de latencia por solicitud
+"""
+import pytest
+
+import metrics
+import timing
+
+
+@pytest.mark.parametrize("decision, expected", [
+    ("AUTO_APROBAR", "AUTO_APROBAR"),
+    (" requiere_aprobacion ", "REQUIERE_APROBACION"),
+    ("Denegar", "DENEGAR"),
+    ("RECHAZAR", "RECHAZAR"),
+    (timing.KNOWLEDGE_BASE_DECISION, "KNOWLEDGE_BASE"),
+    ("APROBADO CON CONDICIONES", timing.OTHER_DECISION),
+    ("auto-aprobar", timing.OTHER_DECISION),
+])
+def test_decision_label_is_bounded(decision, expected):
+    assert timing.decision_label(decision) == expected
+
+
+def test_unexpected_decision_is_published_as_other():
+    labels = {"decision": timing.OTHER_DECISION, "run_status": "completed"}
+    before = metrics.get_value("support_requests_total", **labels)
+
+    with timing.request() as timer:
+        timing.set_decision("Lo apruebo, pero solo hoy")
+        timer.run_status = "completed"
+
+    assert metrics.get_value("support_requests_total", **labels) == before + 1
+    assert metrics.get_value(
+        "support_requests_total", decision="LO APRUEBO, PERO SOLO HOY", run_status="completed"
+    ) == 0
+
+
+def test_missing_decision_keeps_unknown():
+    with timing.request() as timer:
+        timing.set_decision(None)
+
+    assert timer.decision == timing.UNKNOWN
@@ -0,0 +1,15 @@
+"""
+Normalización de texto compartida
+"""
+import re
+import unicodedata
+
+_PUNCTUATION = re.compile(r"[^\w\s']")
+
+
+def normalize(text: str) -> str:
+    """Pasa a minúsculas, elimina tildes y signos de puntuación"""
+    folded = unicodedata.normalize("NFKD", (text or "").lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    folded = _PUNCTUATION.sub(" ", folded)
+    return " ".join(folded.split())
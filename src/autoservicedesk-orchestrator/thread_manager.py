@@ -0,0 +1,333 @@
+"""
+Ciclo de vida de los threads: pool precalentado, reciclaje y limpieza
+
+Los runs auxiliares (confirmación, UX) toman un thread del pool y lo
+devuelven al terminar; el Policy Guard toma uno nuevo para cada
+conversación, que se elimina cuando la conversación deja de usarse. La
+creación, el reciclaje y el borrado ocurren en segundo plano, fuera del
+camino crítico de la solicitud.
+"""
+from azure.ai.agents.aio import AgentsClient
+from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set
+
+import clients
+import config
+import context
+import logs
+import metrics
+
+logger = logs.get_logger(__name__)
+
+
+@dataclass
+class _PooledThread:
+    thread_id: str
+    uses: int = 0
+    # Momento en que volvió al pool (para expirar threads inactivos)
+    idle_since: float = 0.0
+
+
+class ThreadManager:
+    """
+    Mantiene hasta pool_size threads vacíos listos para usar.
+
+    - lease(): thread efímero para un run auxiliar; al salir se recicla
+      (se borran sus mensajes) hasta max_uses veces y luego se elimina.
+    - take(): thread nuevo que pasa a ser de la conversación y no vuelve al
+      pool; queda registrado y cada solicitud de la conversación lo renueva (touch).
+    - El janitor elimina los threads del pool inactivos más de idle_ttl
+      segundos y los de conversaciones sin uso por conversation_ttl segundos
+      (ni en este proceso ni en el contexto compartido), reintenta los
+      borrados fallidos y rellena el pool.
+    """
+
+    def __init__(
+            self,
+            pool_size: int,
+            max_uses: int,
+            idle_ttl: int,
+            janitor_interval: float,
+            conversation_ttl: int,
+    ):
+        self._pool_size = pool_size
+        self._max_uses = max_uses
+        self._idle_ttl = idle_ttl
+        self._janitor_interval = janitor_interval
+        self._conversation_ttl = conversation_ttl
+        self._client: Optional[AgentsClient] = None
+        self._pool: Deque[_PooledThread] = deque()
+        self._leased: Set[str] = set()
+        # Threads de conversación entregados por take(): thread_id -> último uso (epoch)
+        self._conversations: Dict[str, float] = {}
+        self._pending_delete: Set[str] = set()
+        self._creating = 0
+        # Threads prestados que volverán al pool al reciclarse
+        self._returning = 0
+        self._background: Set[asyncio.Task] = set()
+        self._janitor: Optional[asyncio.Task] = None
+
+    @property
+    def pooled(self) -> int:
+        return len(self._pool)
+
+    @property
+    def conversations(self) -> int:
+        return len(self._conversations)
+
+    @property
+    def live(self) -> int:
+        """Threads creados por el manager que aún existen (en pool, en uso, de conversaciones o por borrar)"""
+        return len(self._pool) + len(self._leased) + len(self._conversations) + len(self._pending_delete)
+
+    async def start(self, agents_client: AgentsClient) -> None:
+        self._client = agents_client
+        self._refill()
+        if self._janitor is None:
+            self._janitor = self._spawn(self._run_janitor(), track=False)
+        logger.info("🧵 Pool de threads iniciado (tamaño %s)", self._pool_size)
+
+    async def stop(self) -> None:
+        """Detiene el janitor, espera las tareas pendientes y elimina los threads del pool"""
+        if self._janitor is not None:
+            self._janitor.cancel()
+            await asyncio.gather(self._janitor, return_exceptions=True)
+            self._janitor = None
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+        idle = [pooled.thread_id for pooled in self._pool]
+        self._pool.clear()
+        await asyncio.gather(*(self._delete(thread_id, "shutdown") for thread_id in idle))
+        if self._pending_delete:
+            logger.warning("⚠️ %s threads quedaron sin borrar al apagar", len(self._pending_delete))
+
+    async def take(self, agents_client: AgentsClient) -> str:
+        """Retorna un thread nuevo para una conversación (no vuelve al pool)"""
+        pooled = self._pop(agents_client)
+        self._refill()
+        if pooled is not None:
+            thread_id = pooled.thread_id
+        else:
+            thread = await agents_client.threads.create()
+            metrics.increment("threads_created_total", source="on_demand")
+            thread_id = thread.id
+        self._conversations[thread_id] = time.time()
+        return thread_id
+
+    def touch(self, thread_id: str) -> None:
+        """Renueva el último uso de un thread de conversación entregado por este proceso"""
+        if thread_id in self._conversations:
+            self._conversations[thread_id] = time.time()
+
+    @asynccontextmanager
+    async def lease(self, agents_client: AgentsClient) -> AsyncIterator[str]:
+        """Presta un thread vacío para un run auxiliar y lo recicla al terminar"""
+        pooled = self._pop(agents_client)
+        if pooled is None:
+            thread = await agents_client.threads.create()
+            metrics.increment("threads_created_total", source="on_demand")
+            pooled = _PooledThread(thread.id)
+
+        returning = pooled.uses + 1 < self._max_uses
+        if returning:
+            self._returning += 1
+        self._refill()
+
+        self._leased.add(pooled.thread_id)
+        completed = False
+        try:
+            yield pooled.thread_id
+            completed = True
+        finally:
+            pooled.uses += 1
+            # Si el run falló puede seguir activo: el thread no se reutiliza
+            if completed and returning:
+                self._spawn(self._recycle(pooled))
+            else:
+                self._leased.discard(pooled.thread_id)
+                if returning:
+                    self._returning -= 1
+                self._spawn(self._delete(pooled.thread_id, "used"))
+
+    def _pop(self, agents_client: AgentsClient) -> Optional[_PooledThread]:
+        self._client = agents_client
+        pooled = self._pool.popleft() if self._pool else None
+        metrics.increment("threads_acquired_total", source="pool" if pooled else "on_demand")
+        return pooled
+
+    def _spawn(self, coro, track: bool = True) -> asyncio.Task:
+        # Contexto vacío: el trabajo en segundo plano no pertenece a la solicitud que lo disparó
+        task = contextvars.Context().run(asyncio.create_task, coro)
+        if track:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return task
+
+    def _refill(self) -> None:
+        missing = self._pool_size - len(self._pool) - self._creating - self._returning
+        if missing <= 0 or self._client is None:
+            return
+        self._creating += missing
+        for _ in range(missing):
+            self._spawn(self._prewarm())
+
+    async def _prewarm(self) -> None:
+        try:
+            thread = await self._client.threads.create()
+            metrics.increment("threads_created_total", source="prewarm")
+            self._pool.append(_PooledThread(thread.id, idle_since=time.monotonic()))
+        except Exception as e:
+            logger.warning("⚠️ No se pudo precalentar un thread: %s", e)
+        finally:
+            self._creating -= 1
+
+    async def _recycle(self, pooled: _PooledThread) -> None:
+        """Borra los mensajes del thread y lo devuelve al pool"""
+        try:
+            messages = [m async for m in self._client.messages.list(thread_id=pooled.thread_id)]
+            for message in messages:
+                await self._client.messages.delete(thread_id=pooled.thread_id, message_id=message.id)
+        except Exception as e:
+            logger.warning("⚠️ No se pudo reciclar el thread: %s", e, extra={"thread_id": pooled.thread_id})
+            await self._delete(pooled.thread_id, "recycle_failed")
+            return
+        finally:
+            self._leased.discard(pooled.thread_id)
+            self._returning -= 1
+
+        if len(self._pool) >= self._pool_size:
+            await self._delete(pooled.thread_id, "pool_full")
+            return
+        pooled.idle_since = time.monotonic()
+        self._pool.append(pooled)
+        metrics.increment("threads_recycled_total")
+
+    async def _delete(self, thread_id: str, reason: str) -> None:
+        self._pending_delete.add(thread_id)
+        try:
+            await self._client.threads.delete(thread_id)
+        except Exception as e:
+            # Queda pendiente y el janitor reintenta
+            logger.warning("⚠️ No se pudo eliminar el thread: %s", e, extra={"thread_id": thread_id})
+            return
+        self._pending_delete.discard(thread_id)
+        metrics.increment("threads_reaped_total", reason=reason)
+
+    async def _run_janitor(self) -> None:
+        while True:
+            await asyncio.sleep(self._janitor_interval)
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Error en el janitor de threads")
+
+    async def sweep(self) -> None:
+        """Elimina threads inactivos expirados, reintenta borrados fallidos y rellena el pool"""
+        if self._client is None:
+            return
+        now = time.monotonic()
+        expired = [pooled for pooled in self._pool if now - pooled.idle_since > self._idle_ttl]
+        for pooled in expired:
+            self._pool.remove(pooled)
+
+        retries = list(self._pending_delete)
+        conversations = await self._expired_conversations()
+        await asyncio.gather(
+            *(self._delete(pooled.thread_id, "expired") for pooled in expired),
+            *(self._delete(thread_id, "retry") for thread_id in retries),
+            *(self._delete(thread_id, "conversation_expired") for thread_id in conversations),
+        )
+        if expired or retries or conversations:
+            logger.debug(
+                "🧹 Janitor de threads: %s expirados, %s reintentos, %s conversaciones",
+                len(expired), len(retries), len(conversations),
+            )
+        self._refill()
+
+    async def _expired_conversations(self) -> List[str]:
+        """
+        Quita del registro y retorna los threads de conversación sin uso por
+        conversation_ttl. Antes consulta el contexto compartido: otro proceso
+        del host pudo seguir la conversación.
+        """
+        cutoff = time.time() - self._conversation_ttl
+        expired = []
+        for thread_id, last_used in list(self._conversations.items()):
+            if last_used > cutoff:
+                continue
+            activity = await context.last_activity(thread_id)
+            if activity is not None and activity > cutoff:
+                self._conversations[thread_id] = activity
+                continue
+            self._conversations.pop(thread_id, None)
+            expired.append(thread_id)
+        return expired
+
+
+_manager: Optional[ThreadManager] = None
+
+
+def _collect_metrics():
+    if _manager is None:
+        return
+    yield "threads_live", "gauge", {}, _manager.live
+    yield "threads_pooled", "gauge", {}, _manager.pooled
+    yield "threads_conversations", "gauge", {}, _manager.conversations
+
+
+metrics.register_collector(_collect_metrics)
+
+
+async def _get_manager(agents_client: AgentsClient) -> ThreadManager:
+    """Retorna el manager compartido, iniciándolo si la aplicación no lo hizo"""
+    if _manager is None:
+        await start(agents_client)
+    return _manager
+
+
+async def start(agents_client: Optional[AgentsClient] = None) -> None:
+    """Inicia el pool y el janitor (al iniciar la aplicación)"""
+    global _manager
+    if _manager is None:
+        _manager = ThreadManager(
+            config.THREAD_POOL_SIZE,
+            config.THREAD_MAX_USES,
+            config.THREAD_IDLE_TTL_SECONDS,
+            config.THREAD_JANITOR_INTERVAL_SECONDS,
+            config.THREAD_CONVERSATION_TTL_SECONDS,
+        )
+        await _manager.start(agents_client or await clients.get_agents_client())
+
+
+async def stop() -> None:
+    """Detiene el janitor y elimina los threads del pool (al apagar la aplicación)"""
+    global _manager
+    if _manager is not None:
+        await _manager.stop()
+        _manager = None
+
+
+async def new_thread(agents_client: AgentsClient) -> str:
+    """Thread para una conversación nueva"""
+    manager = await _get_manager(agents_client)
+    return await manager.take(agents_client)
+
+
+def touch(thread_id: str) -> None:
+    """Registra el uso de un thread de conversación (cada solicitud que llega con thread_id)"""
+    if _manager is not None:
+        _manager.touch(thread_id)
+
+
+@asynccontextmanager
+async def ephemeral_thread(agents_client: AgentsClient) -> AsyncIterator[str]:
+    """Thread prestado para un run auxiliar; se recicla o elimina al salir"""
+    manager = await _get_manager(agents_client)
+    async with manager.lease(agents_client) as thread_id:
+        yield thread_id
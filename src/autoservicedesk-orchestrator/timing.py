@@ -0,0 +1,99 @@
+"""
+Latencia por etapa de cada solicitud
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+import metrics
+
+UNKNOWN = "unknown"
+
+# Etiqueta de decisión en las métricas para preguntas enrutadas sin Policy Guard
+KNOWLEDGE_BASE_DECISION = "KNOWLEDGE_BASE"
+
+# La decisión viene del LLM: fuera de este conjunto se agrupa para acotar la cardinalidad
+DECISIONS = {"AUTO_APROBAR", "REQUIERE_APROBACION", "DENEGAR", "RECHAZAR", KNOWLEDGE_BASE_DECISION}
+OTHER_DECISION = "OTHER"
+
+
+class RequestTimer:
+    """
+    Acumula la duración de las etapas de una solicitud. La decisión de
+    política y el estado final solo se conocen al terminar, por eso las
+    observaciones se publican juntas al cerrar la solicitud.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+        self.decision = UNKNOWN
+        self.run_status = UNKNOWN
+
+    def publish(self) -> None:
+        labels = {"decision": self.decision, "run_status": self.run_status}
+        for stage_name, seconds in self.stages:
+            metrics.observe("support_stage_duration_seconds", seconds, stage=stage_name, **labels)
+        metrics.observe(
+            "support_request_duration_seconds",
+            time.perf_counter() - self.started_at,
+            **labels,
+        )
+        metrics.increment("support_requests_total", **labels)
+
+
+_current: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+def record(stage_name: str, seconds: float) -> None:
+    """Registra la duración de una etapa en la solicitud en curso"""
+    timer = _current.get()
+    if timer is not None:
+        timer.stages.append((stage_name, seconds))
+    else:
+        metrics.observe(
+            "support_stage_duration_seconds",
+            seconds,
+            stage=stage_name,
+            decision=UNKNOWN,
+            run_status=UNKNOWN,
+        )
+
+
+@contextmanager
+def stage(stage_name: str):
+    """Mide la duración del bloque como una etapa de la solicitud en curso"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage_name, time.perf_counter() - start)
+
+
+def set_decision(decision: Optional[str]) -> None:
+    """Asocia la decisión de política a la solicitud en curso"""
+    timer = _current.get()
+    if timer is not None and decision:
+        timer.decision = decision_label(decision)
+
+
+def decision_label(decision: str) -> str:
+    """Normaliza la decisión a una etiqueta conocida"""
+    label = str(decision).strip().upper()
+    return label if label in DECISIONS else OTHER_DECISION
+
+
+@contextmanager
+def request():
+    """Mide una solicitud completa y publica sus etapas al terminar"""
+    timer = RequestTimer()
+    token = _current.set(timer)
+    try:
+        yield timer
+    except BaseException:
+        timer.run_status = "error"
+        raise
+    finally:
+        _current.reset(token)
+        timer.publish()
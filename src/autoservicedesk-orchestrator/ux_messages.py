@@ -0,0 +1,97 @@
+"""
+Plantillas de mensajes UX para respuestas de política y confirmación
+"""
+from typing import Callable, Dict, Optional
+
+import config
+from cache import LRUCache, fingerprint
+
+# Frases generadas por el agente UX cuando ninguna plantilla aplica
+_llm_phrasings = LRUCache(max_size=config.UX_CACHE_SIZE)
+
+
+def _approver_suffix(policy_decision: Dict) -> str:
+    role = policy_decision.get("required_approver_role")
+    return f" de un {role}" if role else ""
+
+
+def _policy_refs_line(policy_decision: Dict) -> str:
+    refs = policy_decision.get("policy_refs") or []
+    if not refs:
+        return ""
+    return f"\n📋 Políticas: {', '.join(str(r) for r in refs)}"
+
+
+def _render_denied(policy_decision: Dict, extra_context: Dict) -> Optional[str]:
+    reason = policy_decision.get("reason")
+    if not reason:
+        return None
+    return (
+        "❌ Lo siento, tu solicitud fue denegada."
+        f"\n📝 Motivo: {reason}"
+        f"{_policy_refs_line(policy_decision)}"
+        "\nSi crees que se trata de un error, contacta a tu líder o al equipo de TI."
+    )
+
+
+def _render_needs_approval(policy_decision: Dict, extra_context: Dict) -> Optional[str]:
+    reason = policy_decision.get("reason")
+    if not reason:
+        return None
+    return (
+        f"🟡 Esta acción requiere aprobación previa{_approver_suffix(policy_decision)}."
+        f"\n📝 Motivo: {reason}"
+        f"{_policy_refs_line(policy_decision)}"
+        "\n¿Deseas que cree un ticket de aprobación en Azure DevOps? Responde sí o no."
+    )
+
+
+def _render_info(policy_decision: Dict, extra_context: Dict) -> Optional[str]:
+    reason = extra_context.get("reason")
+    if not reason or set(extra_context) != {"reason"}:
+        return None
+    return f"👍 Entendido. {reason} Si necesitas algo más, aquí estoy para ayudarte."
+
+
+def _render_ask_again(policy_decision: Dict, extra_context: Dict) -> Optional[str]:
+    return (
+        "🤔 No logré entender tu respuesta. ¿Deseas que cree el ticket de aprobación "
+        "en Azure DevOps? Por favor responde solo «sí» o «no»."
+    )
+
+
+TEMPLATES: Dict[str, Callable[[Dict, Dict], Optional[str]]] = {
+    "DENIED": _render_denied,
+    "NEEDS_APPROVAL": _render_needs_approval,
+    "INFO": _render_info,
+    "ASK_CONFIRMATION_AGAIN": _render_ask_again,
+}
+
+
+def render_template(state: Dict) -> Optional[str]:
+    """Renderiza el mensaje con una plantilla; None si ninguna aplica al estado"""
+    template = TEMPLATES.get(state.get("mode"))
+    if template is None:
+        return None
+    policy_decision = state.get("policy_decision") or {}
+    extra_context = state.get("extra_context") or {}
+    return template(policy_decision, extra_context)
+
+
+def _cache_key(state: Dict) -> tuple:
+    decision_fields = {
+        "policy_decision": state.get("policy_decision"),
+        "extra_context": state.get("extra_context"),
+    }
+    return state.get("mode"), fingerprint(decision_fields)
+
+
+def get_cached_phrasing(state: Dict) -> Optional[str]:
+    """Retorna una frase generada previamente por el agente UX para el mismo estado"""
+    return _llm_phrasings.get(_cache_key(state))
+
+
+def cache_phrasing(state: Dict, text: str) -> None:
+    """Guarda la frase generada por el agente UX"""
+    if text:
+        _llm_phrasings.set(_cache_key(state), text)